@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from argparse import ArgumentParser
+
+import log_parser
+import log_reader
+import time_statistics
+import steno_dictionary
+import stroke_trie
+import translation_boundary_errors
+import synthetic
+
+import io
+import gc
+import json
+import time
+import types
+import random
+import datetime
+import tracemalloc
+
+
+# Stand in for plover.formatting so the benchmarks run without Plover, with
+# actions like Plover's for attaching, capitalizing and plain words
+class StubAction:
+    def __init__(self, attach = False, capitalize = False, word = "", text = ""):
+        self.attach = attach
+        self.capitalize = capitalize
+        self.word = word
+        self.text = text
+
+    def __eq__(self, other):
+        return vars(self) == vars(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+def stub_translation_to_actions(translation, last_action, spaces_after):
+    actions = []
+    for part in translation.split(" "):
+        attach = part.startswith("{^") or last_action.attach
+        word = part.strip("{}^")
+        if part in ("{,}", "{.}", "{?}"):
+            text = word
+        elif part == "{-|}":
+            text = ""
+        else:
+            if last_action.capitalize:
+                word = word.capitalize()
+            text = ("" if attach else " ") + word
+
+        last_action = StubAction(part.endswith("^}"), part in ("{.}", "{?}", "{-|}"), word, text)
+        actions.append(last_action)
+
+    return actions
+
+def use_stub_formatting():
+    plover = types.ModuleType("plover")
+    plover.formatting = types.ModuleType("plover.formatting")
+    plover.formatting._Action = StubAction
+    plover.formatting._translation_to_actions = stub_translation_to_actions
+
+    log_reader.plover = plover
+    log_reader.system_name = "stub"
+
+
+class Inputs:
+    def __init__(self, args):
+        rng = random.Random(args.seed)
+
+        self.dictionary = synthetic.generate_dictionary(args.dictionary_size,
+            args.entry_lengths, rng)
+        self.dictionary_json = synthetic.dictionary_json(self.dictionary)
+        self.lines = synthetic.generate_log_lines(args.strokes, self.dictionary, rng)
+
+        log_processor = log_reader.LogProcessor(None, None)
+        self.translations = list(log_processor.iter_translations(self.lines))
+        self.log_strokes = log_reader.process_log(self.lines,
+            synthetic.RESUME_TRANSLATION, synthetic.SUSPEND_TRANSLATION)
+
+        self.compiled_dictionary = steno_dictionary.Dictionary(self.dictionary)
+
+def parse(inputs):
+    line_parser = log_parser.LineParser()
+    for line in inputs.lines:
+        line_parser.parse_line(line)
+
+    return len(inputs.lines)
+
+def format_(inputs):
+    log_processor = log_reader.LogProcessor(None, None)
+    for translation in log_processor.iter_translations(inputs.lines):
+        pass
+
+    return len(inputs.lines)
+
+def process_translations(inputs):
+    log_processor = log_reader.LogProcessor(
+        synthetic.RESUME_TRANSLATION, synthetic.SUSPEND_TRANSLATION)
+    for translation, removal in inputs.translations:
+        log_processor.add_translation(translation, removal)
+    log_processor.finish()
+
+    return len(inputs.translations)
+
+def process_log(inputs):
+    log_reader.process_log(inputs.lines,
+        synthetic.RESUME_TRANSLATION, synthetic.SUSPEND_TRANSLATION)
+
+    return len(inputs.lines)
+
+def speed_filter(inputs):
+    speed_filter_ = time_statistics.SpeedFilter(2, 1, datetime.timedelta(seconds = 600))
+    for log_stroke in inputs.log_strokes:
+        speed_filter_.add_stroke(log_stroke)
+
+    return len(inputs.log_strokes)
+
+def time_statistics_(inputs):
+    time_statistics__ = time_statistics.create_time_statistics(60, [2, 1, 600])
+    for log_stroke in inputs.log_strokes:
+        time_statistics__.add_log_stroke(log_stroke)
+    time_statistics__.finish()
+    time_statistics__.write(io.StringIO(), True)
+
+    return len(inputs.log_strokes)
+
+def dictionary_load(inputs):
+    steno_dictionary.Dictionary(dict(
+        steno_dictionary.iter_json_dictionary(io.StringIO(inputs.dictionary_json))))
+
+    return len(inputs.dictionary)
+
+def stroke_trie_(inputs):
+    stroke_trie.StrokeTrie([tuple(strokes.split("/")) for strokes in inputs.dictionary])
+
+    return len(inputs.dictionary)
+
+def boundary_errors(inputs):
+    matcher = translation_boundary_errors.BoundaryErrorMatcher(
+        inputs.compiled_dictionary, False)
+    for entry in range(len(inputs.compiled_dictionary)):
+        segmentations = matcher.segment(inputs.compiled_dictionary.entry_ids(entry))
+        if not segmentations is None:
+            matcher.matches(segmentations)
+
+    return len(inputs.dictionary)
+
+# Name, function returning the number of items processed, item name
+STAGES = [
+    ("parse", parse, "lines"),
+    ("format", format_, "lines"),
+    ("process_translations", process_translations, "translations"),
+    ("process_log", process_log, "lines"),
+    ("speed_filter", speed_filter, "strokes"),
+    ("time_statistics", time_statistics_, "strokes"),
+    ("dictionary_load", dictionary_load, "entries"),
+    ("stroke_trie", stroke_trie_, "entries"),
+    ("boundary_errors", boundary_errors, "entries")
+]
+
+# Throughput of the best of runs, and peak memory allocated during a
+# separate traced run
+def measure(stage, inputs, runs):
+    speed = 0
+    for run in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        count = stage(inputs)
+        speed = max(speed, count/(time.perf_counter() - start))
+
+    gc.collect()
+    tracemalloc.start()
+    stage(inputs)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return speed, peak_memory
+
+def compare(result, baseline, tolerance):
+    speed_change = result["speed"]/baseline["speed"] - 1
+    memory_change = result["peak_memory"]/max(baseline["peak_memory"], 1) - 1
+    regression = speed_change < -tolerance or memory_change > tolerance
+
+    return ", %+.1f%% speed, %+.1f%% memory" % (100*speed_change, 100*memory_change) \
+        + (" REGRESSION" if regression else ""), regression
+
+
+arg_parser = ArgumentParser(description="Measure throughput and peak memory of each processing stage on synthetic Plover logs and dictionaries, and compare against a saved baseline. Runs offline with a stub in place of plover.formatting unless --plover is given.")
+arg_parser.add_argument("-n", "--strokes", type=int, default=100000, help="number of synthetic strokes")
+arg_parser.add_argument("-d", "--dictionary-size", type=int, default=20000, help="number of synthetic dictionary entries")
+arg_parser.add_argument("-el", "--entry-lengths", nargs="+", type=float, default=[60, 28, 9, 3], help="relative weights of dictionary entries of 1, 2, ... strokes")
+arg_parser.add_argument("--seed", type=int, default=0, help="random seed of the synthetic inputs")
+arg_parser.add_argument("-r", "--runs", type=int, default=3, help="number of timed runs of each stage, the fastest is output")
+arg_parser.add_argument("--stages", nargs="+", choices=[name for name, stage, item in STAGES], help="stages to measure, all if not given")
+arg_parser.add_argument("-b", "--baseline", help="baseline file to compare against, stages more than the tolerance slower or using more memory are regressions and exit with an error")
+arg_parser.add_argument("--save-baseline", action="store_true", help="save the results to the baseline file")
+arg_parser.add_argument("--tolerance", type=float, default=0.2, help="fraction of throughput or peak memory a stage can change by before it's a regression")
+arg_parser.add_argument("--plover", action="store_true", help="format with Plover from PYTHONPATH instead of the stub")
+args = arg_parser.parse_args()
+if args.save_baseline and args.baseline is None:
+    arg_parser.error("--save-baseline requires -b/--baseline")
+
+if args.plover:
+    log_reader.setup_plover_or_exit()
+else:
+    use_stub_formatting()
+
+parameters = {
+    "strokes": args.strokes,
+    "dictionary_size": args.dictionary_size,
+    "entry_lengths": args.entry_lengths,
+    "seed": args.seed,
+    "plover": args.plover
+}
+
+baseline = None
+if not args.baseline is None and not args.save_baseline:
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    if baseline["parameters"] != parameters:
+        print("Baseline was saved with different parameters " + str(baseline["parameters"]),
+            file=sys.stderr)
+        sys.exit(1)
+
+inputs = Inputs(args)
+
+results = {}
+regressions = False
+for name, stage, item in STAGES:
+    if not args.stages is None and not name in args.stages:
+        continue
+
+    speed, peak_memory = measure(stage, inputs, args.runs)
+    results[name] = {"speed": speed, "peak_memory": peak_memory}
+
+    line = name + ": " + str(int(speed)) + " " + item + "/s, " \
+        + "%.1f" % (peak_memory/(1 << 20)) + "MB peak"
+    if not baseline is None and name in baseline["stages"]:
+        comparison, regression = compare(results[name], baseline["stages"][name], args.tolerance)
+        line += comparison
+        regressions = regressions or regression
+    print(line)
+
+if args.save_baseline:
+    with open(args.baseline, "w") as baseline_file:
+        json.dump({"parameters": parameters, "stages": results}, baseline_file, indent = 2)
+
+if regressions:
+    sys.exit(1)
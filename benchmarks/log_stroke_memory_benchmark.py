@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from argparse import ArgumentParser
+
+import log_reader
+
+import random
+import datetime
+import tracemalloc
+
+
+# Original classes, with a __dict__ for each instance
+class ReferenceTranslation:
+    def __init__(self, time, translation, strokes, text):
+        self.time = time
+        self.translation = translation
+        self.strokes = strokes
+        self.text = text
+
+class ReferenceLogStroke:
+    def __init__(self, time, undo_translations, do_translations, stroke):
+        self.time = time
+        self.undo_translations = undo_translations
+        self.do_translations = do_translations
+        self.stroke = stroke
+
+WORDS = [
+    (["-T"], "the", " the"),
+    (["SKP"], "and", " and"),
+    (["TO"], "to", " to"),
+    (["-F"], "of", " of"),
+    (["TPHO", "-FP"], "notify", " notify"),
+    (["KW-BG"], "{,}", ","),
+    (["TP-PL"], "{.}", "."),
+    (["PWUT"], "but", " but"),
+    (["TKOEPBT"], "don't", " don't"),
+    (["STKPWHR-FRPBLG", "-GS"], None, " STKPWHR-FRPBLG/-GS")
+]
+
+# Log strokes as (time, undo translations, do translations, stroke) with
+# translations as (time, translation, strokes, text)
+def generate_log_strokes(count):
+    time_ = datetime.datetime(2017, 2, 24, 23, 40, 7, 162000)
+
+    log_strokes = []
+    for i in range(count):
+        time_ += datetime.timedelta(milliseconds = random.randint(50, 400))
+        strokes, translation, text = random.choice(WORDS)
+        translation_ = (time_, translation, strokes, text)
+
+        if random.random() < 0.05:
+            log_strokes.append((time_, [translation_], [], "*"))
+        else:
+            log_strokes.append((time_, [], [translation_], strokes[-1]))
+
+    return log_strokes
+
+def create_log_stroke(log_stroke_class, translation_class, log_stroke):
+    # New objects for each log stroke, as when reading logs
+    def create_translation(translation):
+        time_, translation_, strokes, text = translation
+        return translation_class(time_ + datetime.timedelta(0), translation_, list(strokes), text)
+
+    time_, undo_translations, do_translations, stroke = log_stroke
+    return log_stroke_class(time_ + datetime.timedelta(0),
+        [create_translation(translation) for translation in undo_translations],
+        [create_translation(translation) for translation in do_translations],
+        stroke)
+
+def measure(create):
+    tracemalloc.start()
+    log_strokes = create()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return log_strokes, size
+
+def translation_values(translation):
+    return (translation.time, translation.translation, list(translation.strokes), translation.text)
+
+def log_stroke_values(log_stroke):
+    return (log_stroke.time,
+        [translation_values(translation) for translation in log_stroke.undo_translations],
+        [translation_values(translation) for translation in log_stroke.do_translations],
+        log_stroke.stroke)
+
+
+arg_parser = ArgumentParser(description="Compare memory per log stroke of the original Translation and LogStroke classes against the __slots__ classes and LogStrokeTable.")
+arg_parser.add_argument("-n", "--strokes", type=int, default=200000, help="number of synthetic strokes")
+args = arg_parser.parse_args()
+
+random.seed(0)
+generated_log_strokes = generate_log_strokes(args.strokes)
+
+reference_log_strokes, reference_size = measure(lambda: [
+    create_log_stroke(ReferenceLogStroke, ReferenceTranslation, log_stroke)
+    for log_stroke in generated_log_strokes])
+slots_log_strokes, slots_size = measure(lambda: [
+    create_log_stroke(log_reader.LogStroke, log_reader.Translation, log_stroke)
+    for log_stroke in generated_log_strokes])
+
+def create_table():
+    table = log_reader.LogStrokeTable()
+    for log_stroke in generated_log_strokes:
+        table.append(create_log_stroke(log_reader.LogStroke, log_reader.Translation, log_stroke))
+    return table
+table, table_size = measure(create_table)
+
+for log_strokes in (slots_log_strokes, table):
+    if any(log_stroke_values(a) != log_stroke_values(b)
+        for a, b in zip(reference_log_strokes, log_strokes)):
+        print("Log strokes differ from reference classes", file=sys.stderr)
+        sys.exit(1)
+
+print("reference: " + str(reference_size//args.strokes) + " bytes/stroke")
+print("__slots__: " + str(slots_size//args.strokes) + " bytes/stroke, "
+    + "%.2f" % (reference_size/slots_size) + "x smaller")
+print("LogStrokeTable: " + str(table_size//args.strokes) + " bytes/stroke, "
+    + "%.2f" % (reference_size/table_size) + "x smaller")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from argparse import ArgumentParser
+
+import log_parser
+
+import re
+import random
+import datetime
+import time
+
+
+def reference_parse_line(line):
+    match = re.match(r"""
+        ^(?P<time>[0-9\-:, ]*)
+        (?P<removal>\*?)Translation\(
+        \((?P<strokes>[A-Z\-,'* ]*)\)
+        \s* : \s*
+        (?:(?:\"(?P<translation>(?:[^\\\"]|(?:\\\\)*\\[^\"]|(?:\\\\)*\\\")*)\")|None)
+        \)
+        """,
+        line,
+        re.VERBOSE)
+
+    if not match:
+        return None
+
+    strokes = match.group("strokes").split(",")
+    strokes[:] = [stroke.strip()[1:-1] for stroke in strokes]
+    if len(strokes) > 0 and len(strokes[-1]) == 0:
+        strokes = strokes[:-1]
+
+    return (
+        datetime.datetime.strptime(match.group("time").strip(), "%Y-%m-%d %H:%M:%S,%f"),
+        match.group("removal") == "*",
+        strokes,
+        match.group("translation"))
+
+def generate_lines(count):
+    strokes = ["KW-BG", "TP-PL", "SKP", "PWUT", "EU", "-T", "TEL", "PHE", "TKOEPBT", "S-PBT"]
+    translations = ["\"{,}\"", "\"{.}\"", "\"the\"", "\"and\"", "\"{^ing}\"", "None"]
+
+    time_ = datetime.datetime(2017, 2, 24, 23, 40, 7, 162000)
+
+    lines = []
+    for i in range(count):
+        time_ += datetime.timedelta(milliseconds = random.randint(0, 800))
+        if random.random() < 0.05:
+            lines.append(time_.strftime("%Y-%m-%d %H:%M:%S") + ",000 Some other message\n")
+            continue
+
+        line_strokes = random.sample(strokes, random.randint(1, 3))
+        lines.append(time_.strftime("%Y-%m-%d %H:%M:%S")
+            + "," + "%03d" % (time_.microsecond//1000)
+            + (" *" if random.random() < 0.1 else " ")
+            + "Translation((" + ", ".join("'" + stroke + "'" for stroke in line_strokes)
+            + ("," if len(line_strokes) == 1 else "") + ") : "
+            + random.choice(translations) + ")\n")
+
+    return lines
+
+def measure(parse_line, lines):
+    start = time.perf_counter()
+    results = [parse_line(line) for line in lines]
+    return results, len(lines)/(time.perf_counter() - start)
+
+
+arg_parser = ArgumentParser(description="Compare log line parsing throughput of log_parser against the original regex and strptime parsing.")
+arg_parser.add_argument("-n", "--lines", type=int, default=200000, help="number of synthetic log lines")
+arg_parser.add_argument("logs", nargs="*", help="log file paths to use instead of synthetic lines")
+args = arg_parser.parse_args()
+
+if len(args.logs) > 0:
+    lines = []
+    for log_file in args.logs:
+        with open(log_file) as data_file:
+            lines += data_file.readlines()
+else:
+    random.seed(0)
+    lines = generate_lines(args.lines)
+
+reference_results, reference_speed = measure(reference_parse_line, lines)
+results, speed = measure(log_parser.LineParser().parse_line, lines)
+
+if results != reference_results:
+    print("Parse results differ from reference parser", file=sys.stderr)
+    sys.exit(1)
+
+print("reference: " + str(int(reference_speed)) + " lines/s")
+print("log_parser: " + str(int(speed)) + " lines/s")
+print("speedup: " + "%.2f" % (speed/reference_speed) + "x")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+from argparse import ArgumentParser
+
+import subprocess
+import time
+import importlib.util
+
+
+REPOSITORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Commands and whether they need Plover
+COMMANDS = [
+    ("import log_reader", ["-c", "import log_reader"], False),
+    ("import log_reader, set up Plover", ["-c", "import log_reader; log_reader.setup_plover()"], True),
+    ("stroke_ngrams.py --help", ["stroke_ngrams.py", "--help"], False),
+    ("steno_stats.py report --help", ["steno_stats.py", "report", "--help"], False)
+]
+
+def measure(arguments, runs):
+    durations = []
+    for run in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, cwd=REPOSITORY_DIR,
+            stdout=subprocess.DEVNULL, check=True)
+        durations.append(time.perf_counter() - start)
+
+    return sorted(durations)[len(durations)//2]
+
+
+arg_parser = ArgumentParser(description="Measure start up time of a new Python process importing log_reader, with and without setting up Plover, and of script help. Setting up Plover is skipped if Plover can't be imported. Plover is set up when translations are first formatted, importing log_reader used to set it up.")
+arg_parser.add_argument("-n", "--runs", type=int, default=10, help="number of runs of each command, the median is output")
+args = arg_parser.parse_args()
+
+baseline = measure(["-c", "pass"], args.runs)
+print("python: " + "%.3f" % baseline + "s")
+
+# Without Plover, setting it up prints an error and exits straight away
+plover_available = not importlib.util.find_spec("plover") is None
+
+for name, arguments, needs_plover in COMMANDS:
+    if needs_plover and not plover_available:
+        print(name + ": skipped, Plover isn't available")
+        continue
+
+    duration = measure(arguments, args.runs)
+    print(name + ": " + "%.3f" % duration + "s (+" + "%.3f" % (duration - baseline) + "s)")
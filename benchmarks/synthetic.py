@@ -0,0 +1,171 @@
+import json
+import datetime
+import itertools
+
+
+LEFT_KEYS = ["S", "T", "K", "P", "W", "H", "R"]
+VOWEL_KEYS = ["A", "O", "*", "E", "U"]
+RIGHT_KEYS = ["F", "R", "P", "B", "L", "G", "T", "S", "D", "Z"]
+
+SYLLABLES = ["ta", "ke", "ri", "mo", "lu", "sen", "dar", "pol", "ing", "er",
+    "an", "to", "ver", "sta", "con", "ble", "ness", "re", "de", "pro"]
+
+RESUME_TRANSLATION = "{PLOVER:RESUME}"
+SUSPEND_TRANSLATION = "{PLOVER:SUSPEND}"
+
+def generate_stroke(rng):
+    left = [key for key in LEFT_KEYS if rng.random() < 0.3]
+    vowels = [key for key in VOWEL_KEYS if rng.random() < 0.25]
+    right = [key for key in RIGHT_KEYS if rng.random() < 0.2]
+
+    if len(left) + len(vowels) + len(right) == 0:
+        left = [rng.choice(LEFT_KEYS)]
+
+    stroke = "".join(left) + "".join(vowels)
+    if len(vowels) == 0 and len(right) > 0:
+        stroke += "-"
+
+    return stroke + "".join(right)
+
+def generate_translation(rng):
+    word = "".join(rng.choice(SYLLABLES) for i in range(rng.randint(1, 3)))
+
+    kind = rng.random()
+    if kind < 0.05:
+        return "{^" + word + "}"
+    elif kind < 0.1:
+        return "{" + word + "^}"
+    elif kind < 0.13:
+        return rng.choice(["{,}", "{.}", "{?}", "{-|}"])
+    elif kind < 0.2:
+        return word + " " + "".join(rng.choice(SYLLABLES) for i in range(2))
+
+    return word
+
+# Dictionary of size entries with entry stroke counts in proportion to
+# length_weights, the weights of 1, 2, ... strokes. Multi-stroke entries are
+# drawn from a skewed stroke distribution and often extend shorter entries,
+# so entries share strokes and prefixes as in real dictionaries.
+def generate_dictionary(size, length_weights, rng):
+    length_counts = [int(size*weight/sum(length_weights)) for weight in length_weights]
+    length_counts[0] += size - sum(length_counts)
+
+    strokes = set()
+    while len(strokes) < max(100, length_counts[0]*5//4):
+        strokes.add(generate_stroke(rng))
+    strokes = sorted(strokes)
+    rng.shuffle(strokes)
+    stroke_weights = list(itertools.accumulate(1/(i + 1) for i in range(len(strokes))))
+
+    entries = [[stroke] for stroke in strokes[:length_counts[0]]]
+    for length in range(2, len(length_counts) + 1):
+        length_entries = set()
+        shorter_entries = [entry for entry in entries if len(entry) < length]
+        while len(length_entries) < length_counts[length - 1]:
+            entry = rng.choices(strokes, cum_weights=stroke_weights, k=length)
+            if rng.random() < 0.3:
+                entry = (rng.choice(shorter_entries) + entry)[:length]
+
+            length_entries.add("/".join(entry))
+
+        entries.extend(entry.split("/") for entry in sorted(length_entries))
+
+    rng.shuffle(entries)
+
+    return {"/".join(entry): generate_translation(rng) for entry in entries}
+
+def dictionary_json(dictionary):
+    return json.dumps(dictionary, ensure_ascii = False, indent = 0)
+
+class LogWriter:
+    def __init__(self, rng):
+        self.rng = rng
+        self.time = datetime.datetime(2017, 2, 24, 23, 40, 7, 162000)
+        self.lines = []
+
+    def advance(self):
+        if self.rng.random() < 0.002:
+            self.time += datetime.timedelta(seconds = self.rng.randint(60, 7200))
+        else:
+            self.time += datetime.timedelta(milliseconds = self.rng.randint(50, 400))
+
+    def translation(self, strokes, translation, removal = False):
+        self.lines.append(self.time.strftime("%Y-%m-%d %H:%M:%S")
+            + "," + "%03d" % (self.time.microsecond//1000)
+            + (" *" if removal else " ")
+            + "Translation((" + ", ".join("'" + stroke + "'" for stroke in strokes)
+            + ("," if len(strokes) == 1 else "") + ") : "
+            + ("None" if translation is None else "\"" + translation + "\"") + ")\n")
+
+    def other(self):
+        self.lines.append(self.time.strftime("%Y-%m-%d %H:%M:%S.%f") + " Some other log line\n")
+
+# Plover log lines of about count strokes of dictionary entries, with
+# multi-stroke entries written stroke by stroke with automatic undos,
+# undo bursts with automatic redos of entry prefixes, untranslated strokes,
+# suspend and resume markers and other log lines
+def generate_log_lines(count, dictionary, rng):
+    entries = list(dictionary.items())
+    entry_weights = list(itertools.accumulate(1/(i + 1)**0.8 for i in range(len(entries))))
+
+    writer = LogWriter(rng)
+    # Strokes and translations that can be undone, most recent last
+    written = []
+
+    def write(strokes, translation):
+        writer.translation(strokes, translation)
+        written.append((strokes, translation))
+        del written[:-100]
+
+    stroke_count = 0
+    while stroke_count < count:
+        writer.advance()
+        kind = rng.random()
+
+        if kind < 0.03 and len(written) > 0:
+            # Undo burst
+            for i in range(rng.randint(1, 4)):
+                if len(written) == 0:
+                    break
+
+                strokes, translation = written.pop()
+                writer.translation(strokes, translation, True)
+                if len(strokes) > 1:
+                    prefix = "/".join(strokes[:-1])
+                    write(strokes[:-1], dictionary.get(prefix))
+
+                stroke_count += 1
+                writer.advance()
+
+        elif kind < 0.035:
+            writer.translation(["STPH-FPLT"], SUSPEND_TRANSLATION)
+            for i in range(rng.randint(1, 20)):
+                writer.advance()
+                strokes, translation = rng.choices(entries, cum_weights=entry_weights)[0]
+                writer.translation(strokes.split("/"), translation)
+            writer.advance()
+            writer.translation(["STPH-FPLT"], RESUME_TRANSLATION)
+            stroke_count += 2
+
+        elif kind < 0.045:
+            writer.other()
+
+        elif kind < 0.05:
+            write([generate_stroke(rng)], None)
+            stroke_count += 1
+
+        else:
+            strokes, translation = rng.choices(entries, cum_weights=entry_weights)[0]
+            strokes = strokes.split("/")
+
+            # Earlier strokes of the entry are translated on their own first
+            for i in range(1, len(strokes)):
+                write(strokes[:i], dictionary.get("/".join(strokes[:i])))
+                writer.advance()
+                undone_strokes, undone_translation = written.pop()
+                writer.translation(undone_strokes, undone_translation, True)
+
+            write(strokes, translation)
+            stroke_count += len(strokes)
+
+    return writer.lines
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from argparse import ArgumentParser
+
+import log_reader
+import time_statistics
+
+import io
+import random
+import datetime
+import time
+
+
+# Original speed filter, run over all strokes at once and evicting from the
+# front of a list
+def reference_speed_filter(strokes, speed_activate, speed_deactivate, sample_duration):
+    strokes_buffer = []
+
+    active_periods = []
+
+    activate_time = None
+
+    strokes_i = 0
+    while strokes_i < len(strokes):
+        popped_stroke = None
+        if len(strokes_buffer) > 0 and \
+            strokes[strokes_i].time - strokes_buffer[0].time > sample_duration:
+            popped_stroke = strokes_buffer[0]
+            del strokes_buffer[0]
+        else:
+            strokes_buffer.append(strokes[strokes_i])
+            strokes_i += 1
+
+        speed = len(strokes_buffer)/sample_duration.total_seconds()
+
+        if speed >= speed_activate and activate_time is None:
+            activate_time = strokes_buffer[-1].time
+        elif speed < speed_deactivate and not activate_time is None:
+            deactivate_time = popped_stroke.time
+            active_periods.append((activate_time, deactivate_time))
+            activate_time = None
+
+    if not activate_time is None:
+        deactivate_time = strokes[-1].time
+        active_periods.append((activate_time, deactivate_time))
+        activate_time = None
+
+    return active_periods
+
+# Original sample window figures, written a string concatenation at a time
+class ReferenceLogStat:
+    def __init__(self, period):
+        self.period = period
+
+        self.stroke_count = 0
+        self.character_count = 0
+        self.undo_stroke_count = 0
+        self.undo_character_count = 0
+        self.active_time = datetime.timedelta(0)
+
+    def add_period(self, period):
+        period_intersection = time_statistics.intersection(
+            self.period[0], self.period[1],
+            period[0], period[1])
+
+        period_intersection_delta = period_intersection[1] - period_intersection[0]
+
+        if period_intersection_delta > datetime.timedelta(0):
+            self.active_time += period_intersection_delta
+
+    def add_stroke(self, stroke):
+        if stroke.stroke == "*":
+            self.undo_stroke_count += 1
+        else:
+            self.stroke_count += 1
+
+        for translation in stroke.undo_translations:
+            self.undo_character_count += len(translation.text)
+
+        for translation in stroke.do_translations:
+            self.character_count += len(translation.text)
+
+    def to_csv_row(self, row, add_derived):
+        row = str(row)
+        return self.period[0].isoformat() + "," \
+            + str(self.stroke_count) + "," \
+            + str(self.character_count) + "," \
+            + str(self.undo_stroke_count) + "," \
+            + str(self.undo_character_count) + "," \
+            + str(self.active_time.total_seconds()) + "," \
+            + (("=B" + row + " + D" + row + "," \
+                + "=B" + row + " - D" + row + "," \
+                + "=C" + row + " - E" + row + "," \
+                + "=I" + row + "/5," \
+                + "=G" + row + " / J" + row + "," \
+                + "=H" + row + " / J" + row + "," \
+                + "=G" + row + " * 60 / F" + row + "," \
+                + "=H" + row + " * 60 / F" + row + "," \
+                + "=J" + row + " * 60 / F" + row + ","
+            ) if add_derived else "")
+
+# Original time statistics, keeps all log strokes and walks every sample
+# window once they're all read
+class ReferenceTimeStatistics:
+    def __init__(self, sample_duration, speed_activation):
+        self.sample_duration = sample_duration
+        self.speed_activation = speed_activation
+        self.log_strokes = []
+        self.log_stats = []
+
+    def add_log_stroke(self, stroke):
+        self.log_strokes.append(stroke)
+
+    def finish(self):
+        log_strokes = self.log_strokes
+        sample_duration = self.sample_duration
+
+        active_periods = [(log_strokes[0].time, log_strokes[-1].time)]
+        if not self.speed_activation is None:
+            active_periods = reference_speed_filter(
+                log_strokes,
+                self.speed_activation[0],
+                self.speed_activation[1],
+                datetime.timedelta(seconds = self.speed_activation[2]))
+
+        log_stats = self.log_stats
+        log_stats.append(ReferenceLogStat((log_strokes[0].time, log_strokes[0].time + sample_duration)))
+
+        stroke_i = 0
+        for active_period in active_periods:
+            while active_period[0] >= log_stats[-1].period[1]:
+                log_stats.append(ReferenceLogStat((
+                    log_stats[-1].period[1],
+                    log_stats[-1].period[1] + sample_duration)))
+
+            log_stats[-1].add_period(active_period)
+
+            while log_strokes[stroke_i].time < active_period[0]:
+                stroke_i += 1
+
+            while log_strokes[stroke_i].time < active_period[1]:
+                stroke = log_strokes[stroke_i]
+
+                while stroke.time >= log_stats[-1].period[1]:
+                    log_stats.append(ReferenceLogStat((
+                        log_stats[-1].period[1],
+                        log_stats[-1].period[1] + sample_duration)))
+                    log_stats[-1].add_period(active_period)
+
+                log_stats[-1].add_stroke(stroke)
+
+                stroke_i += 1
+
+    def write(self, output, add_derived):
+        print(time_statistics.LogStat.csv_header(add_derived), file=output)
+        row = 2
+        for log_stat in self.log_stats:
+            print(log_stat.to_csv_row(row, add_derived), file=output)
+            row += 1
+
+def generate_log_strokes(count):
+    time_ = datetime.datetime(2017, 2, 24, 23, 40, 7, 162000)
+
+    log_strokes = []
+    for i in range(count):
+        # Bursts of fast writing separated by pauses
+        if random.random() < 0.001:
+            time_ += datetime.timedelta(seconds = random.randint(60, 7200))
+        else:
+            time_ += datetime.timedelta(milliseconds = random.randint(50, 400))
+
+        if random.random() < 0.05:
+            log_strokes.append(log_reader.LogStroke(time_,
+                [log_reader.Translation(time_, "the", ["-T"], " the")], [], "*"))
+        else:
+            log_strokes.append(log_reader.LogStroke(time_,
+                [], [log_reader.Translation(time_, "the", ["-T"], " the")], "-T"))
+
+    return log_strokes
+
+def measure(create_time_statistics, log_strokes):
+    start = time.perf_counter()
+    time_statistics_ = create_time_statistics()
+    for log_stroke in log_strokes:
+        time_statistics_.add_log_stroke(log_stroke)
+    time_statistics_.finish()
+
+    output = io.StringIO()
+    time_statistics_.write(output, True)
+    duration = time.perf_counter() - start
+
+    return output.getvalue(), len(log_strokes)/duration
+
+
+arg_parser = ArgumentParser(description="Compare time statistics throughput against the original algorithm, which keeps all strokes and runs a list based speed window over them before walking sample windows, and the NumPy backend when NumPy is installed.")
+arg_parser.add_argument("-n", "--strokes", type=int, default=200000, help="number of synthetic strokes")
+arg_parser.add_argument("-sa", "--speed_activation", nargs=3, type=float, help="speed to start recording on (stroke/second), speed to stop recording on (stroke/second), length of window to check speed in (seconds), all strokes are recorded without it")
+arg_parser.add_argument("-w", "--sample-window", type=float, default=60, help="duration of time (seconds) to sample for each discrete statistic")
+args = arg_parser.parse_args()
+
+random.seed(0)
+log_strokes = generate_log_strokes(args.strokes)
+
+sample_duration = datetime.timedelta(seconds = args.sample_window)
+
+reference_output, reference_speed = measure(
+    lambda: ReferenceTimeStatistics(sample_duration, args.speed_activation),
+    log_strokes)
+output, speed = measure(
+    lambda: time_statistics.create_time_statistics(
+        args.sample_window, args.speed_activation),
+    log_strokes)
+
+if output != reference_output:
+    print("Time statistics differ from reference implementation", file=sys.stderr)
+    sys.exit(1)
+
+print("reference: " + str(int(reference_speed)) + " strokes/s")
+print("time_statistics: " + str(int(speed)) + " strokes/s")
+print("speedup: " + "%.2f" % (speed/reference_speed) + "x")
+
+if time_statistics.import_numpy():
+    numpy_output, numpy_speed = measure(
+        lambda: time_statistics.create_time_statistics(
+            args.sample_window, args.speed_activation, True),
+        log_strokes)
+
+    if numpy_output != reference_output:
+        print("NumPy time statistics differ from reference implementation", file=sys.stderr)
+        sys.exit(1)
+
+    print("time_statistics --numpy: " + str(int(numpy_speed)) + " strokes/s")
+    print("speedup --numpy: " + "%.2f" % (numpy_speed/reference_speed) + "x")
@@ -0,0 +1,200 @@
+import sys
+import time
+import cProfile
+import contextlib
+try:
+    import simplejson as json
+except ImportError:
+    import json
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Peak resident set size of the process in bytes, None where it's unknown
+def peak_rss():
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes except on macOS
+    return peak if sys.platform == "darwin" else peak*1024
+
+# Peak RSS is sampled on the first and every this many calls of a stage
+RSS_SAMPLE_CALLS = 4096
+
+NO_STAGE = contextlib.nullcontext()
+
+
+def add_arguments(arg_parser):
+    arg_parser.add_argument("--stats-json", help="write wall time, calls, counts and peak memory of each processing stage to this JSON file")
+    arg_parser.add_argument("--profile", help="write cProfile statistics of the run to this file")
+
+def start(args):
+    if args.stats_json is None:
+        return Instrumentation(args.profile)
+
+    return StageInstrumentation(args.stats_json, args.profile)
+
+# Instrumentation of a run that records nothing, so stages cost nothing
+# when instrumentation is off. The run can still be profiled.
+class Instrumentation:
+    enabled = False
+
+    def __init__(self, profile_path = None):
+        self.profile_path = profile_path
+        self.profiler = None
+        if not profile_path is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def timed(self, name):
+        return NO_STAGE
+
+    def iterate(self, iterable, name, count_name = None):
+        return iterable
+
+    def count(self, name, count_name, count = 1):
+        pass
+
+    def finish(self):
+        if not self.profiler is None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_path)
+            self.profiler = None
+
+class Stage:
+    def __init__(self):
+        self.seconds = 0
+        self.calls = 0
+        self.counts = {}
+        self.peak_rss = None
+
+    def to_json(self):
+        return {
+            "seconds": self.seconds,
+            "calls": self.calls,
+            "counts": self.counts,
+            "peak_rss": self.peak_rss
+        }
+
+class TimedStage:
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.instrumentation.enter(self.name)
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.instrumentation.exit()
+        return False
+
+# Wall time of each stage of a run, not counting time in stages entered
+# while it's active, with call counts, item counts and the process peak RSS
+# when the stage was last sampled
+class StageInstrumentation(Instrumentation):
+    enabled = True
+
+    def __init__(self, stats_path, profile_path = None):
+        Instrumentation.__init__(self, profile_path)
+        self.stats_path = stats_path
+
+        self.stages = {}
+        # Active stages as [name, start time, seconds in nested stages]
+        self.active = []
+        self.start_time = time.perf_counter()
+
+    def stage(self, name):
+        if not name in self.stages:
+            self.stages[name] = Stage()
+
+        return self.stages[name]
+
+    def enter(self, name):
+        self.active.append([name, time.perf_counter(), 0])
+
+    def exit(self):
+        name, start, nested_seconds = self.active.pop()
+        seconds = time.perf_counter() - start
+
+        stage = self.stage(name)
+        stage.seconds += seconds - nested_seconds
+        stage.calls += 1
+        if stage.calls % RSS_SAMPLE_CALLS == 1:
+            stage.peak_rss = peak_rss()
+
+        if len(self.active) > 0:
+            self.active[-1][2] += seconds
+
+        return stage
+
+    def timed(self, name):
+        return TimedStage(self, name)
+
+    # Items of iterable with the time taken to produce each one counted
+    # in the stage
+    def iterate(self, iterable, name, count_name = None):
+        iterator = iter(iterable)
+        while True:
+            self.enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stage = self.exit()
+
+            if not count_name is None:
+                stage.counts[count_name] = stage.counts.get(count_name, 0) + 1
+
+            yield item
+
+    def count(self, name, count_name, count = 1):
+        stage = self.stage(name)
+        stage.counts[count_name] = stage.counts.get(count_name, 0) + count
+
+    # Replaces the method of obj with one timed in the stage. count, if given,
+    # is called with the stage counts and each result.
+    def wrap(self, obj, method_name, name, count = None):
+        method = getattr(obj, method_name)
+
+        def timed_method(*args, **kwargs):
+            self.enter(name)
+            try:
+                result = method(*args, **kwargs)
+            finally:
+                stage = self.exit()
+
+            if not count is None:
+                count(stage.counts, result)
+
+            return result
+
+        setattr(obj, method_name, timed_method)
+
+    # As wrap for methods returning iterables, timing their iteration
+    def wrap_iterable(self, obj, method_name, name, count_name = None):
+        method = getattr(obj, method_name)
+        setattr(obj, method_name,
+            lambda *args, **kwargs: self.iterate(method(*args, **kwargs), name, count_name))
+
+    def report(self):
+        seconds = time.perf_counter() - self.start_time
+
+        return {
+            "command": sys.argv,
+            "seconds": seconds,
+            "other_seconds": seconds - sum(stage.seconds for stage in self.stages.values()),
+            "peak_rss": peak_rss(),
+            "stages": {name: stage.to_json() for name, stage in self.stages.items()}
+        }
+
+    def finish(self):
+        Instrumentation.finish(self)
+
+        with open(self.stats_path, "w") as stats_file:
+            json.dump(self.report(), stats_file, indent = 2)
+            stats_file.write("\n")
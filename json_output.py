@@ -0,0 +1,76 @@
+import heapq
+import itertools
+try:
+    import simplejson as json
+except ImportError:
+    import json
+from collections import OrderedDict
+
+
+OUTPUT_FORMATS = ["json", "compact", "ndjson"]
+
+def add_arguments(arg_parser, short_option = True):
+    options = ["-of", "--output-format"] if short_option else ["--output-format"]
+    arg_parser.add_argument(*options, choices=OUTPUT_FORMATS, default="json", help="json is indented, compact is JSON without whitespace and ndjson is a JSON object for each entry on its own line")
+
+ENCODERS = {
+    "json": json.JSONEncoder(ensure_ascii = False, indent = 2, separators = (",", ": ")),
+    "compact": json.JSONEncoder(ensure_ascii = False, separators = (",", ":"))
+}
+ENCODERS["ndjson"] = ENCODERS["compact"]
+
+def dumps(value, output_format):
+    return ENCODERS[output_format].encode(value)
+
+# Entries encoded together, amortising the encoder's setup over a bounded
+# amount of text
+CHUNK_ENTRIES = 1024
+
+# Writes the (key, value) pairs of items to output as a JSON object as they're
+# produced, without building the whole object or its text in memory. The json
+# format is the same as printing json.dumps of the object with indent 2.
+def write_object(output, items, output_format = "json"):
+    items = iter(items)
+
+    if output_format == "ndjson":
+        for key, value in items:
+            output.write(dumps({key: value}, output_format) + "\n")
+        return
+
+    # Encoded chunks less their braces are joined by the separator
+    if output_format == "json":
+        start, separator, end, brace_length = "{\n", ",\n", "\n}\n", 2
+    else:
+        start, separator, end, brace_length = "{", ",", "}\n", 1
+
+    empty = True
+    while True:
+        chunk = OrderedDict(itertools.islice(items, CHUNK_ENTRIES))
+        if len(chunk) == 0:
+            break
+
+        output.write(start if empty else separator)
+        output.write(dumps(chunk, output_format)[brace_length:-brace_length])
+        empty = False
+
+    output.write("{}\n" if empty else end)
+
+def sorted_counts(counts):
+    return OrderedDict(sorted(counts.items(), key=lambda o: o[1], reverse=True))
+
+# Keys of a dictionary of dictionaries of counts sorted by reverse total
+# count, only the limit largest partially sorted out if given
+def sorted_keys_by_total(nested_counts, limit = None):
+    total = lambda key: sum(nested_counts[key].values())
+    if limit is None:
+        return sorted(nested_counts, key=total, reverse=True)
+    else:
+        return heapq.nlargest(limit, nested_counts, key=total)
+
+# (key, counts sorted by reverse count) pairs of nested_counts for each of
+# keys, each sorted as it's produced. Entries are removed from nested_counts
+# as they're produced if remove is set, so the sorted copies don't add up.
+def iter_sorted_nested_counts(nested_counts, keys, remove = False):
+    for key in keys:
+        counts = nested_counts.pop(key) if remove else nested_counts[key]
+        yield key, sorted_counts(counts)
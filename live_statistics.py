@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import locale
+import datetime
+import threading
+import collections
+import http.server
+import socketserver
+from argparse import ArgumentParser
+try:
+    import simplejson as json
+except ImportError:
+    import json
+from collections import OrderedDict
+
+import log_reader
+import time_statistics
+import instrumentation
+
+
+# Lines appended to a log file, like tail -F. The file is reopened from the
+# start when it's replaced, as when Plover rotates its log, and read again
+# from the start when it's truncated. Incomplete lines are kept until
+# they're finished.
+class LogFollower:
+    def __init__(self, path, from_start = False):
+        self.path = path
+        self.encoding = locale.getpreferredencoding(False)
+        self.data_file = None
+        self.inode = None
+        self.partial_line = b""
+
+        self.open(from_start)
+
+    def open(self, from_start):
+        try:
+            self.data_file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+
+        self.inode = os.fstat(self.data_file.fileno()).st_ino
+        if not from_start:
+            self.data_file.seek(0, os.SEEK_END)
+
+    def close(self):
+        if not self.data_file is None:
+            self.data_file.close()
+            self.data_file = None
+
+    def read_lines(self):
+        if self.data_file is None:
+            self.open(True)
+            if self.data_file is None:
+                return []
+
+        data = self.data_file.read()
+
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            # Being rotated, the new file is opened once it exists
+            status = None
+
+        if not status is None and status.st_ino != self.inode:
+            # Finish the old file before the new one
+            data += self.data_file.read()
+            self.close()
+            self.open(True)
+            if not self.data_file is None:
+                data += self.data_file.read()
+        elif not status is None and status.st_size < self.data_file.tell():
+            self.data_file.seek(0)
+            self.partial_line = b""
+            data = self.data_file.read()
+
+        lines = (self.partial_line + data).split(b"\n")
+        self.partial_line = lines.pop()
+
+        return [line.decode(self.encoding) + "\n" for line in lines]
+
+# Totals of the log strokes in the last duration of time. Log strokes are
+# added and expired in constant time.
+class RollingWindow:
+    def __init__(self, duration):
+        self.duration = duration
+
+        # (time, stroke count, undo stroke count, characters, undo characters)
+        self.entries = collections.deque()
+        self.stroke_count = 0
+        self.undo_stroke_count = 0
+        self.character_count = 0
+        self.undo_character_count = 0
+
+    def add(self, entry, sign):
+        self.stroke_count += sign*entry[1]
+        self.undo_stroke_count += sign*entry[2]
+        self.character_count += sign*entry[3]
+        self.undo_character_count += sign*entry[4]
+
+    def add_log_stroke(self, log_stroke):
+        undo = log_stroke.stroke == "*"
+        entry = (log_stroke.time,
+            0 if undo else 1,
+            1 if undo else 0,
+            sum(len(translation.text) for translation in log_stroke.do_translations),
+            sum(len(translation.text) for translation in log_stroke.undo_translations))
+
+        self.entries.append(entry)
+        self.add(entry, 1)
+
+    def expire(self, now):
+        while len(self.entries) > 0 and now - self.entries[0][0] > self.duration:
+            self.add(self.entries.popleft(), -1)
+
+# Figures of the log strokes in a rolling window, counting only log strokes
+# while the period filter is active as time_statistics.py does. Derived
+# figures are the same as time_statistics.py's over the window.
+class LiveStatistics:
+    def __init__(self, window, period_filter):
+        self.window = RollingWindow(window)
+        self.period_filter = period_filter
+        self.session_stroke_count = 0
+        self.session_undo_stroke_count = 0
+
+    def add_log_stroke(self, log_stroke):
+        self.period_filter.add_stroke(log_stroke)
+        if self.period_filter.activate_time is None:
+            return
+
+        self.window.add_log_stroke(log_stroke)
+        if log_stroke.stroke == "*":
+            self.session_undo_stroke_count += 1
+        else:
+            self.session_stroke_count += 1
+
+    def figures(self, now):
+        window = self.window
+        window.expire(now)
+
+        minutes = window.duration.total_seconds()/60
+        total_strokes = window.stroke_count + window.undo_stroke_count
+        net_strokes = window.stroke_count - window.undo_stroke_count
+        net_words = (window.character_count - window.undo_character_count)/5
+
+        return OrderedDict([
+            ("active", self.period_filter.active_at(now)),
+            ("strokes", window.stroke_count),
+            ("undo_strokes", window.undo_stroke_count),
+            ("net_words", net_words),
+            ("stroke_per_word", total_strokes/net_words if net_words > 0 else None),
+            ("net_stroke_per_word", net_strokes/net_words if net_words > 0 else None),
+            ("stroke_per_min", total_strokes/minutes),
+            ("net_stroke_per_min", net_strokes/minutes),
+            ("net_word_per_min", net_words/minutes),
+            ("session_strokes", self.session_stroke_count),
+            ("session_undo_strokes", self.session_undo_stroke_count)
+        ])
+
+def create_live_statistics(window, speed_activation):
+    period_filter = time_statistics.NoFilter()
+    if not speed_activation is None:
+        period_filter = time_statistics.SpeedFilter(
+            speed_activation[0],
+            speed_activation[1],
+            datetime.timedelta(seconds = speed_activation[2]))
+
+    return LiveStatistics(datetime.timedelta(seconds = window), period_filter)
+
+
+# Latest figures served to each client connecting over HTTP or a Unix
+# socket, from server threads
+class FiguresServers:
+    def __init__(self):
+        self.figures_json = "{}"
+        self.servers = []
+        self.unix_socket = None
+
+    def serve(self, server):
+        server.daemon_threads = True
+        server.figures_servers = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.servers.append(server)
+
+    def serve_http(self, port):
+        self.serve(http.server.ThreadingHTTPServer(("127.0.0.1", port), HttpFiguresHandler))
+
+    def serve_unix_socket(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        self.serve(socketserver.ThreadingUnixStreamServer(path, UnixSocketFiguresHandler))
+        self.unix_socket = path
+
+    def publish(self, figures_json):
+        self.figures_json = figures_json
+
+    def close(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+        if not self.unix_socket is None:
+            os.remove(self.unix_socket)
+
+class HttpFiguresHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        data = (self.server.figures_servers.figures_json + "\n").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class UnixSocketFiguresHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.wfile.write((self.server.figures_servers.figures_json + "\n").encode("utf-8"))
+
+# Log strokes of the lines appended to a followed log. Translations are
+# processed as soon as later lines can't change their log strokes. Plover can
+# write a stroke's undo and translation lines separately, so undos without
+# translations to decide how they're combined are only processed once the
+# log has had no new lines for flush_delay seconds.
+class LogStrokeFollower:
+    def __init__(self, log_follower, log_processor, flush_delay):
+        self.log_follower = log_follower
+        self.log_processor = log_processor
+        self.flush_delay = flush_delay
+        self.last_lines_time = None
+
+    # Log strokes completed by the lines appended since the last poll, with
+    # times from time.monotonic()
+    def poll(self, monotonic_time):
+        log_strokes = []
+
+        lines = self.log_follower.read_lines()
+        for line in lines:
+            log_strokes += self.log_processor.process_line(line)
+
+        if len(lines) > 0:
+            self.last_lines_time = monotonic_time
+
+        if not self.log_processor.processor.resolved() \
+            and monotonic_time - self.last_lines_time >= self.flush_delay:
+            log_strokes += self.log_processor.finish()
+
+        return log_strokes
+
+# Processes log strokes as they're logged and publishes the figures
+# whenever they change
+def follow(log_stroke_follower, live_statistics, publish, poll_interval, stats):
+    last_figures = None
+    while True:
+        with stats.timed("process"):
+            for log_stroke in log_stroke_follower.poll(time.monotonic()):
+                live_statistics.add_log_stroke(log_stroke)
+
+            now = datetime.datetime.now()
+            figures = live_statistics.figures(now)
+
+        if figures != last_figures:
+            with stats.timed("publish"):
+                last_figures = figures
+                published_figures = OrderedDict([("time", now.isoformat())])
+                published_figures.update(figures)
+                publish(json.dumps(published_figures))
+
+        time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Follow a Plover log as it's written and output rolling statistics of the last window of time whenever they change, as a JSON object on each line of standard out. The latest statistics can also be fetched over HTTP or a Unix socket.")
+    arg_parser.add_argument("log", help="log file path")
+    arg_parser.add_argument("-r", "--resume", help="start recording after encountering this translation")
+    arg_parser.add_argument("-s", "--suspend", help="stop recording when encountering this translation")
+    arg_parser.add_argument("-fc", "--formatting-cache-size", type=int, default=log_reader.DEFAULT_FORMATTING_CACHE_SIZE, help="maximum number of cached translation formattings, 0 to disable")
+    arg_parser.add_argument("--no-formatting", action="store_true", help="don't format translations with Plover, translated text is empty so word counts are 0")
+    arg_parser.add_argument("-sa", "--speed_activation", nargs=3, type=float, help="speed to start recording on (stroke/second), speed to stop recording on (stroke/second), length of window to check speed in (seconds)")
+    arg_parser.add_argument("-w", "--window", type=float, default=60, help="duration of time (seconds) of the rolling window")
+    arg_parser.add_argument("--from-start", action="store_true", help="process the log from the start, by default only lines written after starting are")
+    arg_parser.add_argument("--poll-interval", type=float, default=0.025, help="time (seconds) between checks for new log lines")
+    arg_parser.add_argument("--flush-delay", type=float, default=0.25, help="time (seconds) without new log lines after which undos not yet paired with translations are counted, more than the poll interval as Plover can write a stroke's lines separately")
+    arg_parser.add_argument("-q", "--quiet", action="store_true", help="don't output statistics to standard out")
+    arg_parser.add_argument("--http-port", type=int, help="serve the latest statistics over HTTP on this port of localhost")
+    arg_parser.add_argument("--unix-socket", help="serve the latest statistics to clients connecting to a Unix socket at this path")
+    instrumentation.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    if args.window <= 0:
+        arg_parser.error("--window must be more than 0")
+    if args.poll_interval <= 0:
+        arg_parser.error("--poll-interval must be more than 0")
+    if args.flush_delay <= args.poll_interval:
+        arg_parser.error("--flush-delay must be more than --poll-interval")
+
+    if not args.no_formatting:
+        log_reader.setup_plover_or_exit()
+
+    stats = instrumentation.start(args)
+    log_processor = log_reader.LogProcessor(args.resume, args.suspend,
+        args.formatting_cache_size, not args.no_formatting)
+    live_statistics = create_live_statistics(args.window, args.speed_activation)
+
+    figures_servers = FiguresServers()
+    if not args.http_port is None:
+        figures_servers.serve_http(args.http_port)
+    if not args.unix_socket is None:
+        figures_servers.serve_unix_socket(args.unix_socket)
+
+    def publish(figures_json):
+        figures_servers.publish(figures_json)
+        if not args.quiet:
+            print(figures_json, flush=True)
+
+    log_follower = LogFollower(args.log, args.from_start)
+    try:
+        follow(LogStrokeFollower(log_follower, log_processor, args.flush_delay),
+            live_statistics, publish, args.poll_interval, stats)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_follower.close()
+        figures_servers.close()
+
+    stats.finish()
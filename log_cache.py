@@ -0,0 +1,255 @@
+import log_reader
+
+import os
+import sys
+import mmap
+import array
+import struct
+import pickle
+import hashlib
+import datetime
+try:
+    import simplejson as json
+except ImportError:
+    import json
+
+
+# Cache file layout:
+#   MAGIC
+#   header length (little endian uint64)
+#   header (JSON)
+#   padding to 8 bytes
+#   times (int64 epoch microseconds)
+#   stroke offsets (int32, count + 1)
+#   stroke ids (int32)
+#   translation ids (int32, -1 for None)
+#   text ids (int32)
+#   removals (uint8)
+#   padding to 8 bytes
+#   pickled actions buffer at the end of the file
+MAGIC = b"STENOLC1"
+FORMAT_VERSION = 1
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds = 1)
+
+
+def time_to_epoch_us(time):
+    return (time - EPOCH)//MICROSECOND
+
+def epoch_us_to_time(epoch_us):
+    return EPOCH + datetime.timedelta(microseconds = epoch_us)
+
+def actions_digest(actions):
+    digest = hashlib.sha1()
+    for action in actions:
+        try:
+            digest.update(repr(sorted(vars(action).items())).encode("utf-8"))
+        except TypeError:
+            digest.update(repr(action).encode("utf-8"))
+
+    return digest.hexdigest()
+
+def padding(length):
+    return (8 - length % 8) % 8
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def id(self, string):
+        if not string in self.ids:
+            self.ids[string] = len(self.strings)
+            self.strings.append(string)
+
+        return self.ids[string]
+
+
+class LogCacheWriter:
+    def __init__(self):
+        self.times = array.array("q")
+        self.stroke_offsets = array.array("i", [0])
+        self.stroke_ids = array.array("i")
+        self.translation_ids = array.array("i")
+        self.text_ids = array.array("i")
+        self.removals = array.array("B")
+
+        self.strokes = StringTable()
+        self.translations = StringTable()
+        self.texts = StringTable()
+
+    def add(self, translation, removal):
+        self.times.append(time_to_epoch_us(translation.time))
+        for stroke in translation.strokes:
+            self.stroke_ids.append(self.strokes.id(stroke))
+        self.stroke_offsets.append(len(self.stroke_ids))
+        self.translation_ids.append(-1 if translation.translation is None
+            else self.translations.id(translation.translation))
+        self.text_ids.append(self.texts.id(translation.text))
+        self.removals.append(1 if removal else 0)
+
+    def write(self, path, key, actions_buffer):
+        try:
+            actions_data = pickle.dumps(actions_buffer)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+
+        header = json.dumps({
+            "key": key,
+            "byte_order": sys.byteorder,
+            "count": len(self.times),
+            "stroke_id_count": len(self.stroke_ids),
+            "actions_length": len(actions_data),
+            "strokes": self.strokes.strings,
+            "translations": self.translations.strings,
+            "texts": self.texts.strings
+        }, ensure_ascii = False).encode("utf-8")
+
+        header_length = len(MAGIC) + 8 + len(header)
+
+        temp_path = path + ".tmp" + str(os.getpid())
+        with open(temp_path, "wb") as cache_file:
+            cache_file.write(MAGIC)
+            cache_file.write(struct.pack("<Q", len(header)))
+            cache_file.write(header)
+            cache_file.write(b"\0"*padding(header_length))
+
+            data_length = 0
+            for column in (self.times, self.stroke_offsets, self.stroke_ids,
+                self.translation_ids, self.text_ids, self.removals):
+                column.tofile(cache_file)
+                data_length += len(column)*column.itemsize
+
+            cache_file.write(b"\0"*padding(data_length))
+            cache_file.write(actions_data)
+
+        os.replace(temp_path, path)
+
+        return True
+
+
+class LogCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+        self.hits = 0
+        self.misses = 0
+
+    # Each variant of a log, such as with and without formatting, has its own
+    # cache file so scripts processing it differently don't replace each
+    # other's. Changes to the log itself replace its cache file.
+    def cache_path(self, key):
+        variant = {name: value for name, value in key.items()
+            if not name in ("size", "mtime_ns")}
+        name = hashlib.sha1(json.dumps(variant, sort_keys = True).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, name + ".cache")
+
+    @staticmethod
+    def cache_key(log_file, actions_buffer, format_text):
+        stat = os.stat(log_file)
+        if format_text:
+            log_reader.setup_plover()
+
+        return {
+            "format_version": FORMAT_VERSION,
+            "path": os.path.abspath(log_file),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "format_text": format_text,
+            "system": log_reader.system_name,
+            "plover_version": getattr(log_reader.plover, "__version__", None),
+            # Formatting depends on the actions carried over from earlier logs
+            "actions": actions_digest(actions_buffer)
+        }
+
+    def iter_translations(self, log_file, log_processor):
+        key = LogCache.cache_key(log_file, log_processor.actions_buffer,
+            log_processor.format_text)
+        path = self.cache_path(key)
+
+        cached_translations = self.load(path, key, log_processor)
+        if not cached_translations is None:
+            self.hits += 1
+            for translation in cached_translations:
+                yield translation
+            return
+
+        self.misses += 1
+
+        writer = LogCacheWriter()
+        for translation, removal in log_processor.iter_translations(
+            log_processor.read_lines(log_file)):
+            writer.add(translation, removal)
+            yield translation, removal
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok = True)
+            writer.write(path, key, log_processor.actions_buffer)
+        except OSError as error:
+            print("Error writing log cache: " + str(error), file=sys.stderr)
+
+    def load(self, path, key, log_processor):
+        try:
+            cache_file = open(path, "rb")
+        except OSError:
+            return None
+
+        with cache_file:
+            if cache_file.read(len(MAGIC)) != MAGIC:
+                return None
+
+            header_length = struct.unpack("<Q", cache_file.read(8))[0]
+            try:
+                header = json.loads(cache_file.read(header_length).decode("utf-8"))
+            except ValueError:
+                return None
+
+            if header["key"] != key or header["byte_order"] != sys.byteorder:
+                return None
+
+            data = mmap.mmap(cache_file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        offset = len(MAGIC) + 8 + header_length
+        offset += padding(offset)
+
+        count = header["count"]
+        columns = []
+        for format_, length in (
+            ("q", count),
+            ("i", count + 1),
+            ("i", header["stroke_id_count"]),
+            ("i", count),
+            ("i", count),
+            ("B", count)):
+            size = length*struct.calcsize(format_)
+            columns.append(memoryview(data)[offset:offset + size].cast(format_))
+            offset += size
+
+        actions_data = data[len(data) - header["actions_length"]:]
+        log_processor.actions_buffer = pickle.loads(actions_data)
+
+        return self.iter_cached_translations(data, columns, header)
+
+    @staticmethod
+    def iter_cached_translations(data, columns, header):
+        times, stroke_offsets, stroke_ids, translation_ids, text_ids, removals = columns
+        strokes = header["strokes"]
+        translations = header["translations"]
+        texts = header["texts"]
+
+        try:
+            for i in range(header["count"]):
+                translation_id = translation_ids[i]
+
+                yield log_reader.Translation(
+                    epoch_us_to_time(times[i]),
+                    translations[translation_id] if translation_id >= 0 else None,
+                    [strokes[stroke_id] for stroke_id
+                        in stroke_ids[stroke_offsets[i]:stroke_offsets[i + 1]]],
+                    texts[text_ids[i]]), removals[i] == 1
+        finally:
+            for column in columns:
+                column.release()
+            data.close()
@@ -0,0 +1,239 @@
+import log_reader
+
+import os
+import zipfile
+
+pyarrow = None
+numpy = None
+
+def import_pyarrow():
+    global pyarrow
+
+    if pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            return False
+
+    return True
+
+def import_numpy():
+    global numpy
+
+    if numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+
+    return True
+
+
+FORMATS = ["parquet", "npz"]
+DEFAULT_ROW_GROUP_SIZE = 65536
+
+# Columns of exported log strokes, one row for each log stroke. Translations
+# and strokes are lists of the undo and do translations of the log stroke,
+# with untranslated strokes' translations null. characters is the change in
+# translated text length.
+COLUMNS = ["time", "stroke", "undo", "undo_translations", "undo_strokes",
+    "do_translations", "do_strokes", "characters"]
+
+def output_format(output, format_):
+    if not format_ is None:
+        return format_
+
+    return "npz" if output.endswith(".npz") else "parquet"
+
+def create_writer(output, format_):
+    if format_ == "parquet":
+        return ParquetWriter(output)
+    else:
+        return NpzWriter(output)
+
+# Log strokes written to a writer in row groups of row_group_size rows, so
+# only one row group is kept in memory, in a LogStrokeTable
+class LogStrokeExporter:
+    def __init__(self, writer, row_group_size = DEFAULT_ROW_GROUP_SIZE):
+        self.writer = writer
+        self.row_group_size = row_group_size
+        self.table = log_reader.LogStrokeTable()
+
+    def add_log_stroke(self, log_stroke):
+        self.table.append(log_stroke)
+        if len(self.table) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.table) > 0:
+            self.writer.write_row_group(RowGroup(self.table))
+            self.table = log_reader.LogStrokeTable()
+
+    def finish(self):
+        self.flush()
+        self.writer.close()
+
+    def abort(self):
+        self.writer.abort()
+
+# Columns of a table of log strokes. List columns are flat lists of their
+# items, with offsets the start of each row's items and one more for the
+# end, which the translation and stroke columns of undo_ and do_ share.
+class RowGroup:
+    def __init__(self, table):
+        strokes = table.strokes.strings
+        translations = table.translations.strings
+        texts = table.texts.strings
+        translation_stroke_offsets = table.translation_stroke_offsets
+
+        self.times = table.times
+        self.strokes = [strokes[stroke_id] for stroke_id in table.stroke_ids]
+        self.undos = [stroke == "*" for stroke in self.strokes]
+
+        self.offsets = {"undo_": [0], "do_": [0]}
+        self.columns = {column: [] for column in
+            ("undo_translations", "undo_strokes", "do_translations", "do_strokes")}
+        self.characters = []
+        for i in range(len(table)):
+            start = table.translation_offsets[i]
+            undo_end = start + table.undo_counts[i]
+
+            characters = 0
+            for prefix, translation_range, sign in (
+                ("undo_", range(start, undo_end), -1),
+                ("do_", range(undo_end, table.translation_offsets[i + 1]), 1)):
+                translations_column = self.columns[prefix + "translations"]
+                strokes_column = self.columns[prefix + "strokes"]
+                for j in translation_range:
+                    translation_id = table.translation_ids[j]
+                    translations_column.append(
+                        translations[translation_id] if translation_id >= 0 else None)
+                    strokes_column.append("/".join(strokes[stroke_id] for stroke_id
+                        in table.translation_stroke_ids[
+                            translation_stroke_offsets[j]:translation_stroke_offsets[j + 1]]))
+                    characters += sign*len(texts[table.text_ids[j]])
+
+                self.offsets[prefix].append(len(strokes_column))
+            self.characters.append(characters)
+
+    def __len__(self):
+        return len(self.times)
+
+# Writes to a temporary file that replaces path when closed, or is removed
+# when aborted, so a failed export doesn't leave a partial file behind
+class ExportWriter:
+    def __init__(self, path):
+        self.path = path
+        self.temp_path = path + ".tmp" + str(os.getpid())
+
+    def close(self):
+        os.replace(self.temp_path, self.path)
+
+    def abort(self):
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+class ParquetWriter(ExportWriter):
+    def __init__(self, path):
+        ExportWriter.__init__(self, path)
+
+        self.schema = pyarrow.schema([
+            ("time", pyarrow.timestamp("us")),
+            ("stroke", pyarrow.string()),
+            ("undo", pyarrow.bool_()),
+            ("undo_translations", pyarrow.list_(pyarrow.string())),
+            ("undo_strokes", pyarrow.list_(pyarrow.string())),
+            ("do_translations", pyarrow.list_(pyarrow.string())),
+            ("do_strokes", pyarrow.list_(pyarrow.string())),
+            ("characters", pyarrow.int64())
+        ])
+        self.writer = pyarrow.parquet.ParquetWriter(self.temp_path, self.schema)
+
+    def write_row_group(self, row_group):
+        arrays = [
+            pyarrow.array(row_group.times, type=pyarrow.int64()).cast(pyarrow.timestamp("us")),
+            pyarrow.array(row_group.strokes, type=pyarrow.string()),
+            pyarrow.array(row_group.undos, type=pyarrow.bool_())
+        ]
+        for prefix in ("undo_", "do_"):
+            offsets = pyarrow.array(row_group.offsets[prefix], type=pyarrow.int32())
+            for column in ("translations", "strokes"):
+                arrays.append(pyarrow.ListArray.from_arrays(offsets,
+                    pyarrow.array(row_group.columns[prefix + column], type=pyarrow.string())))
+        arrays.append(pyarrow.array(row_group.characters, type=pyarrow.int64()))
+
+        table = pyarrow.Table.from_arrays(arrays, schema=self.schema)
+        self.writer.write_table(table, row_group_size=len(table))
+
+    def close(self):
+        self.writer.close()
+        ExportWriter.close(self)
+
+    def abort(self):
+        self.writer.close()
+        ExportWriter.abort(self)
+
+# NumPy .npz file with an array for each column of each row group, named
+# <column>.<row group>. Columns are stored as in Arrow. Strings are UTF-8
+# bytes in <column>.<row group> with <column>.offsets.<row group> the start
+# of each string and one more for the end. List columns have
+# <column>.offsets.<row group> the start of each row's items instead, and
+# their strings have <column>.item_offsets.<row group>. Translation lists
+# have <column>.valid.<row group>, false for null translations, which are
+# empty.
+class NpzWriter(ExportWriter):
+    def __init__(self, path):
+        ExportWriter.__init__(self, path)
+
+        self.zip_file = zipfile.ZipFile(self.temp_path, "w", allowZip64=True)
+        self.row_group = 0
+
+    def write_array(self, name, array):
+        with self.zip_file.open(name + "." + str(self.row_group) + ".npy", "w",
+            force_zip64=True) as array_file:
+            numpy.lib.format.write_array(array_file, array, allow_pickle=False)
+
+    @staticmethod
+    def offsets(lengths):
+        offsets = numpy.zeros(len(lengths) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=offsets[1:])
+        return offsets
+
+    # Fixed width string arrays would pad every string to the longest
+    def write_strings(self, name, offsets_name, strings):
+        encoded = [string.encode("utf-8") for string in strings]
+        self.write_array(offsets_name, NpzWriter.offsets([len(data) for data in encoded]))
+        self.write_array(name, numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8))
+
+    def write_list_column(self, name, offsets, values, nullable):
+        self.write_array(name + ".offsets", numpy.array(offsets, dtype=numpy.int64))
+        if nullable:
+            self.write_array(name + ".valid",
+                numpy.array([not value is None for value in values], dtype=bool))
+            values = [value if not value is None else "" for value in values]
+        self.write_strings(name, name + ".item_offsets", values)
+
+    def write_row_group(self, row_group):
+        self.write_array("time", numpy.array(row_group.times, dtype=numpy.int64)
+            .astype("datetime64[us]"))
+        self.write_strings("stroke", "stroke.offsets", row_group.strokes)
+        self.write_array("undo", numpy.array(row_group.undos, dtype=bool))
+        for prefix in ("undo_", "do_"):
+            self.write_list_column(prefix + "translations", row_group.offsets[prefix],
+                row_group.columns[prefix + "translations"], True)
+            self.write_list_column(prefix + "strokes", row_group.offsets[prefix],
+                row_group.columns[prefix + "strokes"], False)
+        self.write_array("characters", numpy.array(row_group.characters, dtype=numpy.int64))
+
+        self.row_group += 1
+
+    def close(self):
+        self.zip_file.close()
+        ExportWriter.close(self)
+
+    def abort(self):
+        self.zip_file.close()
+        ExportWriter.abort(self)
@@ -0,0 +1,77 @@
+import sys
+import re
+import datetime
+
+
+LINE_PATTERN = re.compile(r"""
+    ^(?P<time>[0-9\-:, ]*)
+    (?P<removal>\*?)Translation\(
+    \((?P<strokes>[A-Z\-,'* ]*)\)
+    \s* : \s*
+    (?:(?:\"(?P<translation>(?:[^\\\"]|(?:\\\\)*\\[^\"]|(?:\\\\)*\\\")*)\")|None)
+    \)
+    """,
+    re.VERBOSE)
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+FAST_TIME_PATTERN = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2},[0-9]{1,6}")
+
+MAX_CACHED_STROKES = 100000
+
+
+class LineParser:
+    def __init__(self):
+        self.cached_minute = None
+        self.cached_minute_time = None
+
+        self.cached_strokes = {}
+
+    def parse_time(self, time_str):
+        # Anything not in Plover's usual format goes through strptime
+        if not FAST_TIME_PATTERN.fullmatch(time_str):
+            return datetime.datetime.strptime(time_str, TIME_FORMAT)
+
+        minute = time_str[:16]
+        if minute != self.cached_minute:
+            self.cached_minute_time = datetime.datetime(
+                int(time_str[0:4]),
+                int(time_str[5:7]),
+                int(time_str[8:10]),
+                int(time_str[11:13]),
+                int(time_str[14:16]))
+            self.cached_minute = minute
+
+        return self.cached_minute_time.replace(
+            second = int(time_str[17:19]),
+            microsecond = int(time_str[20:].ljust(6, "0")))
+
+    def parse_strokes(self, strokes_str):
+        if strokes_str in self.cached_strokes:
+            return list(self.cached_strokes[strokes_str])
+
+        strokes = [stroke.strip()[1:-1] for stroke in strokes_str.split(",")]
+        if len(strokes) > 0 and len(strokes[-1]) == 0:
+            strokes = strokes[:-1]
+
+        if len(self.cached_strokes) >= MAX_CACHED_STROKES:
+            self.cached_strokes.clear()
+        self.cached_strokes[strokes_str] = tuple(sys.intern(stroke) for stroke in strokes)
+
+        return list(self.cached_strokes[strokes_str])
+
+    # Returns (time, removal, strokes, translation) or None if the line isn't
+    # a translation
+    def parse_line(self, line):
+        if not "Translation(" in line:
+            return None
+
+        match = LINE_PATTERN.match(line)
+        if not match:
+            return None
+
+        return (
+            self.parse_time(match.group("time").strip()),
+            match.group("removal") == "*",
+            self.parse_strokes(match.group("strokes")),
+            match.group("translation"))
+
@@ -1,13 +1,25 @@
 import sys
 
-try:
-    # Plover setup
-    from plover.config import CONFIG_FILE, Config
-    from plover.registry import registry
-    from plover import system
-    from plover.dictionary.base import create_dictionary, load_dictionary
-
-    def setup():
+# Plover is set up when translations are first formatted, so reading logs
+# without formatting doesn't load its config and plugins
+plover = None
+system_name = None
+
+class PloverSetupError(Exception):
+    pass
+
+def setup_plover():
+    global plover
+    global system_name
+
+    if not plover is None:
+        return
+
+    try:
+        from plover.config import CONFIG_FILE, Config
+        from plover.registry import registry
+        from plover import system
+
         config = Config()
         config.target_file = CONFIG_FILE
         with open(config.target_file, 'rb') as f:
@@ -17,18 +29,44 @@ try:
             system_name = config.get_system_name()
             system.setup(system_name)
 
-    setup()
-
-    import plover.formatting
-except ImportError:
-    print("Error initialising Plover. Make sure Plover is added to PYTHONPATH.")
-    sys.exit()
-
-import re
+        import plover.formatting
+    except ImportError as error:
+        raise PloverSetupError("Error initialising Plover. Make sure Plover is added to PYTHONPATH.") from error
+
+# Sets up Plover for a script, exiting with the error if it can't be
+def setup_plover_or_exit():
+    try:
+        setup_plover()
+    except PloverSetupError as error:
+        print(str(error), file=sys.stderr)
+        sys.exit(1)
+
+import log_parser
+import log_cache
+import stroke_store
+import instrumentation
+
+import os
+import bz2
+import gzip
+import lzma
+import queue
+import array
 import datetime
+import locale
+import threading
+import pickle
+import hashlib
+import functools
+import itertools
+import collections
+import multiprocessing
+from argparse import ArgumentTypeError
 
 
 class Translation:
+    __slots__ = ("time", "translation", "strokes", "text")
+
     def __init__(self, time, translation, strokes, text):
         self.time = time
         self.translation = translation
@@ -36,12 +74,127 @@ class Translation:
         self.text = text
 
 class LogStroke:
+    __slots__ = ("time", "undo_translations", "do_translations", "stroke")
+
     def __init__(self, time, undo_translations, do_translations, stroke):
         self.time = time
         self.undo_translations = undo_translations
         self.do_translations = do_translations
         self.stroke = stroke
 
+# Log strokes stored in columns, for keeping many log strokes in memory.
+# Translations of each log stroke are a range of the translation columns,
+# undo translations first. Items are views with the attributes of
+# LogStroke and Translation.
+class LogStrokeTable:
+    def __init__(self):
+        self.times = array.array("q")
+        self.stroke_ids = array.array("i")
+        self.translation_offsets = array.array("i", [0])
+        self.undo_counts = array.array("i")
+
+        self.translation_times = array.array("q")
+        self.translation_ids = array.array("i")
+        self.text_ids = array.array("i")
+        self.translation_stroke_offsets = array.array("i", [0])
+        self.translation_stroke_ids = array.array("i")
+
+        self.strokes = log_cache.StringTable()
+        self.translations = log_cache.StringTable()
+        self.texts = log_cache.StringTable()
+
+    def append(self, log_stroke):
+        self.times.append(log_cache.time_to_epoch_us(log_stroke.time))
+        self.stroke_ids.append(self.strokes.id(log_stroke.stroke))
+
+        for translation in log_stroke.undo_translations:
+            self.append_translation(translation)
+        for translation in log_stroke.do_translations:
+            self.append_translation(translation)
+        self.translation_offsets.append(len(self.translation_ids))
+        self.undo_counts.append(len(log_stroke.undo_translations))
+
+    def append_translation(self, translation):
+        self.translation_times.append(log_cache.time_to_epoch_us(translation.time))
+        self.translation_ids.append(-1 if translation.translation is None
+            else self.translations.id(translation.translation))
+        self.text_ids.append(self.texts.id(translation.text))
+        for stroke in translation.strokes:
+            self.translation_stroke_ids.append(self.strokes.id(stroke))
+        self.translation_stroke_offsets.append(len(self.translation_stroke_ids))
+
+    def extend(self, log_strokes):
+        for log_stroke in log_strokes:
+            self.append(log_stroke)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("log stroke index out of range")
+
+        return LogStrokeView(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield LogStrokeView(self, i)
+
+class LogStrokeView:
+    __slots__ = ("table", "i")
+
+    def __init__(self, table, i):
+        self.table = table
+        self.i = i
+
+    @property
+    def time(self):
+        return log_cache.epoch_us_to_time(self.table.times[self.i])
+
+    @property
+    def stroke(self):
+        return self.table.strokes.strings[self.table.stroke_ids[self.i]]
+
+    @property
+    def undo_translations(self):
+        start = self.table.translation_offsets[self.i]
+        return [TranslationView(self.table, i)
+            for i in range(start, start + self.table.undo_counts[self.i])]
+
+    @property
+    def do_translations(self):
+        start = self.table.translation_offsets[self.i] + self.table.undo_counts[self.i]
+        return [TranslationView(self.table, i)
+            for i in range(start, self.table.translation_offsets[self.i + 1])]
+
+class TranslationView:
+    __slots__ = ("table", "i")
+
+    def __init__(self, table, i):
+        self.table = table
+        self.i = i
+
+    @property
+    def time(self):
+        return log_cache.epoch_us_to_time(self.table.translation_times[self.i])
+
+    @property
+    def translation(self):
+        translation_id = self.table.translation_ids[self.i]
+        return self.table.translations.strings[translation_id] if translation_id >= 0 else None
+
+    @property
+    def strokes(self):
+        stroke_offsets = self.table.translation_stroke_offsets
+        return [self.table.strokes.strings[stroke_id] for stroke_id
+            in self.table.translation_stroke_ids[stroke_offsets[self.i]:stroke_offsets[self.i + 1]]]
+
+    @property
+    def text(self):
+        return self.table.texts.strings[self.table.text_ids[self.i]]
+
 class TranslationsProcessor:
     def __init__(self):
         self.undos = []
@@ -122,85 +275,620 @@ class TranslationsProcessor:
 
         return strokes
 
-def process_log(lines, resume, suspend):
-    recording = resume is None
+    # Whether translations before the next undo can't change the log strokes
+    # of the pending translations, so they can be processed straight away.
+    # Automatic redo translations are known once the translations after the
+    # undos cover the undone strokes before the last, otherwise the first
+    # translation after the undos decides how they're combined.
+    def resolved(self):
+        if len(self.undos) == 0:
+            return True
+        if len(self.dos) == 0:
+            return False
 
-    processor = TranslationsProcessor()
-    is_previous_translation_removal = False
+        redo_stroke_count = len(self.undos[-1].strokes) - 1
+        if redo_stroke_count >= len(self.dos[0].strokes):
+            return sum(len(translation.strokes) for translation in self.dos) >= redo_stroke_count
 
-    log_strokes = []
-    actions_buffer = []
+        return True
 
-    for line in lines:
-        match = re.match(r"""
-            ^(?P<time>[0-9\-:, ]*)
-            (?P<removal>\*?)Translation\(
-            \((?P<strokes>[A-Z\-,'* ]*)\)
-            \s* : \s*
-            (?:(?:\"(?P<translation>(?:[^\\\"]|(?:\\\\)*\\[^\"]|(?:\\\\)*\\\")*)\")|None)
-            \)
-            """,
-            line,
-            re.VERBOSE)
-
-        if match:
-            removal = match.group("removal") == "*"
-
-            strokes = match.group("strokes").split(",")
-            strokes[:] = [stroke.strip()[1:-1] for stroke in strokes]
-            if len(strokes) > 0 and len(strokes[-1]) == 0:
-                strokes = strokes[:-1]
-
-            actions = []
-            if not match.group("translation") is None:
-                actions = plover.formatting._translation_to_actions(
-                    match.group("translation"),
-                    actions_buffer[-1] if len(actions_buffer) > 0 else plover.formatting._Action(),
-                    False)
-
-            actions_text = ""
-            for action in actions:
-                actions_text += action.text
-
-            translation = Translation(
-                datetime.datetime.strptime(match.group("time").strip(), "%Y-%m-%d %H:%M:%S,%f"),
-                match.group("translation"),
-                strokes,
-                actions_text)
+DEFAULT_FORMATTING_CACHE_SIZE = 65536
+MAX_ACTIONS_BUFFER = 1024
+
+class TranslationFormatter:
+    def __init__(self, cache_size = DEFAULT_FORMATTING_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def action_state(action):
+        try:
+            state = tuple(sorted(vars(action).items()))
+            hash(state)
+            return state
+        except TypeError:
+            return None
+
+    def translation_to_actions(self, translation, last_action):
+        key = None
+        if self.cache_size > 0:
+            last_action_state = TranslationFormatter.action_state(last_action)
+            if not last_action_state is None:
+                key = (translation, last_action_state)
+
+        if not key is None and key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        self.misses += 1
+        setup_plover()
+        actions = plover.formatting._translation_to_actions(translation, last_action, False)
+
+        if not key is None:
+            self.cache[key] = actions
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last = False)
+
+        return actions
+
+# Without format_text translations aren't formatted and their text is empty
+class LogProcessor:
+    def __init__(self, resume, suspend,
+        formatting_cache_size = DEFAULT_FORMATTING_CACHE_SIZE, format_text = True):
+        self.resume = resume
+        self.suspend = suspend
+        self.recording = resume is None
+
+        self.processor = TranslationsProcessor()
+        self.is_previous_translation_removal = False
+
+        self.actions_buffer = []
+        self.formatter = TranslationFormatter(formatting_cache_size)
+        self.format_text = format_text
+
+        self.line_parser = log_parser.LineParser()
+
+        # Whether finish processed undos later lines could still have paired
+        # differently
+        self.finished_unresolved = False
 
+    def last_action(self):
+        if not self.format_text:
+            return None
 
+        if len(self.actions_buffer) > 0:
+            return self.actions_buffer[-1]
+
+        setup_plover()
+        return plover.formatting._Action()
+
+    def translation_actions(self, translation_str, last_action):
+        if translation_str is None or not self.format_text:
+            return []
+
+        return self.formatter.translation_to_actions(translation_str, last_action)
+
+    def translate_line(self, line):
+        parsed_line = self.line_parser.parse_line(line)
+        if parsed_line is None:
+            return None
+
+        time, removal, strokes, translation_str = parsed_line
+
+        actions = self.translation_actions(translation_str, self.last_action())
+
+        return self.apply_actions(time, removal, strokes, translation_str, actions)
+
+    def apply_actions(self, time, removal, strokes, translation_str, actions):
+        actions_text = ""
+        for action in actions:
+            actions_text += action.text
+
+        translation = Translation(time, translation_str, strokes, actions_text)
+
+
+        if removal:
+            for action in reversed(actions):
+                if len(self.actions_buffer) > 0 and action == self.actions_buffer[-1]:
+                    self.actions_buffer.pop()
+                else:
+                    # Error undoing actions
+                    break
+        else:
+            self.actions_buffer += actions
+
+            # Only the most recent actions can be undone
+            if len(self.actions_buffer) > 2*MAX_ACTIONS_BUFFER:
+                del self.actions_buffer[:-MAX_ACTIONS_BUFFER]
+
+        return translation, removal
+
+    def add_translation(self, translation, removal):
+        log_strokes = []
+
+        if translation.translation == self.resume:
+            self.recording = True
+
+            log_strokes = self.processor.process_translations()
+
+        elif translation.translation == self.suspend:
+            self.recording = False
+
+            log_strokes = self.processor.process_translations()
+
+        elif self.recording:
             if removal:
-                for action in reversed(actions):
-                    if action == actions_buffer[-1]:
-                        actions_buffer.pop()
-                    else:
-                        # Error undoing actions
-                        break
+                if not self.is_previous_translation_removal:
+                    log_strokes = self.processor.process_translations()
+
+                self.processor.undos.append(translation)
             else:
-                actions_buffer += actions
+                self.processor.dos.append(translation)
+                if self.processor.resolved():
+                    log_strokes = self.processor.process_translations()
 
+            self.is_previous_translation_removal = removal
 
-            if translation.translation == resume:
-                recording = True
+        return log_strokes
 
-                log_strokes += processor.process_translations()
+    def process_line(self, line):
+        translated_line = self.translate_line(line)
+        if translated_line is None:
+            return []
 
-            elif translation.translation == suspend:
-                recording = False
+        return self.add_translation(*translated_line)
 
-                log_strokes += processor.process_translations()
+    def finish(self):
+        self.finished_unresolved = not self.processor.resolved()
+        return self.processor.process_translations()
 
-            elif recording:
-                if removal:
-                    if not is_previous_translation_removal:
-                        log_strokes += processor.process_translations()
+    def iter_log_strokes(self, lines):
+        for line in lines:
+            for log_stroke in self.process_line(line):
+                yield log_stroke
 
-                    processor.undos.append(translation)
-                else:
-                    processor.dos.append(translation)
+        for log_stroke in self.finish():
+            yield log_stroke
+
+    def iter_files_log_strokes(self, files, log_cache = None):
+        for log_file in files:
+            if log_cache is None:
+                translations = self.iter_translations(self.read_lines(log_file))
+            else:
+                translations = log_cache.iter_translations(log_file, self)
+
+            for translation, removal in translations:
+                for log_stroke in self.add_translation(translation, removal):
+                    yield log_stroke
+
+        for log_stroke in self.finish():
+            yield log_stroke
+
+    # Log lines are translated by workers a chunk at a time, with only a few
+    # chunks per worker read ahead so memory doesn't grow with the logs.
+    # Plover is set up before the workers start, so forked workers inherit
+    # it and failing to set it up is raised here rather than in a worker.
+    def iter_parallel_files_log_strokes(self, files, jobs):
+        if self.format_text:
+            setup_plover()
+
+        translate = functools.partial(translate_log_lines,
+            formatting_cache_size = self.formatter.cache_size,
+            format_text = self.format_text)
+
+        with multiprocessing.Pool(jobs) as pool:
+            pending_results = collections.deque()
+            lines = iter_log_lines(files)
+            while True:
+                chunk = list(itertools.islice(lines, PARALLEL_CHUNK_LINES))
+                if len(chunk) > 0:
+                    pending_results.append(pool.apply_async(translate, (chunk,)))
+                if len(pending_results) == 0:
+                    break
+                if len(chunk) > 0 and len(pending_results) < PARALLEL_CHUNKS_PER_JOB*jobs:
+                    continue
+
+                translated_lines, hits, misses = pending_results.popleft().get()
+                self.formatter.hits += hits
+                self.formatter.misses += misses
+
+                for translated_line in translated_lines:
+                    for log_stroke in self.add_translation(
+                        *self.apply_translated_line(translated_line)):
+                        yield log_stroke
+
+        for log_stroke in self.finish():
+            yield log_stroke
+
+    # Lines are translated by workers starting from empty formatting state,
+    # only reformat when the actual previous action differs
+    def apply_translated_line(self, translated_line):
+        time, removal, strokes, translation_str, actions, last_action = translated_line
+
+        actual_last_action = self.last_action()
+        if not translation_str is None and not last_action == actual_last_action:
+            actions = self.translation_actions(translation_str, actual_last_action)
+
+        return self.apply_actions(time, removal, strokes, translation_str, actions)
+
+    def read_lines(self, log_file):
+        return iter_log_lines([log_file])
+
+    def iter_translations(self, lines):
+        for line in lines:
+            translated_line = self.translate_line(line)
+            if not translated_line is None:
+                yield translated_line
+
+    # Strokes still pending at the end of the logs are saved in the checkpoint
+    # and aren't included in the saved aggregates
+    def iter_checkpoint_log_strokes(self, files, checkpoint, aggregates):
+        if not checkpoint.processor_state is None:
+            self.restore_checkpoint_state(checkpoint.processor_state)
+
+        for log_file in files:
+            for line in checkpoint.iter_new_log_lines(log_file):
+                for log_stroke in self.process_line(line):
+                    yield log_stroke
+
+        checkpoint.processor_state = self.checkpoint_state()
+        checkpoint.aggregates = aggregates
+        checkpoint.save()
+
+        for log_stroke in self.finish():
+            yield log_stroke
+
+    def checkpoint_state(self):
+        return {
+            "resume": self.resume,
+            "suspend": self.suspend,
+            "recording": self.recording,
+            "undos": self.processor.undos,
+            "dos": self.processor.dos,
+            "is_previous_translation_removal": self.is_previous_translation_removal,
+            "actions_buffer": self.actions_buffer
+        }
+
+    def restore_checkpoint_state(self, state):
+        self.resume = state["resume"]
+        self.suspend = state["suspend"]
+        self.recording = state["recording"]
+        self.processor.undos = state["undos"]
+        self.processor.dos = state["dos"]
+        self.is_previous_translation_removal = state["is_previous_translation_removal"]
+        self.actions_buffer = state["actions_buffer"]
+
+    def formatting_cache_stats(self):
+        return "formatting cache: " \
+            + str(self.formatter.hits) + " hits, " \
+            + str(self.formatter.misses) + " misses"
+
+# Log lines translated by a worker at a time, and the chunks per job
+# translated or waiting to be
+PARALLEL_CHUNK_LINES = 20000
+PARALLEL_CHUNKS_PER_JOB = 2
+
+# Lines translated by a worker starting from empty formatting state
+def translate_log_lines(lines, formatting_cache_size = DEFAULT_FORMATTING_CACHE_SIZE,
+    format_text = True):
+    log_processor = LogProcessor(None, None, formatting_cache_size, format_text)
+
+    translated_lines = []
+    for line in lines:
+        parsed_line = log_processor.line_parser.parse_line(line)
+        if parsed_line is None:
+            continue
+
+        time, removal, strokes, translation_str = parsed_line
+
+        last_action = log_processor.last_action()
+        actions = log_processor.translation_actions(translation_str, last_action)
+        log_processor.apply_actions(time, removal, strokes, translation_str, actions)
+
+        translated_lines.append((time, removal, strokes, translation_str, actions, last_action))
+
+    return (translated_lines,
+        log_processor.formatter.hits,
+        log_processor.formatter.misses)
+
+def iter_process_log(lines, resume, suspend,
+    formatting_cache_size = DEFAULT_FORMATTING_CACHE_SIZE):
+    return LogProcessor(resume, suspend, formatting_cache_size).iter_log_strokes(lines)
+
+def process_log(lines, resume, suspend,
+    formatting_cache_size = DEFAULT_FORMATTING_CACHE_SIZE):
+    return list(iter_process_log(lines, resume, suspend, formatting_cache_size))
+
+# Rotated logs are often compressed (eg/ strokes.log.1.gz), compressed logs
+# are opened by their extension
+COMPRESSED_LOG_OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+
+def open_log(log_file, mode = "rt"):
+    opener = COMPRESSED_LOG_OPENERS.get(os.path.splitext(log_file)[1], open)
+    return opener(log_file, mode)
+
+# Characters read at a time, and the number of chunks read ahead of parsing
+READ_CHUNK_SIZE = 1 << 20
+READ_AHEAD_CHUNKS = 8
+
+# Lines of a log read in chunks by a thread, so reading and decompressing
+# overlap with parsing. Lines are split as in text files, with universal
+# newlines.
+def iter_log_file_lines(log_file):
+    chunks = queue.Queue(READ_AHEAD_CHUNKS)
+    stop = threading.Event()
+
+    def read_chunks():
+        try:
+            with open_log(log_file) as data_file:
+                while not stop.is_set():
+                    chunk = data_file.read(READ_CHUNK_SIZE)
+                    chunks.put(chunk)
+                    if len(chunk) == 0:
+                        return
+        except Exception as error:
+            chunks.put(error)
+
+    reader = threading.Thread(target=read_chunks, daemon=True)
+    reader.start()
+
+    try:
+        partial_line = ""
+        while True:
+            chunk = chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            if len(chunk) == 0:
+                break
+
+            lines = (partial_line + chunk).split("\n")
+            partial_line = lines.pop()
+            for line in lines:
+                yield line + "\n"
+
+        if len(partial_line) > 0:
+            yield partial_line
+    finally:
+        # Unblock the reader if it's waiting for room in the queue
+        stop.set()
+        while reader.is_alive():
+            try:
+                chunks.get(timeout = 0.01)
+            except queue.Empty:
+                pass
+
+def iter_log_lines(files):
+    for log_file in files:
+        for line in iter_log_file_lines(log_file):
+            yield line
+
+def iter_log_strokes(files, resume, suspend,
+    formatting_cache_size = DEFAULT_FORMATTING_CACHE_SIZE):
+    return iter_process_log(iter_log_lines(files), resume, suspend, formatting_cache_size)
+
+TIME_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+# Absolute times as in logs (2017-02-24 or 2017-02-24 23:40:07) or times
+# before now (30m, 12h, 7d or 2w)
+def parse_time(value):
+    if len(value) > 1 and value[-1] in TIME_UNITS and value[:-1].isdigit():
+        return datetime.datetime.now() \
+            - datetime.timedelta(seconds = int(value[:-1])*TIME_UNITS[value[-1]])
+
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise ArgumentTypeError("invalid time " + repr(value)
+            + ", expected YYYY-MM-DD[ HH:MM[:SS]] or a number of m, h, d or w ago")
+
+# Without database the --database option isn't added, for commands that
+# only read log files
+def add_log_arguments(arg_parser, database = True):
+    arg_parser.add_argument("logs", nargs="*",
+        help="log file paths, .gz, .xz and .bz2 logs are decompressed, not needed with --database" if database else "log file paths, .gz, .xz and .bz2 logs are decompressed")
+    arg_parser.add_argument("-r", "--resume", help="start recording after encountering this translation")
+    arg_parser.add_argument("-s", "--suspend", help="stop recording when encountering this translation")
+    arg_parser.add_argument("-fc", "--formatting-cache-size", type=int, default=DEFAULT_FORMATTING_CACHE_SIZE, help="maximum number of cached translation formattings, 0 to disable")
+    arg_parser.add_argument("--formatting-cache-stats", action="store_true", help="output formatting cache hit and miss counts on standard error")
+    arg_parser.add_argument("--no-formatting", action="store_true", help="don't format translations with Plover, translated text is empty so character counts are 0")
+    arg_parser.add_argument("--cache-dir", help="directory to cache processed logs in, unchanged logs are loaded from the cache on later runs")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=1, help="number of processes to process log files with")
+    arg_parser.add_argument("--checkpoint", help="checkpoint file, logs are only processed from where the previous run with this checkpoint stopped and results are added to its results")
+    if database:
+        arg_parser.add_argument("--database", help="read log strokes from this database made by steno_stats.py ingest instead of log files")
+    else:
+        arg_parser.set_defaults(database = None)
+    arg_parser.add_argument("--since", type=parse_time, help="only log strokes at or after this time, YYYY-MM-DD[ HH:MM[:SS]] or a number of minutes, hours, days or weeks ago such as 7d")
+    arg_parser.add_argument("--until", type=parse_time, help="only log strokes before this time, as --since")
+    instrumentation.add_arguments(arg_parser)
+
+def check_log_arguments(arg_parser, args):
+    if args.database is None and len(args.logs) == 0:
+        arg_parser.error("the following arguments are required: logs")
+    if args.jobs > 1 and (not args.cache_dir is None or not args.checkpoint is None):
+        arg_parser.error("--jobs can't be used with --cache-dir or --checkpoint")
+    if not args.checkpoint is None and (not args.since is None or not args.until is None):
+        arg_parser.error("--since and --until can't be used with --checkpoint")
+
+    if not args.database is None:
+        if len(args.logs) > 0:
+            arg_parser.error("logs can't be given with --database, add them with steno_stats.py ingest")
+        if not args.resume is None or not args.suspend is None:
+            arg_parser.error("--resume and --suspend are applied when logs are ingested")
+        if not args.cache_dir is None or args.jobs > 1 or not args.checkpoint is None:
+            arg_parser.error("--database can't be used with --cache-dir, --jobs or --checkpoint")
+        if not os.path.exists(args.database):
+            arg_parser.error("database " + args.database + " doesn't exist")
+
+def filter_time_range(log_strokes, since, until):
+    for log_stroke in log_strokes:
+        if (since is None or log_stroke.time >= since) \
+            and (until is None or log_stroke.time < until):
+            yield log_stroke
+
+# Times the stages of processing logs. Methods are only replaced when
+# instrumentation is on, so it costs nothing otherwise.
+def instrument_log_processor(stats, log_processor):
+    if not stats.enabled:
+        return
+
+    def count_translations(counts, parsed_line):
+        if not parsed_line is None:
+            counts["translations"] = counts.get("translations", 0) + 1
+
+    def count_log_strokes(counts, log_strokes):
+        counts["log_strokes"] = counts.get("log_strokes", 0) + len(log_strokes)
+
+    stats.wrap_iterable(log_processor, "read_lines", "read_lines", "lines")
+    stats.wrap(log_processor.line_parser, "parse_line", "parse_line", count_translations)
+    stats.wrap(log_processor.line_parser, "parse_time", "parse_time")
+    stats.wrap(log_processor.line_parser, "parse_strokes", "parse_strokes")
+    stats.wrap(log_processor.formatter, "translation_to_actions", "format")
+    stats.wrap(log_processor.processor, "process_translations", "process_translations",
+        count_log_strokes)
+
+# Returns the log processor, its log strokes and the aggregates to add them
+# to, which are loaded from the checkpoint if there is one. Aggregates that
+# don't use translated text pass format_text False so Plover isn't needed.
+# Log processing is timed in stats, with the time not in a more specific
+# stage counted in the log_processing stage.
+def open_log_strokes(args, aggregates, checkpoint_arguments, format_text = True,
+    stats = None):
+    if stats is None:
+        stats = instrumentation.Instrumentation()
+
+    format_text = format_text and not args.no_formatting
+    log_processor = LogProcessor(args.resume, args.suspend, args.formatting_cache_size,
+        format_text)
+
+    # Reading logs with formatting sets up Plover at the first translation,
+    # so a missing Plover is reported before starting
+    if format_text and args.database is None:
+        with stats.timed("setup_plover"):
+            setup_plover_or_exit()
+
+    if not args.database is None:
+        log_strokes = stroke_store.StrokeStore(args.database, True).iter_log_strokes(
+            args.since, args.until)
+    elif args.jobs > 1:
+        log_strokes = log_processor.iter_parallel_files_log_strokes(args.logs, args.jobs)
+    elif args.checkpoint is None:
+        log_strokes = log_processor.iter_files_log_strokes(args.logs,
+            log_cache.LogCache(args.cache_dir) if not args.cache_dir is None else None)
+    else:
+        checkpoint = LogCheckpoint.open(args.checkpoint,
+            [args.resume, args.suspend, format_text] + checkpoint_arguments,
+            args.logs)
+        if not checkpoint.aggregates is None:
+            aggregates = checkpoint.aggregates
+
+        log_strokes = log_processor.iter_checkpoint_log_strokes(args.logs, checkpoint, aggregates)
+
+    if args.database is None and (not args.since is None or not args.until is None):
+        log_strokes = filter_time_range(log_strokes, args.since, args.until)
+
+    instrument_log_processor(stats, log_processor)
+    log_strokes = stats.iterate(log_strokes, "log_processing", "log_strokes")
+
+    return log_processor, log_strokes, aggregates
+
+def print_formatting_cache_stats(args, log_processor):
+    if args.formatting_cache_stats:
+        print(log_processor.formatting_cache_stats(), file=sys.stderr)
+
+
+CHECKPOINT_PREFIX_LENGTH = 4096
+
+class CheckpointError(Exception):
+    pass
+
+class LogCheckpoint:
+    def __init__(self, path, arguments):
+        self.path = path
+        self.arguments = arguments
+
+        # Log file path -> (offset, prefix length, prefix digest)
+        self.log_offsets = {}
+        self.processor_state = None
+        self.aggregates = None
+
+    @staticmethod
+    def load(path, arguments):
+        try:
+            with open(path, "rb") as checkpoint_file:
+                checkpoint = pickle.load(checkpoint_file)
+        except FileNotFoundError:
+            return LogCheckpoint(path, arguments)
+
+        if checkpoint.arguments != arguments:
+            raise CheckpointError("Checkpoint " + path
+                + " was saved with different arguments " + str(checkpoint.arguments))
+
+        checkpoint.path = path
+
+        return checkpoint
+
+    @staticmethod
+    def open(path, arguments, files):
+        try:
+            checkpoint = LogCheckpoint.load(path, arguments)
+            for log_file in files:
+                with open_log(log_file, "rb") as data_file:
+                    checkpoint.check_log(log_file, data_file)
+
+            return checkpoint
+        except CheckpointError as error:
+            print(str(error), file=sys.stderr)
+            sys.exit(1)
+
+    def save(self):
+        temp_path = self.path + ".tmp" + str(os.getpid())
+        with open(temp_path, "wb") as checkpoint_file:
+            pickle.dump(self, checkpoint_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def prefix_digest(data_file, length):
+        data_file.seek(0)
+        return hashlib.sha1(data_file.read(length)).hexdigest()
+
+    # Returns the offset to continue reading the log from
+    def check_log(self, log_file, data_file):
+        log_path = os.path.abspath(log_file)
+        if not log_path in self.log_offsets:
+            return 0
+
+        offset, prefix_length, prefix_digest = self.log_offsets[log_path]
+
+        data_file.seek(0, os.SEEK_END)
+        if data_file.tell() < offset \
+            or LogCheckpoint.prefix_digest(data_file, prefix_length) != prefix_digest:
+            raise CheckpointError("Log " + log_file
+                + " has changed since the checkpoint, it can only be appended to")
+
+        return offset
+
+    def iter_new_log_lines(self, log_file):
+        log_path = os.path.abspath(log_file)
+        encoding = locale.getpreferredencoding(False)
+
+        with open_log(log_file, "rb") as data_file:
+            offset = self.check_log(log_file, data_file)
+
+            data_file.seek(offset)
+            for line in data_file:
+                # Leave incomplete lines for the next run
+                if not line.endswith(b"\n"):
+                    break
 
-                is_previous_translation_removal = removal
+                offset += len(line)
+                yield line.decode(encoding)
 
-    log_strokes += processor.process_translations()
+            prefix_length = min(offset, CHECKPOINT_PREFIX_LENGTH)
+            prefix_digest = LogCheckpoint.prefix_digest(data_file, prefix_length)
 
-    return log_strokes
+        self.log_offsets[log_path] = (offset, prefix_length, prefix_digest)
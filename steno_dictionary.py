@@ -0,0 +1,346 @@
+from stroke_trie import StrokeTrie
+
+import os
+import re
+import sys
+import mmap
+import array
+import struct
+import hashlib
+try:
+    import simplejson as json
+except ImportError:
+    import json
+scanstring = json.decoder.scanstring
+
+
+# Compiled dictionary file layout:
+#   MAGIC
+#   header length (little endian uint64)
+#   header (JSON)
+#   padding to 8 bytes
+#   translation offsets (int64, entry count + 1)
+#   entry stroke offsets (int32, entry count + 1)
+#   entry stroke ids (int32)
+#   entries sorted by stroke ids (int32, entry count)
+#   trie columns
+#   translations (UTF-8)
+MAGIC = b"STENODC1"
+FORMAT_VERSION = 1
+
+JSON_CHUNK_SIZE = 1 << 16
+
+def padding(length):
+    return (8 - length % 8) % 8
+
+
+JSON_STRING = r'"(?:[^"\\]|\\.)*"'
+JSON_START = re.compile(r"\s*\{\s*(\})?")
+JSON_ENTRY = re.compile(r"\s*(" + JSON_STRING + r")\s*:\s*(" + JSON_STRING + r")\s*(,|\})", re.DOTALL)
+
+# Stroke and translation pairs of a JSON dictionary file read a chunk at a
+# time, in the file's order including pairs with the same strokes
+def iter_json_dictionary(data_file, chunk_size = JSON_CHUNK_SIZE):
+    buffer = ""
+    position = 0
+    finished = False
+
+    def read():
+        data = data_file.read(chunk_size)
+        return buffer[position:] + data, 0, len(data) == 0
+
+    started = False
+    while True:
+        if not started:
+            match = JSON_START.match(buffer, position)
+            if match is None or (match.end() == len(buffer) and not finished):
+                if finished:
+                    raise ValueError("Dictionary is not a JSON object")
+                buffer, position, finished = read()
+                continue
+
+            started = True
+            position = match.end()
+            if not match.group(1) is None:
+                return
+
+        match = JSON_ENTRY.match(buffer, position)
+        if match is None:
+            if finished:
+                raise ValueError("Dictionary entries must be strings at character "
+                    + str(position))
+            buffer, position, finished = read()
+            continue
+
+        yield scanstring(buffer, match.start(1) + 1)[0], scanstring(buffer, match.start(2) + 1)[0]
+
+        position = match.end()
+        if match.group(3) == "}":
+            return
+
+
+# Merged dictionaries with entries in the order they were first defined.
+# Entries are stored as stroke id arrays with a trie of their strokes and an
+# index of entries sorted by strokes.
+class Dictionary:
+    def __init__(self, entries):
+        strokes_list = [tuple(strokes_str.split("/")) for strokes_str in entries.keys()]
+        self.trie = StrokeTrie(strokes_list)
+
+        self.entry_stroke_offsets = array.array("i", [0])
+        self.entry_stroke_ids = array.array("i")
+        for strokes in strokes_list:
+            self.entry_stroke_ids.extend(self.trie.stroke_id(stroke) for stroke in strokes)
+            self.entry_stroke_offsets.append(len(self.entry_stroke_ids))
+
+        translations = [translation.encode("utf-8") for translation in entries.values()]
+        self.translation_offsets = array.array("q", [0])
+        for translation in translations:
+            self.translation_offsets.append(self.translation_offsets[-1] + len(translation))
+        self.translations = b"".join(translations)
+
+        self.sorted_entries = array.array("i", sorted(range(len(strokes_list)),
+            key=lambda entry: self.entry_ids(entry)))
+
+        self.path = None
+        self.data = None
+
+    # Entries of earlier dictionaries take precedence over later ones, as in
+    # Plover where the dictionary at the top of the list does, or the other
+    # way around with later_overrides. Within a dictionary a later pair
+    # replaces an earlier one with the same strokes, as when it's loaded as
+    # JSON.
+    @staticmethod
+    def from_json_files(dictionary_files, later_overrides = False):
+        entries = {}
+        for dictionary_file in dictionary_files:
+            file_entries = {}
+            with open(dictionary_file, encoding = "utf-8") as data_file:
+                for strokes_str, translation in iter_json_dictionary(data_file):
+                    file_entries[strokes_str] = translation
+
+            for strokes_str, translation in file_entries.items():
+                if later_overrides:
+                    entries[strokes_str] = translation
+                else:
+                    entries.setdefault(strokes_str, translation)
+
+        return Dictionary(entries)
+
+    def __len__(self):
+        return len(self.entry_stroke_offsets) - 1
+
+    def entry_ids(self, entry):
+        return tuple(self.entry_stroke_ids[
+            self.entry_stroke_offsets[entry]:self.entry_stroke_offsets[entry + 1]])
+
+    def entry_strokes(self, entry):
+        return tuple(self.trie.strokes[stroke_id] for stroke_id in self.entry_ids(entry))
+
+    def entry_key(self, entry):
+        return "/".join(self.entry_strokes(entry))
+
+    def translation(self, entry):
+        return bytes(self.translations[
+            self.translation_offsets[entry]:self.translation_offsets[entry + 1]]).decode("utf-8")
+
+    # Entry with strokes_str as its strokes, -1 if there isn't one
+    def find(self, strokes_str):
+        stroke_ids = []
+        for stroke in strokes_str.split("/"):
+            stroke_id = self.trie.stroke_id(stroke)
+            if stroke_id < 0:
+                return -1
+            stroke_ids.append(stroke_id)
+        stroke_ids = tuple(stroke_ids)
+
+        start = 0
+        end = len(self.sorted_entries)
+        while start < end:
+            middle = (start + end)//2
+            if self.entry_ids(self.sorted_entries[middle]) < stroke_ids:
+                start = middle + 1
+            else:
+                end = middle
+
+        if start < len(self.sorted_entries) \
+            and self.entry_ids(self.sorted_entries[start]) == stroke_ids:
+            return self.sorted_entries[start]
+
+        return -1
+
+    def __contains__(self, strokes_str):
+        return self.find(strokes_str) >= 0
+
+    def __getitem__(self, strokes_str):
+        entry = self.find(strokes_str)
+        if entry < 0:
+            raise KeyError(strokes_str)
+
+        return self.translation(entry)
+
+    def get(self, strokes_str, default = None):
+        entry = self.find(strokes_str)
+        return self.translation(entry) if entry >= 0 else default
+
+    def keys(self):
+        for entry in range(len(self)):
+            yield self.entry_key(entry)
+
+    def items(self):
+        for entry in range(len(self)):
+            yield self.entry_key(entry), self.translation(entry)
+
+    def save(self, path, key):
+        header = json.dumps({
+            "format_version": FORMAT_VERSION,
+            "key": key,
+            "byte_order": sys.byteorder,
+            "entry_count": len(self),
+            "stroke_id_count": len(self.entry_stroke_ids),
+            "node_count": self.trie.node_count(),
+            "strokes": self.trie.strokes
+        }, ensure_ascii = False).encode("utf-8")
+
+        header_length = len(MAGIC) + 8 + len(header)
+
+        temp_path = path + ".tmp" + str(os.getpid())
+        with open(temp_path, "wb") as dictionary_file:
+            dictionary_file.write(MAGIC)
+            dictionary_file.write(struct.pack("<Q", len(header)))
+            dictionary_file.write(header)
+            dictionary_file.write(b"\0"*padding(header_length))
+
+            for column in (self.translation_offsets, self.entry_stroke_offsets,
+                self.entry_stroke_ids, self.sorted_entries):
+                column.tofile(dictionary_file)
+            self.trie.write_columns(dictionary_file)
+            dictionary_file.write(self.translations)
+
+        os.replace(temp_path, path)
+
+    # Dictionary backed by a memory map of a compiled dictionary, None if the
+    # file doesn't exist, wasn't compiled with key or is cut short
+    @staticmethod
+    def load(path, key):
+        try:
+            dictionary_file = open(path, "rb")
+        except OSError:
+            return None
+
+        with dictionary_file:
+            if dictionary_file.read(len(MAGIC)) != MAGIC:
+                return None
+
+            header_length_data = dictionary_file.read(8)
+            if len(header_length_data) != 8:
+                return None
+
+            header_length = struct.unpack("<Q", header_length_data)[0]
+            try:
+                header = json.loads(dictionary_file.read(header_length).decode("utf-8"))
+            except ValueError:
+                return None
+
+            if header["format_version"] != FORMAT_VERSION or header["key"] != key \
+                or header["byte_order"] != sys.byteorder:
+                return None
+
+            data = mmap.mmap(dictionary_file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        offset = len(MAGIC) + 8 + header_length
+        offset += padding(offset)
+
+        entry_count = header["entry_count"]
+        column_lengths = (
+            ("q", entry_count + 1),
+            ("i", entry_count + 1),
+            ("i", header["stroke_id_count"]),
+            ("i", entry_count))
+
+        # The file holds the columns and the translations, whose length is
+        # the last translation offset
+        translations_offset = offset + StrokeTrie.columns_size(header["node_count"]) \
+            + sum(length*struct.calcsize(format_) for format_, length in column_lengths)
+        if len(data) < translations_offset or len(data) != translations_offset \
+            + struct.unpack_from("q", data, offset + entry_count*struct.calcsize("q"))[0]:
+            data.close()
+            return None
+
+        columns = []
+        for format_, length in column_lengths:
+            size = length*struct.calcsize(format_)
+            columns.append(memoryview(data)[offset:offset + size].cast(format_))
+            offset += size
+
+        dictionary = Dictionary.__new__(Dictionary)
+        dictionary.translation_offsets, dictionary.entry_stroke_offsets, \
+            dictionary.entry_stroke_ids, dictionary.sorted_entries = columns
+        dictionary.trie, offset = StrokeTrie.map_columns(header["strokes"], data, offset,
+            header["node_count"])
+        dictionary.translations = memoryview(data)[offset:]
+        dictionary.path = path
+        dictionary.data = data
+
+        return dictionary
+
+    # Memory mapped dictionaries are loaded again from their file when
+    # unpickled, such as in worker processes
+    def __getstate__(self):
+        if not self.data is None:
+            return {"path": self.path}
+
+        return self.__dict__
+
+    def __setstate__(self, state):
+        if "data" in state:
+            self.__dict__.update(state)
+        else:
+            with open(state["path"], "rb") as dictionary_file:
+                dictionary_file.read(len(MAGIC))
+                header_length = struct.unpack("<Q", dictionary_file.read(8))[0]
+                key = json.loads(dictionary_file.read(header_length).decode("utf-8"))["key"]
+
+            self.__dict__.update(Dictionary.load(state["path"], key).__dict__)
+
+
+def compiled_dictionary_key(dictionary_files, later_overrides):
+    key = {"format_version": FORMAT_VERSION, "later_overrides": later_overrides,
+        "dictionaries": []}
+    for dictionary_file in dictionary_files:
+        stat = os.stat(dictionary_file)
+        key["dictionaries"].append({
+            "path": os.path.abspath(dictionary_file),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns
+        })
+
+    return key
+
+# Dictionaries merged with earlier dictionaries taking precedence, as when
+# Plover loads them, or later ones with later_overrides. With a cache
+# directory they are compiled there and memory mapped, and compiled again
+# when any of them change.
+def load_dictionaries(dictionary_files, cache_dir = None, later_overrides = False):
+    if cache_dir is None:
+        return Dictionary.from_json_files(dictionary_files, later_overrides)
+
+    key = compiled_dictionary_key(dictionary_files, later_overrides)
+    name = hashlib.sha1(json.dumps(
+        [os.path.abspath(dictionary_file) for dictionary_file in dictionary_files]
+        + [later_overrides]).encode("utf-8")).hexdigest()
+    path = os.path.join(cache_dir, name + ".dict")
+
+    dictionary = Dictionary.load(path, key)
+    if dictionary is None:
+        dictionary = Dictionary.from_json_files(dictionary_files, later_overrides)
+        try:
+            os.makedirs(cache_dir, exist_ok = True)
+            dictionary.save(path, key)
+        except OSError as error:
+            print("Error writing compiled dictionary: " + str(error), file=sys.stderr)
+            return dictionary
+
+        dictionary = Dictionary.load(path, key)
+
+    return dictionary
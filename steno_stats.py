@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import os
+from argparse import ArgumentParser
+
+import log_reader
+import instrumentation
+import json_output
+import log_export
+import stroke_store
+
+import strokes_per_word
+import translation_count
+import stroke_ngrams
+import time_statistics
+
+
+class Report:
+    def __init__(self, name, aggregates, file_name, write, uses_text):
+        self.name = name
+        self.aggregates = aggregates
+        self.file_name = file_name
+        self.write = write
+        self.uses_text = uses_text
+
+def create_reports(args):
+    reports = []
+
+    if args.strokes_per_word:
+        reports.append(Report("strokes_per_word",
+            strokes_per_word.StrokeCounts(),
+            "strokes_per_word.txt",
+            lambda aggregates, output: aggregates.write(output),
+            True))
+
+    if args.translation_count:
+        reports.append(Report("translation_count",
+            translation_count.TranslationCounts(),
+            "translation_count.json",
+            lambda aggregates, output: aggregates.write(output, args.output_format),
+            False))
+
+    if not args.ngrams is None:
+        reports.append(Report("stroke_ngrams",
+            stroke_ngrams.create_stroke_list_counts(args.ngrams, args.ngrams_approximate),
+            "stroke_ngrams.json",
+            lambda aggregates, output: aggregates.write(output,
+                args.ngrams_min_count, args.ngrams_limit_output, args.output_format),
+            False))
+
+    if args.time_stats:
+        reports.append(Report("time_statistics",
+            time_statistics.create_time_statistics(args.sample_window,
+                args.speed_activation, args.time_stats_numpy),
+            "time_statistics.csv",
+            lambda aggregates, output: aggregates.write(output, not args.raw),
+            True))
+
+    return reports
+
+def checkpoint_arguments(args):
+    return ["steno_stats report",
+        args.strokes_per_word,
+        args.translation_count,
+        args.ngrams,
+        args.ngrams_approximate,
+        args.time_stats,
+        args.sample_window,
+        args.speed_activation,
+        args.time_stats_numpy]
+
+def report(arg_parser, args):
+    if args.time_stats and args.sample_window is None:
+        arg_parser.error("--time-stats requires -w/--sample-window")
+    if args.time_stats_numpy and not time_statistics.import_numpy():
+        arg_parser.error("--time-stats-numpy requires NumPy")
+
+    if not args.ngrams is None and args.ngrams[0] < 1:
+        arg_parser.error("n-gram range must start at 1 or more")
+    if not args.ngrams_approximate is None and args.ngrams_approximate < 1:
+        arg_parser.error("approximate capacity must be 1 or more")
+
+    reports = create_reports(args)
+    if len(reports) == 0:
+        arg_parser.error("no reports selected")
+
+    stats = instrumentation.start(args)
+    log_processor, log_strokes, aggregates_list = log_reader.open_log_strokes(
+        args, [report_.aggregates for report_ in reports], checkpoint_arguments(args),
+        any(report_.uses_text for report_ in reports), stats)
+
+    with stats.timed("aggregate"):
+        for log_stroke in log_strokes:
+            for aggregates in aggregates_list:
+                aggregates.add_log_stroke(log_stroke)
+
+    os.makedirs(args.output_dir, exist_ok = True)
+    for report_, aggregates in zip(reports, aggregates_list):
+        with stats.timed("finish_" + report_.name):
+            aggregates.finish()
+
+        with stats.timed("write_" + report_.name):
+            with open(os.path.join(args.output_dir, report_.file_name), "w") as output:
+                report_.write(aggregates, output)
+
+    log_reader.print_formatting_cache_stats(args, log_processor)
+    stats.finish()
+
+def export(arg_parser, args):
+    if not args.checkpoint is None:
+        arg_parser.error("--checkpoint can't be used with export")
+    if args.row_group_size < 1:
+        arg_parser.error("--row-group-size must be 1 or more")
+
+    format_ = log_export.output_format(args.output, args.format)
+    if format_ == "parquet" and not log_export.import_pyarrow():
+        arg_parser.error("Parquet export requires pyarrow, export to a .npz file to use NumPy instead")
+    if format_ == "npz" and not log_export.import_numpy():
+        arg_parser.error(".npz export requires NumPy")
+
+    stats = instrumentation.start(args)
+    exporter = log_export.LogStrokeExporter(log_export.create_writer(args.output, format_),
+        args.row_group_size)
+    try:
+        log_processor, log_strokes, exporter = log_reader.open_log_strokes(
+            args, exporter, ["steno_stats export"], stats = stats)
+
+        with stats.timed("export"):
+            for log_stroke in log_strokes:
+                exporter.add_log_stroke(log_stroke)
+        with stats.timed("finish"):
+            exporter.finish()
+    except BaseException:
+        exporter.abort()
+        raise
+
+    log_reader.print_formatting_cache_stats(args, log_processor)
+    stats.finish()
+
+def ingest(arg_parser, args):
+    if not args.checkpoint is None:
+        arg_parser.error("--checkpoint can't be used with ingest")
+
+    stats = instrumentation.start(args)
+    log_processor, log_strokes, store = log_reader.open_log_strokes(
+        args, stroke_store.StrokeStore(args.output), ["steno_stats ingest"], stats = stats)
+
+    with stats.timed("ingest"):
+        added, duplicates, unresolved = store.ingest(log_strokes, log_processor)
+    store.close()
+
+    print("Added " + str(added) + " log strokes, " + str(duplicates)
+        + " were already in the database")
+    if unresolved > 0:
+        print(str(unresolved) + " log strokes at the end of the logs were left for the next ingest,"
+            + " their undos aren't paired with translations yet")
+
+    log_reader.print_formatting_cache_stats(args, log_processor)
+    stats.finish()
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Steno statistics from Plover logs.")
+    subparsers = arg_parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    report_parser = subparsers.add_parser("report", description="Produce several reports from one pass over plover logs. Each report is written to its own file in the output directory in the same format as its script.")
+    log_reader.add_log_arguments(report_parser)
+    report_parser.add_argument("-o", "--output-dir", default=".", help="directory to write reports to")
+    report_parser.add_argument("--strokes-per-word", action="store_true", help="write strokes_per_word.txt, see strokes_per_word.py")
+    report_parser.add_argument("--translation-count", action="store_true", help="write translation_count.json, see translation_count.py")
+    report_parser.add_argument("--ngrams", nargs=2, type=int, metavar="RANGE", help="write stroke_ngrams.json with this range of stroke n-grams, see stroke_ngrams.py")
+    report_parser.add_argument("--ngrams-min-count", type=int, help="minimum n-gram count to output")
+    report_parser.add_argument("--ngrams-limit-output", type=int, help="maximum n-gram output entries")
+    report_parser.add_argument("--ngrams-approximate", type=int, metavar="CAPACITY", help="approximately count the most frequent n-grams tracking at most this many")
+    report_parser.add_argument("--time-stats", action="store_true", help="write time_statistics.csv, see time_statistics.py")
+    report_parser.add_argument("-sa", "--speed_activation", nargs=3, type=float, help="speed to start recording on (stroke/second), speed to stop recording on (stroke/second), length of window to check speed in (seconds)")
+    report_parser.add_argument("-w", "--sample-window", type=float, help="duration of time (seconds) to sample for each discrete time statistic")
+    report_parser.add_argument("--time-stats-numpy", action="store_true", help="compute time statistics with NumPy once all strokes are read, no faster than the default")
+    report_parser.add_argument("--raw", action="store_true", help="raw time statistics only, no derived")
+    json_output.add_arguments(report_parser, False)
+
+    export_parser = subparsers.add_parser("export", description="Export processed log strokes to a columnar file for analysis elsewhere, Parquet with pyarrow or a NumPy .npz file. Log strokes are written in row groups as logs are read. Columns are time, stroke, undo, undo_translations, undo_strokes, do_translations, do_strokes and characters, the change in translated text length.")
+    log_reader.add_log_arguments(export_parser)
+    export_parser.add_argument("-o", "--output", required=True, help="file to export to")
+    export_parser.add_argument("--format", choices=log_export.FORMATS, help="export format, npz if the output file ends in .npz and otherwise parquet if not given")
+    export_parser.add_argument("--row-group-size", type=int, default=log_export.DEFAULT_ROW_GROUP_SIZE, help="number of log strokes in each row group")
+
+    ingest_parser = subparsers.add_parser("ingest", description="Add processed log strokes and their translations to a SQLite database, indexed by time, stroke and translation. Log strokes already in the database aren't added again. The scripts read the database with --database, with --since and --until as range scans of its time index.")
+    log_reader.add_log_arguments(ingest_parser, False)
+    ingest_parser.add_argument("-o", "--output", required=True, help="database file to add log strokes to, created if it doesn't exist")
+
+    args = arg_parser.parse_args()
+
+    if args.command == "report":
+        log_reader.check_log_arguments(report_parser, args)
+        report(report_parser, args)
+    elif args.command == "export":
+        log_reader.check_log_arguments(export_parser, args)
+        export(export_parser, args)
+    elif args.command == "ingest":
+        log_reader.check_log_arguments(ingest_parser, args)
+        ingest(ingest_parser, args)
@@ -5,75 +5,205 @@ import sys
 from argparse import ArgumentParser
 
 import log_reader
+import instrumentation
+import json_output
 
-from collections import OrderedDict
-try:
-    import simplejson as json
-except ImportError:
-    import json
+import array
+import heapq
 
+from collections import OrderedDict
 
-arg_parser = ArgumentParser(description="Count stroke n-grams in plover logs. Outputs a JSON formatted dictionary of stroke sequences and their counts to standard out.")
-arg_parser.add_argument("logs", nargs="+", help="log file paths")
-arg_parser.add_argument("-r", "--resume", help="start recording after encountering this translation")
-arg_parser.add_argument("-s", "--suspend", help="stop recording when encountering this translation")
-arg_parser.add_argument("-n", "--range", required=True, nargs=2, type=int,
-    help="range of stroke n-grams to track")
-arg_parser.add_argument("-c", "--min-count", type=int, help="minimum count to output")
-arg_parser.add_argument("-l", "--limit-output", type=int, help="maximum output entries")
-args = arg_parser.parse_args()
 
-log = []
-for log_file in args.logs:
-    with open(log_file) as data_file:
-        log += data_file.readlines()
+# Strokes beyond the largest n-gram are kept so undone strokes can be restored
+STROKE_HISTORY_UNDO_MARGIN = 1024
 
-log_strokes = log_reader.process_log(log, args.resume, args.suspend)
+STROKE_ID_BITS = 32
 
 class StrokeListCounts:
-    def __init__(self):
-        self.counts = {}
-
-    def ensure_count_initialised(self, stroke_list):
-        if not stroke_list in self.counts:
-            self.counts[stroke_list] = 0
-
-    def add(self, stroke_list):
-        self.ensure_count_initialised(stroke_list)
-        self.counts[stroke_list] += 1
-
-    def remove(self, stroke_list):
-        self.ensure_count_initialised(stroke_list)
-        self.counts[stroke_list] -= 1
-
-    def clean(self, min_count = 0):
-        self.counts = {
-            k: v for k, v in self.counts.items() if v > min_count }
-
-stroke_list_counts = StrokeListCounts()
-
-strokes = []
-for log_stroke in log_strokes:
-    if log_stroke.stroke == "*":
-        strokes.pop()
+    def __init__(self, range_):
+        self.range = range_
+
+        self.stroke_ids = {}
+        self.id_strokes = []
+
+        # Stroke id history
+        self.strokes = []
+
+        # Tree of n-grams read backwards from their last stroke, node 0 is the
+        # empty n-gram and each node adds the stroke before its parent's
+        self.node_children = {}
+        self.node_parents = array.array("i", [-1])
+        self.node_strokes = array.array("i", [-1])
+        self.node_counts = array.array("q", [0])
+
+    def stroke_id(self, stroke):
+        if not stroke in self.stroke_ids:
+            self.stroke_ids[stroke] = len(self.id_strokes)
+            self.id_strokes.append(stroke)
+
+        return self.stroke_ids[stroke]
+
+    def child(self, node, stroke_id):
+        key = (node << STROKE_ID_BITS) | stroke_id
+        child = self.node_children.get(key)
+        if child is None:
+            child = len(self.node_counts)
+            self.node_children[key] = child
+            self.node_parents.append(node)
+            self.node_strokes.append(stroke_id)
+            self.node_counts.append(0)
+
+        return child
+
+    def add_log_stroke(self, log_stroke):
+        if log_stroke.stroke == "*":
+            if len(self.strokes) > 0:
+                self.strokes.pop()
+        else:
+            self.strokes.append(self.stroke_id(log_stroke.stroke))
+
+            history_length = self.range[1] + STROKE_HISTORY_UNDO_MARGIN
+            if len(self.strokes) > 2*history_length:
+                del self.strokes[:-history_length]
+
+            self.count_stroke_lists()
+
+    def count_stroke_lists(self):
+        node = 0
+        for i in range(1, min(self.range[1], len(self.strokes))):
+            node = self.child(node, self.strokes[-i])
+            if i >= self.range[0]:
+                self.node_counts[node] += 1
+
+    def stroke_list(self, node):
+        strokes = []
+        while node > 0:
+            strokes.append(self.id_strokes[self.node_strokes[node]])
+            node = self.node_parents[node]
+
+        return "/".join(strokes)
+
+    # Nodes with a count above min_count, ordered by reverse count then by
+    # first occurrence
+    def sorted_nodes(self, min_count, limit_output):
+        nodes = [node for node, count in enumerate(self.node_counts)
+            if count > min_count and count > 0]
+
+        if limit_output is None:
+            nodes.sort(key=lambda node: self.node_counts[node], reverse=True)
+            return nodes
+        else:
+            return heapq.nsmallest(limit_output, nodes,
+                key=lambda node: (-self.node_counts[node], node))
+
+    def finish(self):
+        pass
+
+    def write(self, output, min_count, limit_output, output_format = "json"):
+        json_output.write_object(output,
+            ((self.stroke_list(node), self.node_counts[node])
+                for node in self.sorted_nodes(
+                    min_count if not min_count is None else 0,
+                    limit_output)),
+            output_format)
+
+
+# Space-Saving counts of the most frequent n-grams using at most capacity
+# counters. Counts can be overestimated by at most their error.
+class ApproximateStrokeListCounts(StrokeListCounts):
+    def __init__(self, range_, capacity):
+        StrokeListCounts.__init__(self, range_)
+
+        self.capacity = capacity
+
+        # Stroke id tuple -> [count, error]
+        self.counters = {}
+        # Heap of (count, stroke id tuple), entries are stale when the
+        # stroke list's count has increased since
+        self.counters_heap = []
+
+    def count_stroke_lists(self):
+        for i in range(max(self.range[0], 1), min(self.range[1], len(self.strokes))):
+            self.add_stroke_list(tuple(self.strokes[-i:]))
+
+    def add_stroke_list(self, stroke_list):
+        counter = self.counters.get(stroke_list)
+        if not counter is None:
+            counter[0] += 1
+            return
+
+        if len(self.counters) < self.capacity:
+            self.counters[stroke_list] = [1, 0]
+            heapq.heappush(self.counters_heap, (1, stroke_list))
+            return
+
+        # Replace the stroke list with the minimum count
+        while True:
+            count, min_stroke_list = heapq.heappop(self.counters_heap)
+            min_count = self.counters[min_stroke_list][0]
+            if min_count == count:
+                break
+            heapq.heappush(self.counters_heap, (min_count, min_stroke_list))
+
+        del self.counters[min_stroke_list]
+        self.counters[stroke_list] = [min_count + 1, min_count]
+        heapq.heappush(self.counters_heap, (min_count + 1, stroke_list))
+
+    def write(self, output, min_count, limit_output, output_format = "json"):
+        min_count = min_count if not min_count is None else 0
+
+        counters = [(stroke_list, counter) for stroke_list, counter in self.counters.items()
+            if counter[0] > min_count]
+        if limit_output is None:
+            counters.sort(key=lambda o: o[1][0], reverse=True)
+        else:
+            counters = heapq.nlargest(limit_output, counters, key=lambda o: o[1][0])
+
+        json_output.write_object(output,
+            (("/".join(self.id_strokes[stroke_id] for stroke_id in stroke_list),
+                OrderedDict((("count", counter[0]), ("error", counter[1]))))
+                for stroke_list, counter in counters),
+            output_format)
+
+def create_stroke_list_counts(range_, approximate):
+    if approximate is None:
+        return StrokeListCounts(range_)
     else:
-        strokes.append(log_stroke.stroke)
-
-        for i in range(args.range[0], args.range[1]):
-            if len(strokes) > i:
-                stroke_list_counts.add("/".join(strokes[-i:]))
-
-stroke_list_counts.clean(args.min_count if not args.min_count is None else 0)
-
-# Sort dictionaries by reverse counts
-sorted_stroke_list_counts_ = sorted(
-    stroke_list_counts.counts.items(), key=lambda o: o[1], reverse=True)
-if not args.limit_output is None:
-    sorted_stroke_list_counts_ = sorted_stroke_list_counts_[:args.limit_output]
-
-sorted_stroke_list_counts = OrderedDict(sorted_stroke_list_counts_)
-
-print(json.dumps(sorted_stroke_list_counts,
-    ensure_ascii = False,
-    indent = 2,
-    separators = (',', ': ')))
+        return ApproximateStrokeListCounts(range_, approximate)
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Count stroke n-grams in plover logs. Outputs a JSON formatted dictionary of stroke sequences and their counts to standard out.")
+    log_reader.add_log_arguments(arg_parser)
+    arg_parser.add_argument("-n", "--range", required=True, nargs=2, type=int,
+        help="range of stroke n-grams to track")
+    arg_parser.add_argument("-c", "--min-count", type=int, help="minimum count to output")
+    arg_parser.add_argument("-l", "--limit-output", type=int, help="maximum output entries")
+    arg_parser.add_argument("-a", "--approximate", type=int, metavar="CAPACITY", help="approximately count the most frequent n-grams tracking at most this many, counts are output with their maximum overestimate")
+    json_output.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    log_reader.check_log_arguments(arg_parser, args)
+    if args.range[0] < 1:
+        arg_parser.error("n-gram range must start at 1 or more")
+    if not args.approximate is None and args.approximate < 1:
+        arg_parser.error("approximate capacity must be 1 or more")
+
+    stats = instrumentation.start(args)
+    log_processor, log_strokes, stroke_list_counts = log_reader.open_log_strokes(
+        args,
+        create_stroke_list_counts(args.range, args.approximate),
+        ["stroke_ngrams", args.range, args.approximate],
+        False,
+        stats)
+
+    with stats.timed("aggregate"):
+        for log_stroke in log_strokes:
+            stroke_list_counts.add_log_stroke(log_stroke)
+    with stats.timed("finish"):
+        stroke_list_counts.finish()
+
+    with stats.timed("write"):
+        stroke_list_counts.write(sys.stdout, args.min_count, args.limit_output, args.output_format)
+
+    log_reader.print_formatting_cache_stats(args, log_processor)
+    stats.finish()
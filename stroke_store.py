@@ -0,0 +1,158 @@
+import log_reader
+import log_cache
+
+import sqlite3
+import os.path
+import urllib.parse
+
+
+# Log strokes are identified by their time, stroke and occurrence, the
+# number of earlier log strokes with the same time and stroke, so ingesting
+# logs again only adds the log strokes that aren't in the database yet.
+# Times are epoch microseconds. Translations of each log stroke are numbered by
+# position, undo translations first, and their strokes are joined by /.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS log_strokes (
+    id INTEGER PRIMARY KEY,
+    time INTEGER NOT NULL,
+    stroke TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    UNIQUE (time, stroke, occurrence)
+);
+CREATE INDEX IF NOT EXISTS log_strokes_stroke ON log_strokes (stroke);
+CREATE TABLE IF NOT EXISTS translations (
+    log_stroke_id INTEGER NOT NULL REFERENCES log_strokes (id),
+    position INTEGER NOT NULL,
+    undo INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    translation TEXT,
+    strokes TEXT NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (log_stroke_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS translations_translation ON translations (translation);
+"""
+
+# Translations are inserted in batches of at least this many
+INSERT_BATCH_SIZE = 16384
+
+# The time range is a range scan of the (time, stroke, occurrence) index, with the
+# translations of each log stroke looked up by primary key
+SELECT_LOG_STROKES = """
+SELECT log_strokes.id, log_strokes.time, log_strokes.stroke,
+    translations.undo, translations.time, translations.translation,
+    translations.strokes, translations.text
+FROM log_strokes
+LEFT JOIN translations ON translations.log_stroke_id = log_strokes.id
+WHERE log_strokes.time >= ? AND log_strokes.time < ?
+ORDER BY log_strokes.time, log_strokes.id, translations.position
+"""
+
+# Beyond all log times
+MIN_TIME = -(1 << 63)
+MAX_TIME = (1 << 63) - 1
+
+def time_bound(time, default):
+    return log_cache.time_to_epoch_us(time) if not time is None else default
+
+# URI opening the database at path read-only. Windows paths start with their
+# drive, so they're made absolute URI paths.
+def read_only_uri(path):
+    path = os.path.abspath(path).replace(os.sep, "/")
+    if not path.startswith("/"):
+        path = "/" + path
+
+    return "file:" + urllib.parse.quote(path) + "?mode=ro"
+
+class StrokeStore:
+    def __init__(self, path, read_only = False):
+        if read_only:
+            self.connection = sqlite3.connect(read_only_uri(path), uri=True)
+        else:
+            self.connection = sqlite3.connect(path)
+            self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    # Returns the number of log strokes added, the number already in the
+    # database and the number left for the next ingest. Log strokes the log
+    # processor finished with undos not yet paired are left, as the rest of
+    # a log can pair them into different log strokes.
+    def ingest(self, log_strokes, log_processor = None):
+        added = 0
+        duplicates = 0
+        unresolved = 0
+        translation_rows = []
+        # Stroke -> occurrences of log strokes at the time of the last one
+        time = None
+        occurrences = {}
+
+        def insert_translations():
+            self.connection.executemany(
+                "INSERT INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                translation_rows)
+            del translation_rows[:]
+
+        with self.connection:
+            for log_stroke in log_strokes:
+                if not log_processor is None and log_processor.finished_unresolved:
+                    unresolved += 1
+                    continue
+
+                if log_stroke.time != time:
+                    time = log_stroke.time
+                    occurrences = {}
+                occurrence = occurrences.get(log_stroke.stroke, 0)
+                occurrences[log_stroke.stroke] = occurrence + 1
+
+                cursor = self.connection.execute(
+                    "INSERT OR IGNORE INTO log_strokes (time, stroke, occurrence) VALUES (?, ?, ?)",
+                    (log_cache.time_to_epoch_us(time), log_stroke.stroke, occurrence))
+                if cursor.rowcount == 0:
+                    duplicates += 1
+                    continue
+
+                added += 1
+                log_stroke_id = cursor.lastrowid
+                position = 0
+                for undo, translations in ((1, log_stroke.undo_translations),
+                    (0, log_stroke.do_translations)):
+                    for translation in translations:
+                        translation_rows.append((log_stroke_id, position, undo,
+                            log_cache.time_to_epoch_us(translation.time),
+                            translation.translation,
+                            "/".join(translation.strokes),
+                            translation.text))
+                        position += 1
+
+                if len(translation_rows) >= INSERT_BATCH_SIZE:
+                    insert_translations()
+
+            insert_translations()
+
+        return added, duplicates, unresolved
+
+    # Log strokes at or after since and before until, either can be None
+    def iter_log_strokes(self, since = None, until = None):
+        cursor = self.connection.execute(SELECT_LOG_STROKES,
+            (time_bound(since, MIN_TIME), time_bound(until, MAX_TIME)))
+
+        log_stroke = None
+        log_stroke_id = None
+        for row in cursor:
+            id_, time, stroke, undo, translation_time, translation, strokes, text = row
+            if id_ != log_stroke_id:
+                if not log_stroke is None:
+                    yield log_stroke
+
+                log_stroke_id = id_
+                log_stroke = log_reader.LogStroke(log_cache.epoch_us_to_time(time), [], [], stroke)
+
+            if not undo is None:
+                (log_stroke.undo_translations if undo else log_stroke.do_translations).append(
+                    log_reader.Translation(log_cache.epoch_us_to_time(translation_time),
+                        translation, strokes.split("/"), text))
+
+        if not log_stroke is None:
+            yield log_stroke
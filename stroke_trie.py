@@ -0,0 +1,141 @@
+import array
+import bisect
+
+
+# Trie of stroke sequences in flat arrays. Nodes are numbered breadth first
+# with each node's children in stroke order, so a node's children are the
+# nodes from its first child up to the next node's first child. Node 0 is
+# the root and -1 is no node.
+class StrokeTrie:
+    def __init__(self, strokes_list = []):
+        # Stroke ids are in stroke order
+        self.strokes = sorted(set(stroke for strokes in strokes_list for stroke in strokes))
+        self.stroke_ids = {stroke: i for i, stroke in enumerate(self.strokes)}
+
+        self.node_strokes = array.array("i", [-1])
+        # Number of stroke sequences starting with each node's strokes
+        self.node_counts = array.array("i", [0])
+        self.first_children = array.array("i", [1])
+        # Number of stroke sequences ending at each node
+        self.node_ends = array.array("i")
+
+        self.build(sorted(
+            array.array("i", (self.stroke_ids[stroke] for stroke in strokes))
+            for strokes in strokes_list))
+
+    def build(self, ids_list):
+        self.node_counts[0] = len(ids_list)
+
+        # Ranges of ids_list sharing each node's strokes, in node order
+        level = [(0, len(ids_list))]
+        depth = 0
+        while len(level) > 0:
+            next_level = []
+            for start, end in level:
+                i = start
+                while i < end and len(ids_list[i]) <= depth:
+                    i += 1
+                self.node_ends.append(i - start)
+
+                while i < end:
+                    stroke_id = ids_list[i][depth]
+                    child_start = i
+                    while i < end and ids_list[i][depth] == stroke_id:
+                        i += 1
+
+                    self.node_strokes.append(stroke_id)
+                    self.node_counts.append(i - child_start)
+                    next_level.append((child_start, i))
+
+                self.first_children.append(len(self.node_strokes))
+
+            level = next_level
+            depth += 1
+
+        self.index_first_strokes()
+
+    # Node of each stroke id as the first stroke, -1 if no stroke sequence
+    # starts with it. The root has a child for most strokes, so they're
+    # looked up directly instead of searched for.
+    def index_first_strokes(self):
+        self.first_stroke_nodes = [-1]*len(self.strokes)
+        for node in range(1, self.first_children[1]):
+            self.first_stroke_nodes[self.node_strokes[node]] = node
+
+    def node_count(self):
+        return len(self.node_strokes)
+
+    def stroke_id(self, stroke):
+        return self.stroke_ids.get(stroke, -1)
+
+    # Ends of the stroke sequences starting stroke_ids[start:] and the node
+    # of stroke_ids[start:], -1 if no stroke sequence starts with them
+    def walk(self, stroke_ids, start = 0):
+        node_strokes = self.node_strokes
+        node_ends = self.node_ends
+        first_children = self.first_children
+
+        ends = []
+        node = self.first_stroke_nodes[stroke_ids[start]] if stroke_ids[start] >= 0 else -1
+        if node < 0:
+            return ends, -1
+        if node_ends[node] > 0:
+            ends.append(start + 1)
+
+        for i in range(start + 1, len(stroke_ids)):
+            stroke_id = stroke_ids[i]
+            end = first_children[node + 1]
+            node = bisect.bisect_left(node_strokes, stroke_id, first_children[node], end)
+            if node == end or node_strokes[node] != stroke_id:
+                return ends, -1
+
+            if node_ends[node] > 0:
+                ends.append(i + 1)
+
+        return ends, node
+
+    def child_count(self, node):
+        return self.node_counts[node] if node >= 0 else 0
+
+    # Whether the strokes up to node are one of the stroke sequences
+    def is_entry(self, node):
+        return node >= 0 and self.node_ends[node] > 0
+
+    def children(self, node):
+        if node < 0:
+            return range(0)
+
+        return range(self.first_children[node], self.first_children[node + 1])
+
+    def node_stroke(self, node):
+        return self.strokes[self.node_strokes[node]]
+
+    def columns(self):
+        return [self.node_strokes, self.node_counts, self.first_children, self.node_ends]
+
+    def write_columns(self, data_file):
+        for column in self.columns():
+            column.tofile(data_file)
+
+    # Bytes written by write_columns for a trie of node_count nodes
+    @staticmethod
+    def columns_size(node_count):
+        return (4*node_count + 1)*4
+
+    # Trie of columns written by write_columns at offset in data, and the
+    # offset after the columns
+    @staticmethod
+    def map_columns(strokes, data, offset, node_count):
+        columns = []
+        for length in (node_count, node_count, node_count + 1, node_count):
+            size = length*4
+            columns.append(memoryview(data)[offset:offset + size].cast("i"))
+            offset += size
+
+        trie = StrokeTrie.__new__(StrokeTrie)
+        trie.strokes = strokes
+        trie.stroke_ids = {stroke: i for i, stroke in enumerate(strokes)}
+        trie.node_strokes, trie.node_counts, trie.first_children, trie.node_ends = columns
+        trie.index_first_strokes()
+
+        return trie, offset
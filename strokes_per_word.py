@@ -1,47 +1,67 @@
 #!/usr/bin/env python3
 
+import sys
 import log_reader
+import instrumentation
 from argparse import ArgumentParser
 
 
-arg_parser = ArgumentParser(description="Calculate strokes per word in plover logs. Outputs to standard out.")
-arg_parser.add_argument("logs", nargs="+", help="log file paths")
-arg_parser.add_argument("-r", "--resume", help="start recording after encountering this translation")
-arg_parser.add_argument("-s", "--suspend", help="stop recording when encountering this translation")
-args = arg_parser.parse_args()
+class StrokeCounts:
+    def __init__(self):
+        self.stroke_count = 0
+        self.undo_stroke_count = 0
+        self.character_count = 0
 
-log = []
-for log_file in args.logs:
-    with open(log_file) as data_file:
-        log += data_file.readlines()
+    def add_log_stroke(self, log_stroke):
+        if log_stroke.stroke == "*":
+            self.undo_stroke_count += 1
+        else:
+            self.stroke_count += 1
 
-log_strokes = log_reader.process_log(log, args.resume, args.suspend)
+        for translation in log_stroke.undo_translations:
+            self.character_count -= len(translation.text)
 
-stroke_count = 0
-undo_stroke_count = 0
-character_count = 0
+        for translation in log_stroke.do_translations:
+            self.character_count += len(translation.text)
 
-for log_stroke in log_strokes:
-    if log_stroke.stroke == "*":
-        undo_stroke_count += 1
-    else:
-        stroke_count += 1
+    def finish(self):
+        pass
 
-    for translation in log_stroke.undo_translations:
-        character_count -= len(translation.text)
+    def write(self, output):
+        word_count = self.character_count*0.2
 
-    for translation in log_stroke.do_translations:
-        character_count += len(translation.text)
+        total_stroke_count = self.stroke_count + self.undo_stroke_count
+        net_stroke_count = self.stroke_count - self.undo_stroke_count
 
-word_count = character_count*0.2
+        print((str(float(total_stroke_count)/word_count) if self.character_count > 0 else "n/a")
+            + " stroke/word "
+            + " (" + str(self.stroke_count) + "/" + str(word_count) + ")",
+            file=output)
 
-total_stroke_count = stroke_count + undo_stroke_count
-net_stroke_count = stroke_count - undo_stroke_count
+        print((str(float(net_stroke_count)/word_count) if self.character_count > 0 else "n/a")
+            + " net stroke/word "
+            + " (" + str(net_stroke_count) + "/" + str(word_count) + ")",
+            file=output)
 
-print((str(float(total_stroke_count)/word_count) if character_count > 0 else "n/a")
-    + " stroke/word "
-    + " (" + str(stroke_count) + "/" + str(word_count) + ")")
 
-print((str(float(net_stroke_count)/word_count) if character_count > 0 else "n/a")
-    + " net stroke/word "
-    + " (" + str(net_stroke_count) + "/" + str(word_count) + ")")
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Calculate strokes per word in plover logs. Outputs to standard out.")
+    log_reader.add_log_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    log_reader.check_log_arguments(arg_parser, args)
+
+    stats = instrumentation.start(args)
+    log_processor, log_strokes, stroke_counts = log_reader.open_log_strokes(
+        args, StrokeCounts(), ["strokes_per_word"], stats = stats)
+
+    with stats.timed("aggregate"):
+        for log_stroke in log_strokes:
+            stroke_counts.add_log_stroke(log_stroke)
+    with stats.timed("finish"):
+        stroke_counts.finish()
+
+    with stats.timed("write"):
+        stroke_counts.write(sys.stdout)
+
+    log_reader.print_formatting_cache_stats(args, log_processor)
+    stats.finish()
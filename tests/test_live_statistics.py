@@ -0,0 +1,181 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import random
+import shutil
+import datetime
+import tempfile
+import unittest
+
+import log_reader
+import time_statistics
+import live_statistics
+
+
+class LogFollowerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "strokes.log")
+        self.write("old\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data, mode = "a"):
+        with open(self.path, mode) as log_file:
+            log_file.write(data)
+
+    def test_appended_lines(self):
+        log_follower = live_statistics.LogFollower(self.path)
+        self.assertEqual(log_follower.read_lines(), [])
+
+        self.write("a\nb")
+        self.assertEqual(log_follower.read_lines(), ["a\n"])
+        self.write("c\n")
+        self.assertEqual(log_follower.read_lines(), ["bc\n"])
+        log_follower.close()
+
+    def test_from_start(self):
+        log_follower = live_statistics.LogFollower(self.path, True)
+        self.assertEqual(log_follower.read_lines(), ["old\n"])
+        log_follower.close()
+
+    def test_truncation(self):
+        log_follower = live_statistics.LogFollower(self.path)
+        self.write("a\n")
+        self.assertEqual(log_follower.read_lines(), ["a\n"])
+
+        self.write("b\n", "w")
+        self.assertEqual(log_follower.read_lines(), ["b\n"])
+        log_follower.close()
+
+    def test_rotation(self):
+        log_follower = live_statistics.LogFollower(self.path)
+
+        self.write("a\n")
+        os.rename(self.path, self.path + ".1")
+        self.assertEqual(log_follower.read_lines(), ["a\n"])
+        self.assertEqual(log_follower.read_lines(), [])
+
+        self.write("b\n")
+        self.assertEqual(log_follower.read_lines(), ["b\n"])
+        log_follower.close()
+
+    # Lines written to the old file after the last read are read before the
+    # new file's
+    def test_rotation_finishes_old_file(self):
+        log_follower = live_statistics.LogFollower(self.path)
+
+        self.write("a\n")
+        os.rename(self.path, self.path + ".1")
+        self.write("b\n")
+        with open(self.path + ".1", "a") as log_file:
+            log_file.write("c\n")
+        self.assertEqual(log_follower.read_lines(), ["a\n", "c\n", "b\n"])
+        log_follower.close()
+
+
+class ListFollower:
+    def __init__(self):
+        self.lines = []
+
+    def read_lines(self):
+        lines = self.lines
+        self.lines = []
+        return lines
+
+def log_line(time, strokes, translation, removal = False):
+    return "2017-02-24 23:40:" + time + (" *" if removal else " ") \
+        + "Translation((" + ", ".join("'" + stroke + "'" for stroke in strokes) \
+        + ("," if len(strokes) == 1 else "") + ") : \"" + translation + "\")\n"
+
+class LogStrokeFollowerTest(unittest.TestCase):
+    def setUp(self):
+        self.lines = ListFollower()
+        self.follower = live_statistics.LogStrokeFollower(self.lines,
+            log_reader.LogProcessor(None, None, format_text = False), 0.25)
+
+    def poll(self, monotonic_time, *lines):
+        self.lines.lines = list(lines)
+        return [(log_stroke.stroke,
+            [translation.translation for translation in log_stroke.undo_translations],
+            [translation.translation for translation in log_stroke.do_translations])
+            for log_stroke in self.follower.poll(monotonic_time)]
+
+    def test_translations_without_undos_are_processed_straight_away(self):
+        self.assertEqual(self.poll(0, log_line("07,100", ["A"], "a")), [("A", [], ["a"])])
+
+    # A poll between a stroke's undo and translation lines doesn't pair them
+    def test_undo_waits_for_its_translations(self):
+        self.assertEqual(self.poll(0, log_line("07,100", ["A"], "a")), [("A", [], ["a"])])
+        self.assertEqual(self.poll(0.1, log_line("07,300", ["A"], "a", True)), [])
+        self.assertEqual(self.poll(0.2), [])
+        self.assertEqual(self.poll(0.25, log_line("07,300", ["A", "HED"], "ahead")),
+            [("HED", ["a"], ["ahead"])])
+
+    # Automatic redos are paired once they cover the undone strokes
+    def test_automatic_redo_waits_for_its_strokes(self):
+        self.poll(0, log_line("07,100", ["KAT", "A", "HED"], "cat ahead"))
+        self.assertEqual(self.poll(0.1, log_line("07,300", ["KAT", "A", "HED"], "cat ahead", True),
+            log_line("07,300", ["KAT"], "cat")), [])
+        self.assertEqual(self.poll(0.2, log_line("07,300", ["A"], "a"),
+            log_line("07,500", ["S"], "is")),
+            [("*", ["cat ahead"], ["cat", "a"]), ("S", [], ["is"])])
+
+    # Strokes typed after an undo don't wait for the log to go quiet
+    def test_typing_after_undo(self):
+        self.assertEqual(self.poll(0, log_line("07,000", ["A"], "a", True)), [])
+        for i in range(20):
+            self.assertEqual(self.poll(0.2 + i*0.2, log_line("07,200", ["KAT"], "cat")),
+                ([("*", ["a"], [])] if i == 0 else []) + [("KAT", [], ["cat"])])
+
+    def test_unpaired_undo_after_flush_delay(self):
+        self.assertEqual(self.poll(0, log_line("07,300", ["A"], "a", True)), [])
+        self.assertEqual(self.poll(0.2), [])
+        self.assertEqual(self.poll(0.3), [("*", ["a"], [])])
+
+class Stroke:
+    def __init__(self, time):
+        self.time = time
+        self.stroke = "A"
+        self.undo_translations = []
+        self.do_translations = []
+
+class LiveStatisticsTest(unittest.TestCase):
+    # The speed activation deactivates once strokes stop, without another
+    # stroke arriving
+    def test_deactivates_after_strokes_stop(self):
+        statistics = live_statistics.create_live_statistics(60, (2, 1, 2))
+        start = datetime.datetime(2017, 2, 24, 23, 40)
+        for i in range(10):
+            statistics.add_log_stroke(Stroke(start + datetime.timedelta(seconds = i*0.25)))
+
+        now = start + datetime.timedelta(seconds = 2.5)
+        self.assertTrue(statistics.figures(now)["active"])
+        now = start + datetime.timedelta(seconds = 5)
+        self.assertFalse(statistics.figures(now)["active"])
+        # Strokes are counted from the fourth, which activated it
+        self.assertEqual(statistics.figures(now)["strokes"], 7)
+
+    # 0.28 strokes/s over 25 seconds rounds to just over 7 strokes
+    def test_active_at_counts_strokes_in_window(self):
+        period_filter = time_statistics.SpeedFilter(0.4, 0.28, datetime.timedelta(seconds = 25))
+        rng = random.Random(0)
+        time = datetime.datetime(2017, 2, 24, 23, 40)
+        times = []
+        for i in range(200):
+            time += datetime.timedelta(seconds = rng.choice((0.5, 1, 2, 5, 12)))
+            times.append(time)
+            period_filter.add_stroke(Stroke(time))
+
+            for delay in (0, 5, 10, 20, 40):
+                now = time + datetime.timedelta(seconds = delay)
+                count = sum(1 for stroke_time in times
+                    if now - stroke_time <= datetime.timedelta(seconds = 25))
+                self.assertEqual(period_filter.active_at(now),
+                    not period_filter.activate_time is None and count/25 >= 0.28)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import shutil
+import tempfile
+import unittest
+
+import log_cache
+import log_reader
+
+
+LOG = """2017-02-24 23:40:07,162 Translation(('KAT',) : "cat")
+2017-02-24 23:40:07,400 Translation(('A',) : "a")
+2017-02-24 23:40:07,650 *Translation(('A',) : "a")
+2017-02-24 23:40:07,650 Translation(('A', 'HED') : "ahead")
+2017-02-24 23:40:08,010 Translation(('TPHOT',) : "not")
+"""
+
+APPENDED_LOG = """2017-02-24 23:40:09,020 Translation(('HED',) : "head")
+"""
+
+class LogCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.directory, "strokes.log")
+        with open(self.log_path, "w") as log_file:
+            log_file.write(LOG)
+
+        self.cache = log_cache.LogCache(os.path.join(self.directory, "cache"))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def log_strokes(self, log_cache_):
+        log_processor = log_reader.LogProcessor(None, None, format_text = False)
+        return [(log_stroke.time, log_stroke.stroke,
+            [(translation.translation, translation.strokes)
+                for translation in log_stroke.undo_translations],
+            [(translation.translation, translation.strokes)
+                for translation in log_stroke.do_translations])
+            for log_stroke in log_processor.iter_files_log_strokes([self.log_path], log_cache_)]
+
+    def test_hit(self):
+        expected = self.log_strokes(None)
+
+        self.assertEqual(self.log_strokes(self.cache), expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        self.assertEqual(self.log_strokes(self.cache), expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_changed_log_misses(self):
+        self.log_strokes(self.cache)
+
+        with open(self.log_path, "a") as log_file:
+            log_file.write(APPENDED_LOG)
+        expected = self.log_strokes(None)
+
+        self.assertEqual(self.log_strokes(self.cache), expected)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 1)
+
+    # Scripts alternating with and without formatting keep separate caches
+    def test_variants_have_separate_files(self):
+        key = log_cache.LogCache.cache_key(self.log_path, [], False)
+        formatted_key = dict(key, format_text = True)
+        other_actions_key = dict(key, actions = log_cache.actions_digest(["action"]))
+        changed_key = dict(key, size = key["size"] + 1)
+
+        self.assertNotEqual(self.cache.cache_path(key), self.cache.cache_path(formatted_key))
+        self.assertNotEqual(self.cache.cache_path(key), self.cache.cache_path(other_actions_key))
+        self.assertEqual(self.cache.cache_path(key), self.cache.cache_path(changed_key))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,127 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import shutil
+import datetime
+import tempfile
+import unittest
+
+import log_export
+import log_reader
+
+
+START = datetime.datetime(2017, 2, 24, 23, 40, 7, 162000)
+
+def translation(seconds, translation_, strokes, text):
+    return log_reader.Translation(START + datetime.timedelta(seconds = seconds),
+        translation_, strokes, text)
+
+LOG_STROKES = [
+    log_reader.LogStroke(START, [], [translation(0, "cat", ["KAT"], " cat")], "KAT"),
+    log_reader.LogStroke(START + datetime.timedelta(seconds = 1),
+        [translation(1, "a", ["A"], " a")],
+        [translation(1, "ahead", ["A", "HED"], " ahead")], "HED"),
+    log_reader.LogStroke(START + datetime.timedelta(seconds = 2),
+        [], [translation(2, None, ["TKPW-T"], " TKPW-T")], "TKPW-T"),
+    log_reader.LogStroke(START + datetime.timedelta(seconds = 3),
+        [translation(3, "ahead", ["A", "HED"], " ahead")], [], "*"),
+    log_reader.LogStroke(START + datetime.timedelta(seconds = 4),
+        [], [translation(4, "{^}über long translation", ["AOUB"], "über long translation")], "AOUB")
+]
+
+EXPECTED_ROWS = [
+    {"time": START, "stroke": "KAT", "undo": False,
+        "undo_translations": [], "undo_strokes": [],
+        "do_translations": ["cat"], "do_strokes": ["KAT"], "characters": 4},
+    {"time": START + datetime.timedelta(seconds = 1), "stroke": "HED", "undo": False,
+        "undo_translations": ["a"], "undo_strokes": ["A"],
+        "do_translations": ["ahead"], "do_strokes": ["A/HED"], "characters": 4},
+    {"time": START + datetime.timedelta(seconds = 2), "stroke": "TKPW-T", "undo": False,
+        "undo_translations": [], "undo_strokes": [],
+        "do_translations": [None], "do_strokes": ["TKPW-T"], "characters": 7},
+    {"time": START + datetime.timedelta(seconds = 3), "stroke": "*", "undo": True,
+        "undo_translations": ["ahead"], "undo_strokes": ["A/HED"],
+        "do_translations": [], "do_strokes": [], "characters": -6},
+    {"time": START + datetime.timedelta(seconds = 4), "stroke": "AOUB", "undo": False,
+        "undo_translations": [], "undo_strokes": [],
+        "do_translations": ["{^}über long translation"], "do_strokes": ["AOUB"],
+        "characters": 21}
+]
+
+class LogExportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def export(self, name, format_):
+        path = os.path.join(self.directory, name)
+        exporter = log_export.LogStrokeExporter(log_export.create_writer(path, format_), 2)
+        for log_stroke in LOG_STROKES:
+            exporter.add_log_stroke(log_stroke)
+        exporter.finish()
+
+        return path
+
+    @staticmethod
+    def npz_strings(arrays, name, offsets_name, group):
+        data = bytes(arrays[name + "." + group])
+        offsets = arrays[offsets_name + "." + group]
+        return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    @unittest.skipUnless(log_export.import_numpy(), "requires NumPy")
+    def test_npz(self):
+        path = self.export("strokes.npz", "npz")
+
+        rows = []
+        with log_export.numpy.load(path) as arrays:
+            for group in ("0", "1", "2"):
+                columns = {
+                    "time": [time.astype(datetime.datetime) for time in arrays["time." + group]],
+                    "stroke": LogExportTest.npz_strings(arrays, "stroke", "stroke.offsets", group),
+                    "undo": [bool(undo) for undo in arrays["undo." + group]],
+                    "characters": [int(characters) for characters in arrays["characters." + group]]
+                }
+                for prefix in ("undo_", "do_"):
+                    for name in (prefix + "translations", prefix + "strokes"):
+                        values = LogExportTest.npz_strings(arrays, name, name + ".item_offsets", group)
+                        if name.endswith("translations"):
+                            values = [value if valid else None for value, valid
+                                in zip(values, arrays[name + ".valid." + group])]
+
+                        offsets = arrays[name + ".offsets." + group]
+                        columns[name] = [values[offsets[i]:offsets[i + 1]]
+                            for i in range(len(offsets) - 1)]
+
+                rows += [{name: columns[name][i] for name in log_export.COLUMNS}
+                    for i in range(len(columns["time"]))]
+
+            self.assertFalse("time.3" in arrays)
+            # Strings aren't padded to the longest
+            self.assertEqual(arrays["stroke.0"].dtype, log_export.numpy.uint8)
+
+        self.assertEqual(rows, EXPECTED_ROWS)
+
+    @unittest.skipUnless(log_export.import_pyarrow(), "requires pyarrow")
+    def test_parquet(self):
+        path = self.export("strokes.parquet", "parquet")
+
+        parquet_file = log_export.pyarrow.parquet.ParquetFile(path)
+        self.assertEqual(parquet_file.num_row_groups, 3)
+        self.assertEqual(parquet_file.read().to_pylist(), EXPECTED_ROWS)
+
+    @unittest.skipUnless(log_export.import_numpy(), "requires NumPy")
+    def test_abort_removes_partial_file(self):
+        path = os.path.join(self.directory, "strokes.npz")
+        exporter = log_export.LogStrokeExporter(log_export.create_writer(path, "npz"), 2)
+        for log_stroke in LOG_STROKES[:3]:
+            exporter.add_log_stroke(log_stroke)
+        exporter.abort()
+
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import re
+import datetime
+import unittest
+
+import log_parser
+
+
+# Parsing as log_reader.process_log did before LineParser
+def reference_parse_line(line):
+    match = re.match(r"""
+        ^(?P<time>[0-9\-:, ]*)
+        (?P<removal>\*?)Translation\(
+        \((?P<strokes>[A-Z\-,'* ]*)\)
+        \s* : \s*
+        (?:(?:\"(?P<translation>(?:[^\\\"]|(?:\\\\)*\\[^\"]|(?:\\\\)*\\\")*)\")|None)
+        \)
+        """,
+        line,
+        re.VERBOSE)
+
+    if not match:
+        return None
+
+    strokes = match.group("strokes").split(",")
+    strokes[:] = [stroke.strip()[1:-1] for stroke in strokes]
+    if len(strokes) > 0 and len(strokes[-1]) == 0:
+        strokes = strokes[:-1]
+
+    return (
+        datetime.datetime.strptime(match.group("time").strip(), "%Y-%m-%d %H:%M:%S,%f"),
+        match.group("removal") == "*",
+        strokes,
+        match.group("translation"))
+
+LINES = [
+    "2017-02-24 23:40:07,162 Translation(('KAT',) : \"cat\")\n",
+    "2017-02-24 23:40:07,162 *Translation(('KAT',) : \"cat\")\n",
+    "2017-02-24 23:40:08,003 Translation(('A', 'HED') : \"ahead\")\n",
+    "2017-02-24 23:40:08,003 Translation(('TKPW-T',) : None)\n",
+    "2017-02-24 23:40:09,5 Translation(('*',) : \"{*}\")\n",
+    "2017-02-24 23:40:09,123456 Translation(('KW-GS',) : \"{^\\\"}\")\n",
+    "2017-02-24 23:40:10,000 Translation(('PWAPBG', 'SHRARB') : \"\\\\\")\n",
+    "2017-02-24 23:41:00,999 Translation(('STPH-FPLT',) : \"{^\\\\n}\")\n",
+    "2017-02-25 00:00:00,001 Translation(('R-R',) : \"{^\\n^}\")\n",
+    # strptime accepts unpadded fields, which the fast path doesn't handle
+    "2017-2-24 23:40:07,162 Translation(('KAT',) : \"cat\")\n",
+    "2017-02-24 23:40:07,162 Stroke(KAT : ['K-', 'A-', 'T-'])\n",
+    "2017-02-24 23:40:07,162 Translation(('KAT',) : cat)\n",
+    "\n"
+]
+
+class LineParserTest(unittest.TestCase):
+    def test_matches_reference(self):
+        parser = log_parser.LineParser()
+        for line in LINES:
+            self.assertEqual(parser.parse_line(line), reference_parse_line(line), line)
+
+    # Cached times and strokes are for the line they're parsed from
+    def test_caches(self):
+        parser = log_parser.LineParser()
+        for line in LINES + LINES[::-1]:
+            self.assertEqual(parser.parse_line(line), reference_parse_line(line), line)
+
+        strokes = parser.parse_line(LINES[2])[2]
+        strokes.append("KAT")
+        self.assertEqual(parser.parse_line(LINES[2])[2], ["A", "HED"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import shutil
+import tempfile
+import unittest
+import subprocess
+import importlib.util
+
+import log_reader
+
+
+def log_line(time, strokes, translation, removal = False):
+    return "2017-02-24 23:40:" + time + (" *" if removal else " ") \
+        + "Translation((" + ", ".join("'" + stroke + "'" for stroke in strokes) \
+        + ("," if len(strokes) == 1 else "") + ") : \"" + translation + "\")\n"
+
+LINES = [
+    log_line("07,100", ["KAT"], "cat"),
+    log_line("07,300", ["A"], "a"),
+    log_line("07,500", ["A"], "a", True),
+    log_line("07,500", ["A", "HED"], "ahead"),
+    log_line("08,000", ["A", "HED"], "ahead", True),
+    log_line("08,200", ["TPHOT"], "not"),
+    log_line("08,400", ["TPHOT"], "not", True),
+    log_line("08,400", ["TPHOT", "-G"], "nothing"),
+    log_line("09,000", ["KAT"], "cat")
+]
+
+class StreamingTest(unittest.TestCase):
+    # Returns the number of log strokes and the most lines read between two
+    # of them coming out
+    def read_ahead(self, lines):
+        read_lines = []
+        def iter_lines():
+            for line in lines:
+                read_lines.append(line)
+                yield line
+
+        log_processor = log_reader.LogProcessor(None, None, format_text = False)
+        count = 0
+        last_lines_read = 0
+        read_ahead = 0
+        for log_stroke in log_processor.iter_log_strokes(iter_lines()):
+            count += 1
+            read_ahead = max(read_ahead, len(read_lines) - last_lines_read)
+            last_lines_read = len(read_lines)
+
+        return count, read_ahead
+
+    def test_log_without_undos(self):
+        self.assertEqual(self.read_ahead([LINES[0]]*10000), (10000, 1))
+
+    # Only the lines of a stroke that's still being paired are read ahead
+    def test_log_with_undos(self):
+        self.assertEqual(self.read_ahead(LINES*1000), (7000, 2))
+
+REPOSITORY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+@unittest.skipUnless(importlib.util.find_spec("plover") is None, "requires Plover to be missing")
+class MissingPloverTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.directory, "strokes.log")
+        with open(self.log_path, "w") as log_file:
+            log_file.write("".join(LINES))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_setup_raises(self):
+        with self.assertRaises(log_reader.PloverSetupError):
+            log_reader.setup_plover()
+
+    # Workers failing to set up Plover used to leave the pool waiting forever
+    def test_parallel_jobs_exit_with_error(self):
+        result = subprocess.run([sys.executable, "time_statistics.py", "-j", "2", "-w", "60",
+            self.log_path, self.log_path], cwd=REPOSITORY_DIR, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, universal_newlines=True, timeout=60)
+
+        self.assertEqual(result.returncode, 1)
+        self.assertEqual(result.stdout, "")
+        self.assertTrue("Error initialising Plover" in result.stderr)
+
+# Aggregates saved in checkpoints
+class LogStrokes:
+    def __init__(self):
+        self.log_strokes = []
+
+    def add_log_stroke(self, log_stroke):
+        self.log_strokes.append((log_stroke.time, log_stroke.stroke,
+            [translation.translation for translation in log_stroke.undo_translations],
+            [translation.translation for translation in log_stroke.do_translations]))
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_paths = []
+        for i in range(2):
+            self.log_paths.append(os.path.join(self.directory, "strokes.log." + str(i)))
+            with open(self.log_paths[-1], "w") as log_file:
+                log_file.write("".join(LINES*20))
+
+        self.chunk_lines = log_reader.PARALLEL_CHUNK_LINES
+        log_reader.PARALLEL_CHUNK_LINES = 4
+
+    def tearDown(self):
+        log_reader.PARALLEL_CHUNK_LINES = self.chunk_lines
+        shutil.rmtree(self.directory)
+
+    # Chunks split between undos and their translations, and between files
+    def test_matches_serial(self):
+        serial = LogStrokes()
+        for log_stroke in log_reader.LogProcessor(None, None, format_text = False) \
+            .iter_files_log_strokes(self.log_paths):
+            serial.add_log_stroke(log_stroke)
+
+        parallel = LogStrokes()
+        for log_stroke in log_reader.LogProcessor(None, None, format_text = False) \
+            .iter_parallel_files_log_strokes(self.log_paths, 2):
+            parallel.add_log_stroke(log_stroke)
+
+        self.assertEqual(parallel.log_strokes, serial.log_strokes)
+        self.assertEqual(len(parallel.log_strokes), 280)
+
+class LogCheckpointTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.directory, "strokes.log")
+        self.checkpoint_path = os.path.join(self.directory, "strokes.checkpoint")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data, mode = "a"):
+        with open(self.log_path, mode) as log_file:
+            log_file.write(data)
+
+    def run_checkpoint(self, arguments = ["test"]):
+        log_processor = log_reader.LogProcessor(None, None, format_text = False)
+        checkpoint = log_reader.LogCheckpoint.open(self.checkpoint_path, arguments,
+            [self.log_path])
+        aggregates = checkpoint.aggregates if not checkpoint.aggregates is None else LogStrokes()
+
+        for log_stroke in log_processor.iter_checkpoint_log_strokes([self.log_path],
+            checkpoint, aggregates):
+            aggregates.add_log_stroke(log_stroke)
+
+        return aggregates.log_strokes
+
+    def run_all(self):
+        log_processor = log_reader.LogProcessor(None, None, format_text = False)
+        aggregates = LogStrokes()
+        for log_stroke in log_processor.iter_files_log_strokes([self.log_path]):
+            aggregates.add_log_stroke(log_stroke)
+
+        return aggregates.log_strokes
+
+    # Runs split between an undo and its translation, and in the middle of a
+    # line, add up to a single run over the whole log
+    def test_resume_after_append(self):
+        self.write("".join(LINES[:3]), "w")
+        self.run_checkpoint()
+        self.write("".join(LINES[3:7]) + LINES[7][:20])
+        self.run_checkpoint()
+        self.write(LINES[7][20:] + LINES[8])
+
+        self.assertEqual(self.run_checkpoint(), self.run_all())
+        self.assertEqual(len(self.run_all()), 7)
+
+    def test_no_new_lines(self):
+        self.write("".join(LINES), "w")
+        expected = self.run_checkpoint()
+        self.assertEqual(self.run_checkpoint(), expected)
+
+    def test_rewritten_log(self):
+        self.write("".join(LINES), "w")
+        self.run_checkpoint()
+
+        self.write("".join(LINES[1:]), "w")
+        with self.assertRaises(SystemExit):
+            self.run_checkpoint()
+
+    def test_truncated_log(self):
+        self.write("".join(LINES), "w")
+        self.run_checkpoint()
+
+        self.write("".join(LINES[:2]), "w")
+        with self.assertRaises(SystemExit):
+            self.run_checkpoint()
+
+    def test_different_arguments(self):
+        self.write("".join(LINES), "w")
+        self.run_checkpoint()
+
+        with self.assertRaises(SystemExit):
+            self.run_checkpoint(["other"])
+
+
+if __name__ == "__main__":
+    unittest.main()
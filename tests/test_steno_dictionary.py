@@ -0,0 +1,83 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import json
+import shutil
+import tempfile
+import unittest
+
+import steno_dictionary
+
+
+class LoadDictionariesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.directory, "cache")
+        self.top_path = self.write("top.json", {"KAT": "cat", "A/HED": "ahead"})
+        self.bottom_path = self.write("bottom.json", {"A": "a", "KAT": "kat"})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, entries):
+        path = os.path.join(self.directory, name)
+        with open(path, "w") as dictionary_file:
+            json.dump(entries, dictionary_file)
+        return path
+
+    def load(self, cache_dir, later_overrides = False):
+        return list(steno_dictionary.load_dictionaries([self.top_path, self.bottom_path],
+            cache_dir, later_overrides).items())
+
+    # Entries are in the order they were first defined either way
+    def test_earlier_dictionaries_take_precedence(self):
+        expected = [("KAT", "cat"), ("A/HED", "ahead"), ("A", "a")]
+        self.assertEqual(self.load(None), expected)
+        self.assertEqual(self.load(self.cache_dir), expected)
+
+    def test_later_overrides(self):
+        expected = [("KAT", "kat"), ("A/HED", "ahead"), ("A", "a")]
+        self.assertEqual(self.load(None, True), expected)
+        self.assertEqual(self.load(self.cache_dir, True), expected)
+        self.assertEqual(self.load(self.cache_dir)[0], ("KAT", "cat"))
+
+    def test_compiled_again_when_changed(self):
+        self.load(self.cache_dir)
+        self.write("bottom.json", {"A": "a", "KAT": "kat", "HED": "head"})
+
+        self.assertEqual(self.load(self.cache_dir), self.load(None))
+        self.assertEqual(self.load(self.cache_dir)[-1], ("HED", "head"))
+
+    # Within a dictionary the last of duplicate strokes wins as in json.load,
+    # across dictionaries precedence still applies
+    def test_duplicate_strokes_in_a_dictionary(self):
+        with open(self.top_path, "w") as dictionary_file:
+            dictionary_file.write('{"KAT": "cat", "A/HED": "ahead", "KAT": "kit"}')
+        with open(self.top_path) as dictionary_file:
+            self.assertEqual(json.load(dictionary_file)["KAT"], "kit")
+
+        expected = [("KAT", "kit"), ("A/HED", "ahead"), ("A", "a")]
+        self.assertEqual(self.load(None), expected)
+        self.assertEqual(self.load(self.cache_dir), expected)
+        self.assertEqual(self.load(None, True)[0], ("KAT", "kat"))
+
+    # Cut short compiled dictionaries are compiled again
+    def test_truncated_compiled_dictionary(self):
+        expected = self.load(self.cache_dir)
+        path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        key = steno_dictionary.compiled_dictionary_key([self.top_path, self.bottom_path], False)
+        with open(path, "rb") as dictionary_file:
+            data = dictionary_file.read()
+
+        for length in (4, 12, 40, len(data)//2, len(data) - 4, len(data) - 1):
+            with open(path, "wb") as dictionary_file:
+                dictionary_file.write(data[:length])
+            self.assertIsNone(steno_dictionary.Dictionary.load(path, key), length)
+
+        self.assertEqual(self.load(self.cache_dir), expected)
+        self.assertEqual(os.path.getsize(path), len(data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import io
+import json
+import random
+import unittest
+
+import log_reader
+import stroke_ngrams
+
+
+STROKES = ["KAT", "A", "HED", "TPHOT", "-G", "-T", "S"]
+
+def generate_log_strokes(count, seed):
+    rng = random.Random(seed)
+
+    log_strokes = []
+    for i in range(count):
+        # Runs of undos, sometimes more than the strokes written
+        stroke = "*" if rng.random() < 0.1 else rng.choice(STROKES)
+        log_strokes.append(log_reader.LogStroke(None, [], [], stroke))
+
+    return log_strokes
+
+# Counting as stroke_ngrams.py did before the n-gram tree
+def reference_counts(log_strokes, range_, min_count = 0):
+    counts = {}
+
+    strokes = []
+    for log_stroke in log_strokes:
+        if log_stroke.stroke == "*":
+            if len(strokes) > 0:
+                strokes.pop()
+        else:
+            strokes.append(log_stroke.stroke)
+
+            for i in range(range_[0], range_[1]):
+                if len(strokes) > i:
+                    stroke_list = "/".join(strokes[-i:])
+                    counts[stroke_list] = counts.get(stroke_list, 0) + 1
+
+    return sorted(((stroke_list, count) for stroke_list, count in counts.items()
+        if count > min_count), key=lambda o: o[1], reverse=True)
+
+def write_items(stroke_list_counts, min_count = None, limit_output = None):
+    output = io.StringIO()
+    stroke_list_counts.write(output, min_count, limit_output)
+    return json.loads(output.getvalue(), object_pairs_hook=list)
+
+class StrokeListCountsTest(unittest.TestCase):
+    def count(self, log_strokes, range_, approximate = None):
+        stroke_list_counts = stroke_ngrams.create_stroke_list_counts(range_, approximate)
+        for log_stroke in log_strokes:
+            stroke_list_counts.add_log_stroke(log_stroke)
+        stroke_list_counts.finish()
+
+        return stroke_list_counts
+
+    def test_matches_reference(self):
+        log_strokes = generate_log_strokes(2000, 0)
+        for range_ in ((1, 2), (1, 4), (2, 5), (3, 3)):
+            stroke_list_counts = self.count(log_strokes, range_)
+            expected = reference_counts(log_strokes, range_)
+
+            self.assertEqual(write_items(stroke_list_counts), expected, range_)
+            self.assertEqual(write_items(stroke_list_counts, 3), reference_counts(
+                log_strokes, range_, 3), range_)
+            self.assertEqual(write_items(stroke_list_counts, None, 10), expected[:10], range_)
+
+    # Stroke history is trimmed past the longest n-gram
+    def test_long_log(self):
+        log_strokes = generate_log_strokes(10000, 1)
+        self.assertEqual(write_items(self.count(log_strokes, (1, 3))),
+            reference_counts(log_strokes, (1, 3)))
+
+    def test_approximate_with_enough_capacity_is_exact(self):
+        log_strokes = generate_log_strokes(2000, 2)
+        expected = dict(reference_counts(log_strokes, (1, 3)))
+
+        items = write_items(self.count(log_strokes, (1, 3), len(expected)))
+        self.assertEqual({stroke_list: counter[0][1] for stroke_list, counter in items}, expected)
+        self.assertEqual(set(counter[1][1] for stroke_list, counter in items), {0})
+
+    # Counts are overestimated by at most their error, and n-grams more
+    # frequent than the total count over the capacity are always kept
+    def test_approximate_bounds(self):
+        log_strokes = generate_log_strokes(2000, 3)
+        expected = dict(reference_counts(log_strokes, (1, 3)))
+        total = sum(expected.values())
+        capacity = 20
+
+        items = write_items(self.count(log_strokes, (1, 3), capacity))
+        self.assertEqual(len(items), capacity)
+        for stroke_list, counter in items:
+            count, error = counter[0][1], counter[1][1]
+            self.assertTrue(count - error <= expected.get(stroke_list, 0) <= count, stroke_list)
+
+        kept = set(stroke_list for stroke_list, counter in items)
+        for stroke_list, count in expected.items():
+            if count > total/capacity:
+                self.assertTrue(stroke_list in kept, stroke_list)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import shutil
+import sqlite3
+import datetime
+import tempfile
+import unittest
+
+import log_reader
+import stroke_store
+
+
+START = datetime.datetime(2017, 2, 24, 23, 40, 7, 162000)
+
+def time(seconds):
+    return START + datetime.timedelta(seconds = seconds)
+
+def translation(seconds, translation_, strokes, text):
+    return log_reader.Translation(time(seconds), translation_, strokes, text)
+
+# Two log strokes at 3 seconds with the same stroke
+LOG_STROKES = [
+    log_reader.LogStroke(time(0), [], [translation(0, "cat", ["KAT"], " cat")], "KAT"),
+    log_reader.LogStroke(time(1), [translation(1, "a", ["A"], " a")],
+        [translation(1, "ahead", ["A", "HED"], " ahead")], "HED"),
+    log_reader.LogStroke(time(2), [], [translation(2, None, ["TKPW-T"], " TKPW-T")], "TKPW-T"),
+    log_reader.LogStroke(time(3), [translation(3, None, ["TKPW-T"], " TKPW-T")], [], "*"),
+    log_reader.LogStroke(time(3), [translation(0, "cat", ["KAT"], " cat")], [], "*"),
+    log_reader.LogStroke(time(4), [], [translation(4, "über", ["AOUB"], " über")], "AOUB")
+]
+
+def log_line(seconds, strokes, translation_, removal = False):
+    return time(seconds).strftime("%Y-%m-%d %H:%M:%S,%f")[:-3] \
+        + (" *" if removal else " ") + "Translation((" \
+        + ", ".join("'" + stroke + "'" for stroke in strokes) \
+        + ("," if len(strokes) == 1 else "") + ") : \"" + translation_ + "\")\n"
+
+# Undos are logged before the translations replacing them
+LOG_LINES = [
+    log_line(0, ["KAT"], "cat"),
+    log_line(1, ["A"], "a"),
+    log_line(2, ["A"], "a", True),
+    log_line(2, ["A", "HED"], "ahead"),
+    log_line(3, ["A", "HED"], "ahead", True),
+    log_line(4, ["TPHOT"], "not"),
+    log_line(5, ["TPHOT"], "not", True),
+    log_line(5, ["TPHOT", "-G"], "nothing")
+]
+
+def log_stroke_values(log_strokes):
+    return [(log_stroke.time, log_stroke.stroke,
+        [(translation.time, translation.translation, translation.strokes, translation.text)
+            for translation in log_stroke.undo_translations],
+        [(translation.time, translation.translation, translation.strokes, translation.text)
+            for translation in log_stroke.do_translations])
+        for log_stroke in log_strokes]
+
+class StrokeStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # Characters that are escaped in URIs
+        self.path = os.path.join(self.directory, "strokes #1%.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def ingest(self, log_strokes):
+        store = stroke_store.StrokeStore(self.path)
+        counts = store.ingest(log_strokes)
+        store.close()
+
+        return counts
+
+    def ingest_lines(self, lines):
+        log_processor = log_reader.LogProcessor(None, None, format_text = False)
+        store = stroke_store.StrokeStore(self.path)
+        counts = store.ingest(log_processor.iter_log_strokes(lines), log_processor)
+        store.close()
+
+        return counts
+
+    def read(self, since = None, until = None):
+        store = stroke_store.StrokeStore(self.path, True)
+        log_strokes = log_stroke_values(store.iter_log_strokes(since, until))
+        store.close()
+
+        return log_strokes
+
+    def test_round_trip(self):
+        self.assertEqual(self.ingest(LOG_STROKES), (6, 0, 0))
+        self.assertEqual(self.read(), log_stroke_values(LOG_STROKES))
+
+    def test_ingest_again_adds_only_new_log_strokes(self):
+        self.assertEqual(self.ingest(LOG_STROKES[:4]), (4, 0, 0))
+        self.assertEqual(self.ingest(LOG_STROKES), (2, 4, 0))
+        self.assertEqual(self.ingest(LOG_STROKES), (0, 6, 0))
+
+        self.assertEqual(self.read(), log_stroke_values(LOG_STROKES))
+
+    # A log read up to an undo whose translation is logged after it, then
+    # read again in full, is stored as if it was only read in full
+    def test_ingest_log_prefix_then_full_log(self):
+        self.assertEqual(self.ingest_lines(LOG_LINES[:3]), (2, 0, 1))
+        self.assertEqual(self.ingest_lines(LOG_LINES), (4, 2, 0))
+
+        log_processor = log_reader.LogProcessor(None, None, format_text = False)
+        self.assertEqual(self.read(), log_stroke_values(log_processor.iter_log_strokes(LOG_LINES)))
+        self.assertEqual([log_stroke[1] for log_stroke in self.read()], ["KAT", "A", "HED", "*", "TPHOT", "-G"])
+
+    def test_since_until(self):
+        self.ingest(LOG_STROKES)
+
+        for since, until in ((time(1), None), (None, time(3)), (time(1), time(3)),
+            (time(3), time(3.5)), (time(5), None), (None, time(0))):
+            self.assertEqual(self.read(since, until), log_stroke_values(
+                log_reader.filter_time_range(LOG_STROKES, since, until)), (since, until))
+
+    def test_read_only(self):
+        self.ingest(LOG_STROKES)
+
+        store = stroke_store.StrokeStore(self.path, True)
+        with self.assertRaises(sqlite3.OperationalError):
+            store.ingest(LOG_STROKES)
+        store.close()
+
+    def test_read_only_missing_database(self):
+        with self.assertRaises(sqlite3.OperationalError):
+            stroke_store.StrokeStore(self.path, True)
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import io
+import random
+import datetime
+import unittest
+
+import log_reader
+import time_statistics
+
+
+START = datetime.datetime(2017, 2, 24, 23, 40, 7, 162000)
+
+def log_stroke(seconds, stroke = "-T"):
+    time_ = START + datetime.timedelta(seconds = seconds)
+    translations = [log_reader.Translation(time_, "the", ["-T"], " the")]
+    if stroke == "*":
+        return log_reader.LogStroke(time_, translations, [], stroke)
+    return log_reader.LogStroke(time_, [], translations, stroke)
+
+# Bursts of strokes separated by pauses of up to a few minutes
+def generate_log_strokes(count, seed):
+    rng = random.Random(seed)
+
+    log_strokes = []
+    seconds = 0
+    for i in range(count):
+        seconds += rng.uniform(30, 300) if rng.random() < 0.02 else rng.uniform(0.05, 0.6)
+        log_strokes.append(log_stroke(seconds, "*" if rng.random() < 0.05 else "-T"))
+
+    return log_strokes
+
+def write_rows(log_strokes, sample_window, speed_activation, use_numpy = False):
+    time_statistics_ = time_statistics.create_time_statistics(sample_window,
+        speed_activation, use_numpy)
+    for log_stroke_ in log_strokes:
+        time_statistics_.add_log_stroke(log_stroke_)
+    time_statistics_.finish()
+
+    output = io.StringIO()
+    time_statistics_.write(output, True)
+    return output.getvalue().splitlines()
+
+class TimeStatisticsTest(unittest.TestCase):
+    def test_rows(self):
+        rows = write_rows([log_stroke(0), log_stroke(1.5), log_stroke(1.7, "*"),
+            log_stroke(4.2), log_stroke(4.5)], 1, None)
+
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1], "2017-02-24T23:40:07.162000,1,4,0,0,1.0,"
+            + "=B2 + D2,=B2 - D2,=C2 - E2,=I2/5,=G2 / J2,=H2 / J2,=G2 * 60 / F2,"
+            + "=H2 * 60 / F2,=J2 * 60 / F2,")
+        self.assertTrue(rows[2].startswith("2017-02-24T23:40:08.162000,1,4,1,4,1.0,"))
+        # Windows wholly in the active period without strokes
+        self.assertTrue(rows[3].startswith("2017-02-24T23:40:09.162000,0,0,0,0,1.0,=B4 + D4,"))
+        self.assertTrue(rows[4].startswith("2017-02-24T23:40:10.162000,0,0,0,0,1.0,"))
+        # The period ends at the last stroke, which isn't counted
+        self.assertTrue(rows[5].startswith("2017-02-24T23:40:11.162000,1,4,0,0,0.5,"))
+
+    @unittest.skipUnless(time_statistics.import_numpy(), "requires NumPy")
+    def test_matches_numpy(self):
+        log_strokes = generate_log_strokes(3000, 0)
+        for sample_window, speed_activation in ((60, None), (0.5, None),
+            (1, [2, 1, 5]), (10, [1, 0.5, 30]), (0.25, [3, 2, 2])):
+            self.assertEqual(write_rows(log_strokes, sample_window, speed_activation),
+                write_rows(log_strokes, sample_window, speed_activation, True),
+                (sample_window, speed_activation))
+
+    # Importing a module set to None in sys.modules fails as if it's missing
+    def test_numpy_backend_without_numpy(self):
+        imported_numpy = time_statistics.numpy
+        numpy_module = sys.modules.get("numpy")
+        time_statistics.numpy = None
+        sys.modules["numpy"] = None
+        try:
+            with self.assertRaises(ImportError):
+                time_statistics.create_time_statistics(60, None, True)
+        finally:
+            time_statistics.numpy = imported_numpy
+            if numpy_module is None:
+                del sys.modules["numpy"]
+            else:
+                sys.modules["numpy"] = numpy_module
+
+
+if __name__ == "__main__":
+    unittest.main()
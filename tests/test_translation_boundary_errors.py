@@ -0,0 +1,181 @@
+import os
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import json
+import random
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+from collections import OrderedDict
+
+import steno_dictionary
+import translation_boundary_errors
+
+
+DICTIONARY = {
+    "A": "a",
+    "HED": "head",
+    "A/HED": "ahead",
+    "KAT": "cat",
+    "KAT/A": "cata",
+    "KAT/A/HED": "cat ahead",
+    "HED/KAT": "head cat",
+    "TPHOT/-G": "nothing",
+    "TPHOT": "not"
+}
+
+class BoundaryErrorMatchesTest(unittest.TestCase):
+    def matches(self, dictionary_entries, include_trivial):
+        dictionary = steno_dictionary.Dictionary(dictionary_entries)
+        matcher = translation_boundary_errors.BoundaryErrorMatcher(dictionary, include_trivial)
+
+        matches = {}
+        for entry in range(len(dictionary)):
+            segmentations = matcher.segment(dictionary.entry_ids(entry))
+            if not segmentations is None:
+                matches[dictionary.entry_key(entry)] = matcher.render_matches(
+                    dictionary.entry_strokes(entry), matcher.matches(segmentations))
+
+        return matches
+
+    def test_matches(self):
+        self.assertEqual(self.matches(DICTIONARY, False), {
+            "A/HED": {"A HED/": 2},
+            "KAT/A": {"KAT A/": 2},
+            "KAT/A/HED": {"KAT A HED/": 2, "KAT/A HED/": 2, "KAT A/HED": 1},
+            "HED/KAT": {"HED KAT/": 3}
+        })
+
+    # Completing the only entry starting with the strokes to themselves is
+    # the same match as the trivial one
+    def test_trivial_matches(self):
+        self.assertEqual(self.matches(DICTIONARY, True)["KAT/A/HED"], {
+            "KAT A/HED": 1,
+            "KAT A HED": 1,
+            "KAT A HED/": 2,
+            "KAT/A HED": 1,
+            "KAT/A HED/": 2
+        })
+
+    def test_completed_matches(self):
+        self.assertEqual(self.matches({
+            "KAT": "cat",
+            "TPHOT/-G": "nothing",
+            "KAT/TPHOT": "cat not"
+        }, False), {"KAT/TPHOT": {"KAT TPHOT/-G": 1}})
+
+STROKES = ["A", "HED", "KAT", "TPHOT", "-G", "S", "-T", "TK"]
+
+def generate_dictionary(rng, count):
+    entries = OrderedDict()
+    while len(entries) < count:
+        strokes_str = "/".join(rng.choice(STROKES) for i in range(rng.randint(1, 3)))
+        entries[strokes_str] = strokes_str.lower()
+
+    return entries
+
+class BoundaryErrorIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.directory, "boundary_errors.index")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # Updates the index at path to the dictionary entries as
+    # translation_boundary_errors.py --index does, and returns the index's
+    # boundary errors and the number of entries checked
+    def update_index(self, path, dictionary_entries):
+        dictionary = steno_dictionary.Dictionary(dictionary_entries)
+        matcher = translation_boundary_errors.BoundaryErrorMatcher(dictionary, False)
+
+        index = translation_boundary_errors.BoundaryErrorIndex.load(path, False)
+        check_entries = index.update(OrderedDict(dictionary.items()))
+        index.add_boundary_errors((dictionary.entry_key(entry),
+            matcher.render_matches(dictionary.entry_strokes(entry), matches))
+            for entry_count, boundary_errors in translation_boundary_errors.iter_boundary_errors(
+                matcher, check_entries, 1)
+            for entry, matches in boundary_errors)
+        index.save()
+
+        return list(index.boundary_errors.items()), len(check_entries)
+
+    # Updating with a few entries added and removed only checks the affected
+    # entries and gives the same boundary errors as a new index
+    def test_incremental_update(self):
+        rng = random.Random(0)
+        dictionary_entries = generate_dictionary(rng, 200)
+        self.update_index(self.index_path, dictionary_entries)
+
+        for i in range(10):
+            for strokes_str in rng.sample(list(dictionary_entries), rng.randint(0, 3)):
+                del dictionary_entries[strokes_str]
+            for strokes_str, translation in generate_dictionary(rng, 3).items():
+                dictionary_entries[strokes_str] = translation
+
+            boundary_errors, checked = self.update_index(self.index_path, dictionary_entries)
+            expected, total = self.update_index(os.path.join(self.directory, str(i)),
+                dictionary_entries)
+            self.assertTrue(len(expected) > 0)
+            self.assertEqual(boundary_errors, expected)
+            self.assertTrue(checked < total)
+
+    def test_large_change(self):
+        rng = random.Random(1)
+        self.update_index(self.index_path, generate_dictionary(rng, 200))
+
+        dictionary_entries = generate_dictionary(rng, 100)
+        self.assertEqual(self.update_index(self.index_path, dictionary_entries),
+            self.update_index(os.path.join(self.directory, "new"), dictionary_entries))
+
+    def test_trivial_mismatch(self):
+        self.update_index(self.index_path, DICTIONARY)
+        with self.assertRaises(translation_boundary_errors.BoundaryErrorIndexError):
+            translation_boundary_errors.BoundaryErrorIndex.load(self.index_path, True)
+
+class BoundaryErrorsSpawnTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dictionary_path = os.path.join(self.directory, "dictionary.json")
+        with open(self.dictionary_path, "w") as dictionary_file:
+            json.dump(DICTIONARY, dictionary_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def boundary_errors(self, dictionary, pool):
+        matcher = translation_boundary_errors.BoundaryErrorMatcher(dictionary, False)
+        entries = range(len(dictionary))
+        shards = [(start, min(start + 2, len(entries))) for start in range(0, len(entries), 2)]
+
+        if pool is None:
+            translation_boundary_errors.set_shard_entries(matcher, entries)
+            results = map(translation_boundary_errors.find_shard_boundary_errors, shards)
+        else:
+            with pool(2, translation_boundary_errors.set_shard_entries, (matcher, entries)) as pool_:
+                results = list(pool_.imap(translation_boundary_errors.find_shard_boundary_errors, shards))
+
+        return [boundary_error for count, boundary_errors in results
+            for boundary_error in boundary_errors]
+
+    # Workers started with spawn, the default on macOS and Windows, get the
+    # matcher pickled
+    def check_spawn(self, cache_dir):
+        dictionary = steno_dictionary.load_dictionaries([self.dictionary_path], cache_dir)
+        expected = self.boundary_errors(dictionary, None)
+        self.assertTrue(len(expected) > 0)
+
+        self.assertEqual(self.boundary_errors(dictionary,
+            multiprocessing.get_context("spawn").Pool), expected)
+
+    def test_spawn(self):
+        self.check_spawn(None)
+
+    def test_spawn_compiled_dictionary(self):
+        self.check_spawn(os.path.join(self.directory, "cache"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,45 +1,157 @@
 #!/usr/bin/env python3
 
+import sys
 from argparse import ArgumentParser
 
 import log_reader
+import instrumentation
+import log_cache
 
+import array
 import datetime
 import math
 import collections
 
+# NumPy is slow to import, so it's only imported for the NumPy backend
+numpy = None
 
-def speed_filter(strokes, speed_activate, speed_deactivate, sample_duration):
-    strokes_buffer = []
+def import_numpy():
+    global numpy
 
-    active_periods = []
+    if numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            return False
+
+    return True
+
+
+# Fewest strokes in a window of sample_seconds at or above speed, adjusted
+# while rounding puts it off by a stroke
+def speed_stroke_count(speed, sample_seconds):
+    count = max(math.ceil(speed*sample_seconds), 0)
+    while count > 0 and (count - 1)/sample_seconds >= speed:
+        count -= 1
+    while count/sample_seconds < speed:
+        count += 1
+
+    return count
+
+class SpeedFilter:
+    def __init__(self, speed_activate, speed_deactivate, sample_duration):
+        self.speed_activate = speed_activate
+        self.speed_deactivate = speed_deactivate
+        self.sample_duration = sample_duration
+        self.sample_seconds = sample_duration.total_seconds()
+
+        # Speeds are compared as counts of strokes in the window
+        self.activate_count = speed_stroke_count(speed_activate, self.sample_seconds)
+        self.deactivate_count = speed_stroke_count(speed_deactivate, self.sample_seconds)
+
+        # Times of strokes in the speed window
+        self.times_buffer = collections.deque()
+
+        self.activate_time = None
+        self.last_time = None
 
-    activate_time = None
+    # The active period ended by this update, if any
+    def update(self, popped_time):
+        count = len(self.times_buffer)
 
-    strokes_i = 0
-    while strokes_i < len(strokes):
-        popped_stroke = None
-        if len(strokes_buffer) > 0 and \
-            strokes[strokes_i].time - strokes_buffer[0].time > sample_duration:
-            popped_stroke = strokes_buffer[0]
-            del strokes_buffer[0]
+        if self.activate_time is None:
+            if count >= self.activate_count:
+                self.activate_time = self.times_buffer[-1]
+        elif count < self.deactivate_count:
+            active_period = (self.activate_time, popped_time)
+            self.activate_time = None
+            return active_period
+
+        return None
+
+    def add_stroke(self, stroke):
+        active_periods = ()
+
+        times_buffer = self.times_buffer
+        while len(times_buffer) > 0 and \
+            stroke.time - times_buffer[0] > self.sample_duration:
+            active_period = self.update(times_buffer.popleft())
+            if not active_period is None:
+                active_periods += (active_period,)
+
+        times_buffer.append(stroke.time)
+        self.last_time = stroke.time
+        active_period = self.update(None)
+        if not active_period is None:
+            active_periods += (active_period,)
+
+        return active_periods
+
+    def finish(self):
+        active_periods = []
+
+        if not self.activate_time is None:
+            deactivate_time = self.last_time
+            active_periods.append((self.activate_time, deactivate_time))
+            self.activate_time = None
+
+        return active_periods
+
+    # Strokes before this time are either in a returned active period,
+    # in the current active period or in no active period
+    def settled_time(self):
+        if not self.activate_time is None:
+            return self.times_buffer[0]
         else:
-            strokes_buffer.append(strokes[strokes_i])
-            strokes_i += 1
+            return self.last_time
+
+    # Whether a stroke at time would find the filter still active, strokes
+    # only deactivate it when they arrive. Stroke times are in order, so
+    # there are enough strokes in the window if the last deactivate_count
+    # are.
+    def active_at(self, time):
+        if self.activate_time is None:
+            return False
+        if self.deactivate_count <= 0:
+            return True
+
+        return len(self.times_buffer) >= self.deactivate_count \
+            and time - self.times_buffer[-self.deactivate_count] <= self.sample_duration
+
+class NoFilter:
+    def __init__(self):
+        self.activate_time = None
+        self.last_time = None
+
+    def add_stroke(self, stroke):
+        if self.activate_time is None:
+            self.activate_time = stroke.time
+        self.last_time = stroke.time
+
+        return ()
+
+    def finish(self):
+        active_periods = []
+
+        if not self.activate_time is None:
+            active_periods.append((self.activate_time, self.last_time))
+            self.activate_time = None
+
+        return active_periods
+
+    def settled_time(self):
+        return self.last_time
 
-        speed = len(strokes_buffer)/sample_duration.total_seconds()
+    def active_at(self, time):
+        return not self.activate_time is None
 
-        if speed >= speed_activate and activate_time is None:
-            activate_time = strokes_buffer[-1].time
-        elif speed < speed_deactivate and not activate_time is None:
-            deactivate_time = popped_stroke.time
-            active_periods.append((activate_time, deactivate_time))
-            activate_time = None
+def speed_filter(strokes, speed_activate, speed_deactivate, sample_duration):
+    speed_filter_ = SpeedFilter(speed_activate, speed_deactivate, sample_duration)
 
-    if not activate_time is None:
-        deactivate_time = strokes[-1].time
-        active_periods.append((activate_time, deactivate_time))
-        activate_time = None
+    active_periods = []
+    for stroke in strokes:
+        active_periods += speed_filter_.add_stroke(stroke)
+    active_periods += speed_filter_.finish()
 
     return active_periods
 
@@ -47,6 +159,16 @@ def intersection(a1, a2, b1, b2):
     return (max(a1, b1), min(a2, b2))
 
 
+# Derived formulas split around their row number
+DERIVED_CSV_PARTS = ("=B{0} + D{0},=B{0} - D{0},=C{0} - E{0},=I{0}/5," \
+    + "=G{0} / J{0},=H{0} / J{0},=G{0} * 60 / F{0},=H{0} * 60 / F{0},=J{0} * 60 / F{0},").split("{0}")
+
+def csv_row(row, period_start, stroke_count, character_count, undo_stroke_count,
+    undo_character_count, active_seconds, add_derived):
+    return "%s,%d,%d,%d,%d,%s," % (period_start.isoformat(), stroke_count,
+        character_count, undo_stroke_count, undo_character_count, active_seconds) \
+        + (str(row).join(DERIVED_CSV_PARTS) if add_derived else "")
+
 class LogStat:
     def __init__(self, period):
         self.period = period
@@ -80,23 +202,9 @@ class LogStat:
             self.character_count += len(translation.text)
 
     def to_csv_row(self, row, add_derived):
-        row = str(row)
-        return self.period[0].isoformat() + "," \
-            + str(self.stroke_count) + "," \
-            + str(self.character_count) + "," \
-            + str(self.undo_stroke_count) + "," \
-            + str(self.undo_character_count) + "," \
-            + str(self.active_time.total_seconds()) + "," \
-            + (("=B" + row + " + D" + row + "," \
-                + "=B" + row + " - D" + row + "," \
-                + "=C" + row + " - E" + row + "," \
-                + "=I" + row + "/5," \
-                + "=G" + row + " / J" + row + "," \
-                + "=H" + row + " / J" + row + "," \
-                + "=G" + row + " * 60 / F" + row + "," \
-                + "=H" + row + " * 60 / F" + row + "," \
-                + "=J" + row + " * 60 / F" + row + ","
-            ) if add_derived else "")
+        return csv_row(row, self.period[0], self.stroke_count, self.character_count,
+            self.undo_stroke_count, self.undo_character_count,
+            self.active_time.total_seconds(), add_derived)
 
     @staticmethod
     def csv_header(add_derived):
@@ -117,63 +225,354 @@ class LogStat:
                 + "net word/min,"
             ) if add_derived else "")
 
+# Strokes are counted once this many are waiting to be settled
+SETTLE_STROKE_COUNT = 1024
+
+# Rows are written to the output this many at a time
+WRITE_ROW_COUNT = 4096
+
+class TimeStatistics:
+    def __init__(self, sample_duration, period_filter):
+        self.sample_duration = sample_duration
+        self.period_filter = period_filter
+
+        # Sample windows are numbered from the first stroke. Windows with
+        # strokes or at the ends of active periods are stored in order, the
+        # windows between the ends of an active period are in active_ranges.
+        self.start_time = None
+        self.log_stat_count = 0
+        self.log_stat_indexes = []
+        self.log_stats = []
+        self.active_ranges = []
+
+        # Strokes not yet known to be inside or outside an active period,
+        # only settled once enough are waiting
+        self.pending_strokes = collections.deque()
+        self.settle_stroke_count = SETTLE_STROKE_COUNT
+
+        self.active_period_start = None
+        self.active_period_first_i = None
+        self.active_period_first = None
+
+    def add_log_stroke(self, stroke):
+        if self.start_time is None:
+            self.start_time = stroke.time
+            self.log_stat_count = 1
+
+        active_periods = self.period_filter.add_stroke(stroke)
+        self.pending_strokes.append(stroke)
+
+        for active_period in active_periods:
+            self.add_active_period(active_period)
+
+        if len(self.pending_strokes) >= self.settle_stroke_count:
+            self.settle()
+
+    def finish(self):
+        for active_period in self.period_filter.finish():
+            self.add_active_period(active_period)
+
+        self.pending_strokes.clear()
+
+    def write(self, output, add_derived):
+        print(LogStat.csv_header(add_derived), file=output)
+
+        sample_duration = self.sample_duration
+        derived_parts = DERIVED_CSV_PARTS if add_derived else ("",)
+        # Rows of windows without stored figures, after their start time
+        empty_row = ",0,0,0,0," + str(0.0) + ","
+        full_active_row = ",0,0,0,0," + str(sample_duration.total_seconds()) + ","
+
+        rows = []
+        def write_rows():
+            output.write("\n".join(rows) + "\n")
+            rows.clear()
+
+        def add_rows(first_i, end_i, row_end):
+            for chunk_first_i in range(first_i, end_i, WRITE_ROW_COUNT):
+                period_start = self.start_time + chunk_first_i*sample_duration
+                for row in range(chunk_first_i + 2, min(chunk_first_i + WRITE_ROW_COUNT, end_i) + 2):
+                    rows.append(period_start.isoformat() + row_end + str(row).join(derived_parts))
+                    period_start += sample_duration
+
+                if len(rows) >= WRITE_ROW_COUNT:
+                    write_rows()
+
+        log_stat_i = 0
+        active_ranges_i = 0
+        for stored_i, log_stat in zip(self.log_stat_indexes + [self.log_stat_count],
+            self.log_stats + [None]):
+            # Windows before the stored one, in and out of active ranges
+            while log_stat_i < stored_i:
+                while active_ranges_i < len(self.active_ranges) \
+                    and self.active_ranges[active_ranges_i][1] <= log_stat_i:
+                    active_ranges_i += 1
+
+                if active_ranges_i == len(self.active_ranges):
+                    end_i, row_end = stored_i, empty_row
+                elif self.active_ranges[active_ranges_i][0] > log_stat_i:
+                    end_i, row_end = min(self.active_ranges[active_ranges_i][0], stored_i), empty_row
+                else:
+                    end_i, row_end = min(self.active_ranges[active_ranges_i][1], stored_i), full_active_row
+
+                add_rows(log_stat_i, end_i, row_end)
+                log_stat_i = end_i
+
+            if log_stat is None:
+                break
+
+            active_time = log_stat.active_time
+            if active_ranges_i < len(self.active_ranges) \
+                and self.active_ranges[active_ranges_i][0] <= log_stat_i < self.active_ranges[active_ranges_i][1]:
+                active_time = sample_duration
+            rows.append(csv_row(log_stat_i + 2, log_stat.period[0], log_stat.stroke_count,
+                log_stat.character_count, log_stat.undo_stroke_count,
+                log_stat.undo_character_count, active_time.total_seconds(), add_derived))
+            log_stat_i += 1
+
+        if len(rows) > 0:
+            write_rows()
+
+    def log_stat_index(self, time):
+        return (time - self.start_time)//self.sample_duration
+
+    # Windows are stored in order, so log_stat_i is never before the last
+    # stored window
+    def stored_log_stat(self, log_stat_i):
+        if len(self.log_stat_indexes) == 0 or self.log_stat_indexes[-1] != log_stat_i:
+            period_start = self.start_time + log_stat_i*self.sample_duration
+            self.log_stat_indexes.append(log_stat_i)
+            self.log_stats.append(LogStat((period_start, period_start + self.sample_duration)))
+            self.log_stat_count = max(self.log_stat_count, log_stat_i + 1)
+
+        return self.log_stats[-1]
+
+    def start_active_period(self, start):
+        if self.active_period_start == start:
+            return
+
+        self.active_period_start = start
+        self.active_period_first_i = max(self.log_stat_index(start), self.log_stat_count - 1)
+        self.active_period_first = self.stored_log_stat(self.active_period_first_i)
+
+    # Windows between the first and last of an active period are wholly
+    # inside it, so only the ends have part of it
+    def add_active_period(self, active_period):
+        self.start_active_period(active_period[0])
+        self.count_strokes(active_period[1])
+
+        first_i = self.active_period_first_i
+        last_i = self.log_stat_indexes[-1]
+        self.active_period_first.add_period(active_period)
+        if last_i != first_i:
+            self.log_stats[-1].add_period(active_period)
+        if last_i > first_i + 1:
+            self.active_ranges.append((first_i + 1, last_i))
+
+        self.active_period_start = None
+        self.active_period_first_i = None
+        self.active_period_first = None
+
+    def settle(self):
+        if not self.period_filter.activate_time is None:
+            self.start_active_period(self.period_filter.activate_time)
+
+        self.count_strokes(self.period_filter.settled_time())
+        self.settle_stroke_count = len(self.pending_strokes) + SETTLE_STROKE_COUNT
+
+    # Counts pending strokes before end_time in the current active period
+    def count_strokes(self, end_time):
+        pending_strokes = self.pending_strokes
+        active_period_start = self.active_period_start
+        log_stats = self.log_stats
+        while len(pending_strokes) > 0 and pending_strokes[0].time < end_time:
+            stroke = pending_strokes.popleft()
+            if active_period_start is None or stroke.time < active_period_start:
+                continue
+
+            if len(log_stats) > 0 and stroke.time < log_stats[-1].period[1]:
+                log_stats[-1].add_stroke(stroke)
+            else:
+                log_stat_i = max(self.log_stat_index(stroke.time), self.log_stat_count - 1)
+                self.stored_log_stat(log_stat_i).add_stroke(stroke)
+
+# Time statistics computed with NumPy from stroke arrays when finished,
+# output matches TimeStatistics
+class NumpyTimeStatistics:
+    def __init__(self, sample_duration, period_filter):
+        self.sample_duration = sample_duration
+        self.period_filter = period_filter
+
+        # Epoch microseconds
+        self.times = array.array("q")
+        self.undos = array.array("B")
+        self.character_counts = array.array("q")
+        self.undo_character_counts = array.array("q")
+
+        self.period_starts = array.array("q")
+        self.period_ends = array.array("q")
+
+        self.start_us = None
+        self.log_stat_counts = None
+
+    def add_log_stroke(self, stroke):
+        self.times.append(log_cache.time_to_epoch_us(stroke.time))
+        self.undos.append(1 if stroke.stroke == "*" else 0)
+        character_count = 0
+        for translation in stroke.do_translations:
+            character_count += len(translation.text)
+        self.character_counts.append(character_count)
 
-arg_parser = ArgumentParser(description="Measure statistics over time in Plover logs. Outputs as CSV to standard out.")
-arg_parser.add_argument("logs", nargs="+", help="log file paths")
-arg_parser.add_argument("-r", "--resume", help="start recording after encountering this translation")
-arg_parser.add_argument("-s", "--suspend", help="stop recording when encountering this translation")
-arg_parser.add_argument("-sa", "--speed_activation", nargs=3, type=float, help="speed to start recording on (stroke/second), speed to stop recording on (stroke/second), length of window to check speed in (seconds)")
-arg_parser.add_argument("-w", "--sample-window", required=True, type=float, help="duration of time (seconds) to sample for each discrete statistic")
-arg_parser.add_argument("--raw", action="store_true", help="raw statistics only, no derived")
-args = arg_parser.parse_args()
-
-log = []
-for log_file in args.logs:
-    with open(log_file) as data_file:
-        log += data_file.readlines()
-
-log_strokes = log_reader.process_log(log, args.resume, args.suspend)
-
-sample_duration = datetime.timedelta(seconds = args.sample_window)
-
-active_periods = [(log_strokes[0].time, log_strokes[-1].time)]
-if not args.speed_activation is None:
-    active_periods = speed_filter(
-        log_strokes,
-        args.speed_activation[0],
-        args.speed_activation[1],
-        datetime.timedelta(seconds = args.speed_activation[2]))
-
-log_stats = []
-log_stats.append(LogStat((log_strokes[0].time, log_strokes[0].time + sample_duration)))
-
-stroke_i = 0
-for active_period in active_periods:
-    while active_period[0] >= log_stats[-1].period[1]:
-        log_stats.append(LogStat((
-            log_stats[-1].period[1],
-            log_stats[-1].period[1] + sample_duration)))
-
-    log_stats[-1].add_period(active_period)
-
-    while log_strokes[stroke_i].time < active_period[0]:
-        stroke_i += 1
-
-    while log_strokes[stroke_i].time < active_period[1]:
-        stroke = log_strokes[stroke_i]
-
-        while stroke.time >= log_stats[-1].period[1]:
-            log_stats.append(LogStat((
-                log_stats[-1].period[1],
-                log_stats[-1].period[1] + sample_duration)))
-            log_stats[-1].add_period(active_period)
-
-        log_stats[-1].add_stroke(stroke)
-
-        stroke_i += 1
-
-print(LogStat.csv_header(not args.raw))
-row = 2
-for log_stat in log_stats:
-    print(log_stat.to_csv_row(row, not args.raw))
-    row += 1
+        undo_character_count = 0
+        for translation in stroke.undo_translations:
+            undo_character_count += len(translation.text)
+        self.undo_character_counts.append(undo_character_count)
+
+        self.add_active_periods(self.period_filter.add_stroke(stroke))
+
+    def add_active_periods(self, active_periods):
+        for active_period in active_periods:
+            self.period_starts.append(log_cache.time_to_epoch_us(active_period[0]))
+            self.period_ends.append(log_cache.time_to_epoch_us(active_period[1]))
+
+    def finish(self):
+        self.add_active_periods(self.period_filter.finish())
+
+        if len(self.times) == 0:
+            return
+
+        sample_us = self.sample_duration//log_cache.MICROSECOND
+        times = numpy.frombuffer(self.times, dtype=numpy.int64)
+        start = times[0]
+        period_starts = numpy.frombuffer(self.period_starts, dtype=numpy.int64)
+        period_ends = numpy.frombuffer(self.period_ends, dtype=numpy.int64)
+
+        # Strokes are counted in the active period they start in
+        stroke_periods = numpy.searchsorted(period_starts, times, side="right") - 1
+        counted = stroke_periods >= 0
+        counted[counted] = times[counted] < period_ends[stroke_periods[counted]]
+        stroke_periods = stroke_periods[counted]
+        stroke_stats_i = (times[counted] - start)//sample_us
+
+        # Active periods are added to sample windows from their start up to
+        # their last counted stroke
+        period_first_i = (period_starts - start)//sample_us
+        period_last_i = period_first_i.copy()
+        numpy.maximum.at(period_last_i, stroke_periods, stroke_stats_i)
+
+        log_stat_count = 1
+        if len(period_first_i) > 0:
+            log_stat_count = max(log_stat_count, int(period_first_i.max()) + 1)
+        if len(stroke_stats_i) > 0:
+            log_stat_count = max(log_stat_count, int(stroke_stats_i.max()) + 1)
+
+        def count(values):
+            return numpy.bincount(stroke_stats_i, values[counted],
+                log_stat_count).astype(numpy.int64)
+
+        undos = numpy.frombuffer(self.undos, dtype=numpy.uint8).astype(numpy.int64)
+        undo_stroke_counts = count(undos)
+        stroke_counts = count(1 - undos)
+        character_counts = count(
+            numpy.frombuffer(self.character_counts, dtype=numpy.int64))
+        undo_character_counts = count(
+            numpy.frombuffer(self.undo_character_counts, dtype=numpy.int64))
+
+        # Active periods have part of their first and last sample windows,
+        # the windows between are wholly inside them
+        def period_active_times(period_stats_i, periods):
+            active = numpy.minimum(period_ends, start + (period_stats_i + 1)*sample_us) \
+                - numpy.maximum(period_starts, start + period_stats_i*sample_us)
+            return numpy.bincount(period_stats_i[periods],
+                numpy.maximum(active, 0)[periods], log_stat_count)
+
+        active_times = period_active_times(period_first_i, slice(None)) \
+            + period_active_times(period_last_i, period_last_i != period_first_i)
+
+        has_middle = period_last_i > period_first_i + 1
+        middle_counts = numpy.cumsum(
+            numpy.bincount(period_first_i[has_middle] + 1, minlength=log_stat_count + 1)
+            - numpy.bincount(period_last_i[has_middle], minlength=log_stat_count + 1))
+        active_times = active_times.astype(numpy.int64) + middle_counts[:log_stat_count]*sample_us
+
+        self.start_us = int(start)
+        self.log_stat_counts = (stroke_counts, character_counts,
+            undo_stroke_counts, undo_character_counts, active_times)
+
+    # Columns are formatted with NumPy a chunk of rows at a time
+    def write(self, output, add_derived):
+        print(LogStat.csv_header(add_derived), file=output)
+        if self.start_us is None:
+            return
+
+        sample_us = self.sample_duration//log_cache.MICROSECOND
+        derived_parts = DERIVED_CSV_PARTS if add_derived else ("",)
+        log_stat_count = len(self.log_stat_counts[0])
+        for first_i in range(0, log_stat_count, WRITE_ROW_COUNT):
+            end_i = min(first_i + WRITE_ROW_COUNT, log_stat_count)
+
+            # isoformat leaves out whole seconds' microseconds
+            period_starts = self.start_us + numpy.arange(first_i, end_i, dtype=numpy.int64)*sample_us
+            period_start_times = period_starts.astype("datetime64[us]")
+            columns = [numpy.where(period_starts % 1000000 == 0,
+                numpy.datetime_as_string(period_start_times, unit="s"),
+                numpy.datetime_as_string(period_start_times, unit="us")).tolist()]
+
+            stroke_counts, character_counts, undo_stroke_counts, \
+                undo_character_counts, active_times = self.log_stat_counts
+            for counts in (stroke_counts, character_counts,
+                undo_stroke_counts, undo_character_counts):
+                columns.append(counts[first_i:end_i].astype(str).tolist())
+            # Same as str(timedelta.total_seconds())
+            columns.append((active_times[first_i:end_i]/1000000).astype(str).tolist())
+            columns.append([str(row).join(derived_parts) for row in range(first_i + 2, end_i + 2)])
+
+            output.write("\n".join(map(",".join, zip(*columns))) + "\n")
+
+def create_time_statistics(sample_window, speed_activation, use_numpy = False):
+    period_filter = NoFilter()
+    if not speed_activation is None:
+        period_filter = SpeedFilter(
+            speed_activation[0],
+            speed_activation[1],
+            datetime.timedelta(seconds = speed_activation[2]))
+
+    sample_duration = datetime.timedelta(seconds = sample_window)
+    if use_numpy:
+        if not import_numpy():
+            raise ImportError("The NumPy time statistics backend requires NumPy")
+        return NumpyTimeStatistics(sample_duration, period_filter)
+    else:
+        return TimeStatistics(sample_duration, period_filter)
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Measure statistics over time in Plover logs. Outputs as CSV to standard out.")
+    log_reader.add_log_arguments(arg_parser)
+    arg_parser.add_argument("-sa", "--speed_activation", nargs=3, type=float, help="speed to start recording on (stroke/second), speed to stop recording on (stroke/second), length of window to check speed in (seconds)")
+    arg_parser.add_argument("-w", "--sample-window", required=True, type=float, help="duration of time (seconds) to sample for each discrete statistic")
+    arg_parser.add_argument("--raw", action="store_true", help="raw statistics only, no derived")
+    arg_parser.add_argument("--numpy", action="store_true", help="compute statistics with NumPy once all strokes are read, keeping them in memory and no faster than the default")
+    args = arg_parser.parse_args()
+    log_reader.check_log_arguments(arg_parser, args)
+    if args.numpy and not import_numpy():
+        arg_parser.error("--numpy requires NumPy")
+
+    stats = instrumentation.start(args)
+    log_processor, log_strokes, time_statistics = log_reader.open_log_strokes(
+        args,
+        create_time_statistics(args.sample_window, args.speed_activation, args.numpy),
+        ["time_statistics", args.speed_activation, args.sample_window, args.numpy],
+        stats = stats)
+
+    with stats.timed("aggregate"):
+        for log_stroke in log_strokes:
+            time_statistics.add_log_stroke(log_stroke)
+    with stats.timed("finish"):
+        time_statistics.finish()
+
+    with stats.timed("write"):
+        time_statistics.write(sys.stdout, not args.raw)
+
+    log_reader.print_formatting_cache_stats(args, log_processor)
+    stats.finish()
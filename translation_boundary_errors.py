@@ -1,107 +1,217 @@
 #!/usr/bin/env python3
 
 from __future__ import print_function
+import os
 import sys
+import time
+import pickle
+import multiprocessing
 from argparse import ArgumentParser
-try:
-    import simplejson as json
-except ImportError:
-    import json
 from collections import OrderedDict
 
+import steno_dictionary
+import instrumentation
+import json_output
 
-class StrokeTree:
-    def __init__(self, strokes_list = {}):
-        self.is_leaf = False
-        self.child_count = 0
-        self.children = {}
-        for strokes in strokes_list:
-            self.add(strokes)
 
-    def add(self, strokes):
-        if not strokes[0] in self.children:
-            self.children[strokes[0]] = StrokeTree()
-
-        if len(strokes) > 0:
-            self.children[strokes[0]].child_count += 1
-            if len(strokes) > 1:
-                self.children[strokes[0]].add(strokes[1:])
-        else:
-            self.is_leaf = True
-
-    def to_string(self):
-        string = "StrokeTree{\n" \
-            "  is_leaf=" + str(self.is_leaf) + ",\n" \
-            "  child_count=" + str(self.child_count) + ",\n" \
-            "  children={\n"
-        for key, tree in self.children.items():
-            string += "    " + key + "=" + tree.to_string().replace("\n", "\n    ") + ",\n"
-        string += "  }\n}"
-
-        return string
-
-    def match(self, strokes):
-        if not strokes[0] in self.children:
-            return StrokeTree()
-
-        if len(strokes) == 1:
-            return self.children[strokes[0]]
-        else:
-            return self.children[strokes[0]].match(strokes[1:])
+# Segmentations of an entry's stroke ids into dictionary entries followed by
+# a dictionary entry prefix. Position i has edges to the positions after the
+# dictionary entries starting at i and the trie node of the strokes from i
+# to the end, -1 if they aren't an entry prefix.
+class Segmentations:
+    def __init__(self, stroke_ids, edges, suffix_nodes):
+        self.stroke_ids = stroke_ids
+        self.edges = edges
+        self.suffix_nodes = suffix_nodes
 
+# Kinds of match, by whether the last entry is the rest of the strokes, the
+# rest completed to the only entry starting with them or an entry prefix
+TRIVIAL_MATCH = 0
+COMPLETED_MATCH = 1
+PREFIX_MATCH = 2
 
 class BoundaryErrorMatcher:
-    def __init__(self, dictionary_entries, include_trivial):
-        self.dictionary_entries_strokes_list = [tuple(strokes.split("/"))
-            for strokes, translation in dictionary_entries.items()]
-        self.dictionary_entries_strokes = set(self.dictionary_entries_strokes_list)
-
-        self.dictionary_entries_strokes_tree = StrokeTree(
-            self.dictionary_entries_strokes_list)
-
-        self.cached_suffix_strokes = {}
+    def __init__(self, dictionary, include_trivial):
+        self.dictionary = dictionary
+        self.dictionary_entries_strokes_trie = dictionary.trie
 
         self.include_trivial = include_trivial
 
-    def matches(self, strokes):
-        if len(strokes) == 1:
-            return {}
-
-        matches = self.matches_(strokes)
-
-        if "/".join(strokes) in matches:
-            del matches["/".join(strokes)]
-        if "/".join(strokes) + "/" in matches:
-            del matches["/".join(strokes) + "/"]
-
-        return matches
-
-    def matches_(self, strokes):
-        strokes_str = "/".join(strokes)
-        if strokes_str in self.cached_suffix_strokes:
-            return self.cached_suffix_strokes[strokes_str]
-
+    # Only the dictionary is pickled, such as for worker processes, as a
+    # memory mapped dictionary's trie can't be. The trie is looked up again
+    # from the unpickled dictionary.
+    def __getstate__(self):
+        return {"dictionary": self.dictionary, "include_trivial": self.include_trivial}
+
+    def __setstate__(self, state):
+        self.__init__(state["dictionary"], state["include_trivial"])
+
+    # Segmentations of the strokes of stroke_ids other than the strokes
+    # themselves, None if there are none
+    def segment(self, stroke_ids):
+        if len(stroke_ids) == 1:
+            return None
+
+        trie = self.dictionary_entries_strokes_trie
+
+        # Edges from positions reachable from the start through dictionary
+        # entries, None for unreachable positions
+        edges = [None]*len(stroke_ids)
+        suffix_nodes = [-1]*len(stroke_ids)
+        edges[0] = []
+        for i in range(len(stroke_ids)):
+            if edges[i] is None:
+                continue
+
+            ends, suffix_nodes[i] = trie.walk(stroke_ids, i)
+            if len(ends) > 0 and ends[-1] == len(stroke_ids):
+                ends.pop()
+
+            edges[i] = ends
+            for j in ends:
+                if edges[j] is None:
+                    edges[j] = []
+
+        # Remove edges to positions with no segmentations of the rest
+        has_matches = [False]*len(stroke_ids)
+        for i in reversed(range(len(stroke_ids))):
+            if edges[i] is None:
+                continue
+
+            edges[i] = [j for j in edges[i] if has_matches[j]]
+            has_matches[i] = (i > 0 and suffix_nodes[i] >= 0) or len(edges[i]) > 0
+
+        if not has_matches[0]:
+            return None
+
+        return Segmentations(stroke_ids, edges, suffix_nodes)
+
+    # Matches of segmentations and their entry counts. Matches are their
+    # kind, the positions the entries after the first start at and the trie
+    # node of the last, and are rendered as strings by render_matches. Entry
+    # prefixes of only one entry are completed to that entry.
+    def matches(self, segmentations):
         matches = {}
+        completed_matches = []
+        for j in segmentations.edges[0]:
+            self.add_matches(segmentations, (j,), matches, completed_matches)
 
-        if self.include_trivial and strokes in self.dictionary_entries_strokes:
-            matches[strokes_str] = 1
-
-        full_matches = self.dictionary_entries_strokes_tree.match(strokes).child_count
-        if full_matches > 0:
-            matches[strokes_str + "/"] = full_matches
-
-        for n in range(0, len(strokes)):
-            if strokes[:n] in self.dictionary_entries_strokes:
-                sub_matches = self.matches_(strokes[n:])
-
-                partial_match_str = "/".join(strokes[:n]) + " "
+        for match in completed_matches:
+            matches[match] = 1
 
-                for match, count in sub_matches.items():
-                    matches[partial_match_str + match] = count
-
-        self.cached_suffix_strokes[strokes_str] = matches
+        return matches
 
-        return matches.copy()
+    def add_matches(self, segmentations, starts, matches, completed_matches):
+        trie = self.dictionary_entries_strokes_trie
+        i = starts[-1]
+
+        node = segmentations.suffix_nodes[i]
+        if node >= 0:
+            trivial = self.include_trivial and trie.is_entry(node)
+            if trivial:
+                matches[(TRIVIAL_MATCH, starts, node)] = 1
+
+            full_matches = trie.child_count(node)
+            if full_matches == 1:
+                # Completing the only entry, the strokes themselves, would
+                # repeat the trivial match
+                if not trivial:
+                    completed_matches.append((COMPLETED_MATCH, starts, node))
+            else:
+                matches[(PREFIX_MATCH, starts, node)] = full_matches
+
+        for j in segmentations.edges[i]:
+            self.add_matches(segmentations, starts + (j,), matches, completed_matches)
+
+    # Match as a string of space separated dictionary entries, ending with /
+    # when the last is an entry prefix
+    def render_match(self, strokes, match):
+        trie = self.dictionary_entries_strokes_trie
+        kind, starts, node = match
+
+        match_str = " ".join("/".join(strokes[start:end])
+            for start, end in zip((0,) + starts, starts + (len(strokes),)))
+
+        if kind == COMPLETED_MATCH:
+            suffix_children = trie.children(node)
+            while len(suffix_children) == 1:
+                match_str += "/" + trie.node_stroke(suffix_children[0])
+                suffix_children = trie.children(suffix_children[0])
+        elif kind == PREFIX_MATCH:
+            match_str += "/"
+
+        return match_str
+
+    # Matches of the entry with strokes as strings and their entry counts
+    def render_matches(self, strokes, matches):
+        return {self.render_match(strokes, match): count
+            for match, count in matches.items()}
+
+ENTRIES_SHARD_SIZE = 1000
+
+# Matcher and numbers of the entries to check of the current process,
+# inherited by forked workers
+shard_matcher = None
+shard_entries = None
+
+def set_shard_entries(boundary_error_matcher, entries):
+    global shard_matcher
+    global shard_entries
+    shard_matcher = boundary_error_matcher
+    shard_entries = entries
+
+def find_shard_boundary_errors(shard):
+    dictionary = shard_matcher.dictionary
+    boundary_errors = []
+    for entry in shard_entries[shard[0]:shard[1]]:
+        segmentations = shard_matcher.segment(dictionary.entry_ids(entry))
+        if not segmentations is None:
+            boundary_errors.append((entry, shard_matcher.matches(segmentations)))
+
+    return shard[1] - shard[0], boundary_errors
+
+# Boundary errors of the numbered dictionary entries in entry order, in
+# shards of entry count and a list of entry numbers and matches
+def iter_boundary_errors(boundary_error_matcher, entries, jobs):
+    shards = [(start, min(start + ENTRIES_SHARD_SIZE, len(entries)))
+        for start in range(0, len(entries), ENTRIES_SHARD_SIZE)]
+
+    if jobs > 1:
+        with multiprocessing.Pool(jobs, set_shard_entries,
+            (boundary_error_matcher, entries)) as pool:
+            for shard_boundary_errors in pool.imap(find_shard_boundary_errors, shards):
+                yield shard_boundary_errors
+    else:
+        set_shard_entries(boundary_error_matcher, entries)
+        for shard in shards:
+            yield find_shard_boundary_errors(shard)
+
+class Progress:
+    def __init__(self, total, output):
+        self.total = total
+        self.output = output
+
+        self.count = 0
+        self.start_time = time.time()
+        self.report_time = self.start_time
+
+    def add(self, count):
+        self.count += count
+
+        now = time.time()
+        if now - self.report_time >= 1 or self.count == self.total:
+            self.report_time = now
+            self.report(now)
+
+    def report(self, now):
+        duration = now - self.start_time
+        speed = self.count/duration if duration > 0 else 0
+        eta = (self.total - self.count)/speed if speed > 0 else 0
+
+        print(str(self.count) + "/" + str(self.total) + " entries, "
+            + str(int(speed)) + " entries/s, "
+            + "ETA " + str(int(round(eta))) + "s",
+            file=self.output)
 
 def contains(list_a, list_b):
     for i in range(0, len(list_a)-len(list_b)+1):
@@ -118,120 +228,260 @@ def common_prefix_suffix(list_a, list_b):
     return False
 
 
-arg_parser = ArgumentParser(description="Find potential translation boundary errors in dictionaries. Outputs a JSON formatted dictionary of stroke sequences and a list of their potential translation boundary errors to standard out.")
-arg_parser.add_argument("dictionaries", nargs="+", help="dictionary file paths")
-arg_parser.add_argument("-t", "--trivial", action="store_true", help="include trivial matches, these are matches where the strokes match exactly (eg/ A/HED and A HED)")
-arg_parser.add_argument("-ss", "--stroke_sequence", help="only look for boundary errors involving this stroke sequence")
-arg_parser.add_argument("-at", "--add_translations", action="store_true", help="add translations to stroke lists")
-arg_parser.add_argument("-p", "--progress", action="store_true", help="output progress percentage on standard error")
-args = arg_parser.parse_args()
-
-dictionary_entries = {}
-for dictionary_file in args.dictionaries:
-    with open(dictionary_file) as data_file:
-        dictionary_entries.update(json.load(data_file))
-
-if not args.stroke_sequence is None and not args.stroke_sequence in dictionary_entries:
-    dictionary_entries[args.stroke_sequence] = ""
-
-boundary_error_matcher = BoundaryErrorMatcher(dictionary_entries, args.trivial)
+class BoundaryErrorIndexError(Exception):
+    pass
 
-check_entries = boundary_error_matcher.dictionary_entries_strokes
-if not args.stroke_sequence is None:
-    arg_stroke_sequence_parts = tuple(args.stroke_sequence.split("/"))
-
-    check_entries = [x for x in boundary_error_matcher.dictionary_entries_strokes_list
-        if contains(x, arg_stroke_sequence_parts)
-        or common_prefix_suffix(x, arg_stroke_sequence_parts)]
-
-boundary_errors = {}
-entry_i = 0
-for strokes in check_entries:
-    entry_boundary_errors = boundary_error_matcher.matches(strokes)
-    for error in [key for key, count in entry_boundary_errors.items()
-        if count == 1 and key[-1] == "/"]:
-
-        parts = error.split(" ")
-        suffix = parts[-1][:-1]
-
-        full_strokes = error[:-1]
-
-        suffix_tree = boundary_error_matcher.dictionary_entries_strokes_tree.match(suffix.split("/"))
-        while len(suffix_tree.children) == 1:
-            sole_suffix = list(suffix_tree.children.items())[0]
-            full_strokes += "/" + sole_suffix[0]
-            suffix_tree = sole_suffix[1]
-
-        entry_boundary_errors[full_strokes] = 1
-        del entry_boundary_errors[error]
-
-    if len(entry_boundary_errors) > 0:
-        boundary_errors["/".join(strokes)] = entry_boundary_errors
-
-    if args.progress:
-        pre_progress_percent = (100*entry_i)/len(check_entries)
-        entry_i += 1
-        post_progress_percent = (100*entry_i)/len(check_entries)
-        if post_progress_percent > pre_progress_percent:
-            print(str(post_progress_percent) + "%", file=sys.stderr)
-
-if not args.stroke_sequence is None:
-    remove_boundary_errors = []
-    for boundary_error, matches in boundary_errors.items():
-        if boundary_error == args.stroke_sequence:
-            continue
-
-        remove_matches = []
-        for match in matches:
-            parts = match.split(" ")
-            tail_strokes = tuple(parts[-1].split("/")[:-1])
-
-            if not (args.stroke_sequence in parts
-                or tail_strokes == arg_stroke_sequence_parts[:len(tail_strokes)]):
-                remove_matches.append(match)
-
-        for match in remove_matches:
-            del matches[match]
-
-        if len(matches) == 0:
-            remove_boundary_errors.append(boundary_error)
-
-    for boundary_error in remove_boundary_errors:
-        del boundary_errors[boundary_error]
-
-if args.add_translations:
-    boundary_errors_with_translations = {}
+# Boundary errors of every entry of the dictionaries they were found in, so
+# only entries affected by dictionary changes need to be checked again
+class BoundaryErrorIndex:
+    def __init__(self, path, include_trivial):
+        self.path = path
+        self.include_trivial = include_trivial
 
-    for strokes, matches in boundary_errors.items():
+        # Strokes -> translation
+        self.dictionary_entries = {}
+        # Strokes -> matches, for entries with boundary errors
+        self.boundary_errors = {}
+        # Stroke -> strokes of entries containing it and ending with it
+        self.stroke_entries = {}
+        self.last_stroke_entries = {}
+
+    @staticmethod
+    def load(path, include_trivial):
+        index = BoundaryErrorIndex(path, include_trivial)
+        try:
+            with open(path, "rb") as index_file:
+                state = pickle.load(index_file)
+        except FileNotFoundError:
+            return index
+
+        if state["include_trivial"] != include_trivial:
+            raise BoundaryErrorIndexError("Index " + path + " was saved "
+                + ("with" if state["include_trivial"] else "without") + " trivial matches")
+
+        index.dictionary_entries = state["dictionary_entries"]
+        index.boundary_errors = state["boundary_errors"]
+        index.stroke_entries = state["stroke_entries"]
+        index.last_stroke_entries = state["last_stroke_entries"]
+
+        return index
+
+    def save(self):
+        temp_path = self.path + ".tmp" + str(os.getpid())
+        with open(temp_path, "wb") as index_file:
+            pickle.dump({
+                "include_trivial": self.include_trivial,
+                "dictionary_entries": self.dictionary_entries,
+                "boundary_errors": self.boundary_errors,
+                "stroke_entries": self.stroke_entries,
+                "last_stroke_entries": self.last_stroke_entries
+            }, index_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, self.path)
+
+    def add_entry(self, strokes_str):
+        strokes = strokes_str.split("/")
+        for stroke in set(strokes):
+            self.stroke_entries.setdefault(stroke, set()).add(strokes_str)
+        self.last_stroke_entries.setdefault(strokes[-1], set()).add(strokes_str)
+
+    def remove_entry(self, strokes_str):
+        strokes = strokes_str.split("/")
+        for stroke in set(strokes):
+            self.stroke_entries[stroke].discard(strokes_str)
+        self.last_stroke_entries[strokes[-1]].discard(strokes_str)
+
+        self.boundary_errors.pop(strokes_str, None)
+
+    # Entries whose boundary errors can involve the changed entry strokes,
+    # those containing them or ending with their start
+    def affected_entries(self, changed_strokes):
+        affected = set()
+        for strokes in changed_strokes:
+            containing = min((self.stroke_entries.get(stroke, ()) for stroke in strokes), key=len)
+            affected.update(strokes_str for strokes_str in containing
+                if contains(tuple(strokes_str.split("/")), strokes))
+
+            for stroke in set(strokes[:-1]):
+                affected.update(strokes_str for strokes_str in self.last_stroke_entries.get(stroke, ())
+                    if common_prefix_suffix(tuple(strokes_str.split("/")), strokes))
+
+        return affected
+
+    # Updates the index to the dictionary entries and returns the numbers of
+    # entries to check again in dictionary order
+    def update(self, dictionary_entries):
+        removed = [strokes_str for strokes_str in self.dictionary_entries
+            if not strokes_str in dictionary_entries]
+        added = [strokes_str for strokes_str in dictionary_entries
+            if not strokes_str in self.dictionary_entries]
+
+        for strokes_str in removed:
+            self.remove_entry(strokes_str)
+        for strokes_str in added:
+            self.add_entry(strokes_str)
+        self.dictionary_entries = dict(dictionary_entries)
+
+        # Checking every entry is quicker than finding the affected entries
+        # of large changes
+        if len(removed) + len(added) > len(dictionary_entries)//10:
+            affected = set(dictionary_entries)
+        else:
+            affected = self.affected_entries(
+                [tuple(strokes_str.split("/")) for strokes_str in removed + added])
+        for strokes_str in affected:
+            self.boundary_errors.pop(strokes_str, None)
+
+        return [entry for entry, strokes_str in enumerate(dictionary_entries)
+            if strokes_str in affected]
+
+    def add_boundary_errors(self, boundary_errors):
+        self.boundary_errors.update(boundary_errors)
+
+        # Keep dictionary order
+        self.boundary_errors = {strokes_str: self.boundary_errors[strokes_str]
+            for strokes_str in self.dictionary_entries
+            if strokes_str in self.boundary_errors}
+
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Find potential translation boundary errors in dictionaries. Outputs a JSON formatted dictionary of stroke sequences and a list of their potential translation boundary errors to standard out.")
+    arg_parser.add_argument("dictionaries", nargs="+", help="dictionary file paths")
+    arg_parser.add_argument("-t", "--trivial", action="store_true", help="include trivial matches, these are matches where the strokes match exactly (eg/ A/HED and A HED)")
+    arg_parser.add_argument("-ss", "--stroke_sequence", help="only look for boundary errors involving this stroke sequence")
+    arg_parser.add_argument("-at", "--add_translations", action="store_true", help="add translations to stroke lists")
+    arg_parser.add_argument("-p", "--progress", action="store_true", help="output progress, throughput and estimated time remaining on standard error")
+    arg_parser.add_argument("-j", "--jobs", type=int, default=1, help="number of processes to check entries with")
+    arg_parser.add_argument("-dc", "--dictionary-cache", help="directory to keep compiled dictionaries in, dictionaries are compiled again when they change")
+    arg_parser.add_argument("--later-overrides", action="store_true", help="later dictionaries override earlier ones, by default earlier dictionaries take precedence as the top dictionary does in Plover")
+    arg_parser.add_argument("-i", "--index", help="boundary error index file, only entries affected by dictionary changes since the index was saved are checked and the index is updated")
+    arg_parser.add_argument("-l", "--limit-output", type=int, help="maximum output stroke sequences, those with the most potential boundary errors are partially sorted out")
+    json_output.add_arguments(arg_parser)
+    instrumentation.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    if args.jobs < 1:
+        arg_parser.error("--jobs must be 1 or more")
+    if not args.index is None and not args.stroke_sequence is None:
+        arg_parser.error("--index can't be used with --stroke_sequence")
+
+    stats = instrumentation.start(args)
+
+    with stats.timed("load_dictionaries"):
+        try:
+            dictionary = steno_dictionary.load_dictionaries(args.dictionaries,
+                args.dictionary_cache, args.later_overrides)
+        except ValueError as error:
+            print("Error reading dictionaries: " + str(error), file=sys.stderr)
+            sys.exit(1)
+
+        if not args.stroke_sequence is None and not args.stroke_sequence in dictionary:
+            dictionary_entries = OrderedDict(dictionary.items())
+            dictionary_entries[args.stroke_sequence] = ""
+            dictionary = steno_dictionary.Dictionary(dictionary_entries)
+
+        boundary_error_matcher = BoundaryErrorMatcher(dictionary, args.trivial)
+
+    check_entries = range(len(dictionary))
+    if not args.stroke_sequence is None:
+        arg_stroke_sequence_parts = tuple(args.stroke_sequence.split("/"))
+        arg_stroke_sequence_ids = tuple(dictionary.trie.stroke_id(stroke)
+            for stroke in arg_stroke_sequence_parts)
+
+        check_entries = [entry for entry in check_entries
+            if contains(dictionary.entry_ids(entry), arg_stroke_sequence_ids)
+            or common_prefix_suffix(dictionary.entry_ids(entry), arg_stroke_sequence_ids)]
+
+    if not args.index is None:
+        with stats.timed("index_update"):
+            try:
+                index = BoundaryErrorIndex.load(args.index, args.trivial)
+            except BoundaryErrorIndexError as error:
+                print(str(error), file=sys.stderr)
+                sys.exit(1)
+
+            check_entries = index.update(OrderedDict(dictionary.items()))
+
+    progress = Progress(len(check_entries), sys.stderr) if args.progress else None
+
+    # Entry -> matches, rendered as strings as they're written
+    boundary_errors = {}
+    for entry_count, shard_boundary_errors in stats.iterate(iter_boundary_errors(
+        boundary_error_matcher, check_entries, args.jobs), "check_entries"):
+        stats.count("check_entries", "entries", entry_count)
+        for entry, matches in shard_boundary_errors:
+            boundary_errors[entry] = matches
+
+        if not progress is None:
+            progress.add(entry_count)
+
+    def render(entry, matches):
+        return dictionary.entry_key(entry), \
+            boundary_error_matcher.render_matches(dictionary.entry_strokes(entry), matches)
+
+    if not args.index is None:
+        with stats.timed("index_save"):
+            # The index keeps matches as strings as trie nodes change with
+            # the dictionary
+            index.add_boundary_errors(render(entry, matches)
+                for entry, matches in boundary_errors.items())
+            index.save()
+            boundary_errors = dict(index.boundary_errors)
+            render = lambda strokes, matches: (strokes, matches)
+
+    if not args.stroke_sequence is None:
+        with stats.timed("filter"):
+            remove_boundary_errors = []
+            for entry, matches in boundary_errors.items():
+                strokes = dictionary.entry_strokes(entry)
+                if "/".join(strokes) == args.stroke_sequence:
+                    continue
+
+                remove_matches = []
+                for match in matches:
+                    parts = boundary_error_matcher.render_match(strokes, match).split(" ")
+                    tail_strokes = tuple(parts[-1].split("/")[:-1])
+
+                    if not (args.stroke_sequence in parts
+                        or tail_strokes == arg_stroke_sequence_parts[:len(tail_strokes)]):
+                        remove_matches.append(match)
+
+                for match in remove_matches:
+                    del matches[match]
+
+                if len(matches) == 0:
+                    remove_boundary_errors.append(entry)
+
+            for entry in remove_boundary_errors:
+                del boundary_errors[entry]
+
+    def add_translations(strokes, matches):
         matches_with_translations = {}
         for match_strokes, count in matches.items():
             translations = []
             for strokes_ in match_strokes.split(" "):
-                if strokes_ in dictionary_entries:
-                    translations.append(dictionary_entries[strokes_])
-                else:
-                    translations.append(strokes_)
+                translations.append(dictionary.get(strokes_, strokes_))
 
             matches_with_translations[match_strokes + ": " + " ".join(translations)] = count
 
-        if strokes in dictionary_entries:
-            boundary_errors_with_translations[strokes + ": " + dictionary_entries[strokes]] = \
-                matches_with_translations
+        if strokes in dictionary:
+            return strokes + ": " + dictionary[strokes], matches_with_translations
         else:
-            boundary_errors_with_translations[strokes] = \
-                matches_with_translations
-
-    boundary_errors = boundary_errors_with_translations
-
-# Sort dictionaries by reverse counts
-sorted_boundary_errors = OrderedDict(sorted(
-    boundary_errors.items(), key=lambda o: sum(o[1].values()), reverse=True))
-for translation in sorted_boundary_errors.keys():
-    sorted_boundary_errors[translation] = OrderedDict(sorted(
-        sorted_boundary_errors[translation].items(),
-        key=lambda o: o[1], reverse=True))
-
-print(json.dumps(sorted_boundary_errors,
-    ensure_ascii = False,
-    indent = 2,
-    separators = (",", ": ")))
+            return strokes, matches_with_translations
+
+    with stats.timed("sort"):
+        # Sort by reverse counts, matches are rendered and sorted as they're
+        # written and written entries are dropped
+        sorted_keys = json_output.sorted_keys_by_total(boundary_errors, args.limit_output)
+
+    def iter_rendered_boundary_errors():
+        for key in sorted_keys:
+            strokes, matches = render(key, boundary_errors.pop(key))
+            if args.add_translations:
+                strokes, matches = add_translations(strokes, matches)
+
+            yield strokes, json_output.sorted_counts(matches)
+
+    with stats.timed("write"):
+        json_output.write_object(sys.stdout, iter_rendered_boundary_errors(),
+            args.output_format)
+
+    stats.finish()
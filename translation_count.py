@@ -5,12 +5,8 @@ import sys
 from argparse import ArgumentParser
 
 import log_reader
-
-from collections import OrderedDict
-try:
-    import simplejson as json
-except ImportError:
-    import json
+import instrumentation
+import json_output
 
 
 def strokes_to_string(strokes):
@@ -23,23 +19,12 @@ def strokes_to_string(strokes):
     return strokes_str
 
 
-arg_parser = ArgumentParser(description="Count entry counts in plover logs. Outputs a JSON formatted dictionary of translations and dictionaries of stroke sequences and their counts to standard out.")
-arg_parser.add_argument("logs", nargs="+", help="log file paths")
-arg_parser.add_argument("-r", "--resume", help="start recording after encountering this translation")
-arg_parser.add_argument("-s", "--suspend", help="stop recording when encountering this translation")
-args = arg_parser.parse_args()
-
-log = []
-for log_file in args.logs:
-    with open(log_file) as data_file:
-        log += data_file.readlines()
-
-log_strokes = log_reader.process_log(log, args.resume, args.suspend)
-
-
 UNDO_PREFIX = "{UNDO} "
 UNTRANSLATE = "{NONE}"
 
+def translation_name(translation):
+    return translation.translation if not translation.translation is None else UNTRANSLATE
+
 class TranslationCounts:
     def __init__(self):
         self.counts = {}
@@ -58,6 +43,25 @@ class TranslationCounts:
         self.ensure_count_initialised(translation, strokes)
         self.counts[translation][strokes] -= 1
 
+    def add_log_stroke(self, log_stroke):
+        if log_stroke.stroke == "*":
+            # Undo stroke can have no undo translations when
+            # Plover's undo buffer is empty
+            if len(log_stroke.undo_translations) != 0:
+                self.add(
+                    UNDO_PREFIX + translation_name(log_stroke.undo_translations[0]),
+                    strokes_to_string(log_stroke.undo_translations[0].strokes))
+        else:
+            for translation in log_stroke.undo_translations:
+                self.remove(
+                    translation_name(translation),
+                    strokes_to_string(translation.strokes))
+
+            for translation in log_stroke.do_translations:
+                self.add(
+                    translation_name(translation),
+                    strokes_to_string(translation.strokes))
+
     def clean(self):
         # Remove zero count translation entries
         for translation in self.counts.keys():
@@ -66,43 +70,36 @@ class TranslationCounts:
         self.counts = {
             k: v for k, v in self.counts.items() if len(v) > 0 }
 
-translation_counts = TranslationCounts()
-
-for log_stroke in log_strokes:
-    for translation in log_stroke.undo_translations + log_stroke.do_translations:
-        if translation.translation is None:
-            translation.translation = UNTRANSLATE
-
-    if log_stroke.stroke == "*":
-        # Undo stroke can have no undo translations when
-        # Plover's undo buffer is empty
-        if len(log_stroke.undo_translations) != 0:
-            translation_counts.add(
-                UNDO_PREFIX + log_stroke.undo_translations[0].translation,
-                strokes_to_string(log_stroke.undo_translations[0].strokes))
-    else:
-        for translation in log_stroke.undo_translations:
-            translation_counts.remove(
-                translation.translation,
-                strokes_to_string(translation.strokes))
-
-        for translation in log_stroke.do_translations:
-            translation_counts.add(
-                translation.translation,
-                strokes_to_string(translation.strokes))
-
-translation_counts.clean()
-
-# Sort dictionaries by reverse counts
-sorted_translation_counts = OrderedDict(sorted(
-    translation_counts.counts.items(), key=lambda o: sum(o[1].values()), reverse=True))
-for translation in sorted_translation_counts.keys():
-    sorted_translation_counts[translation] = OrderedDict(sorted(
-        sorted_translation_counts[translation].items(),
-        key=lambda o: o[1], reverse=True))
-
-
-print(json.dumps(sorted_translation_counts,
-    ensure_ascii = False,
-    indent = 2,
-    separators = (',', ': ')))
+    def finish(self):
+        self.clean()
+
+    def write(self, output, output_format = "json", limit_output = None):
+        # Sort dictionaries by reverse counts
+        json_output.write_object(output,
+            json_output.iter_sorted_nested_counts(self.counts,
+                json_output.sorted_keys_by_total(self.counts, limit_output)),
+            output_format)
+
+if __name__ == "__main__":
+    arg_parser = ArgumentParser(description="Count entry counts in plover logs. Outputs a JSON formatted dictionary of translations and dictionaries of stroke sequences and their counts to standard out.")
+    log_reader.add_log_arguments(arg_parser)
+    arg_parser.add_argument("-l", "--limit-output", type=int, help="maximum output translations, the most counted are partially sorted out")
+    json_output.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    log_reader.check_log_arguments(arg_parser, args)
+
+    stats = instrumentation.start(args)
+    log_processor, log_strokes, translation_counts = log_reader.open_log_strokes(
+        args, TranslationCounts(), ["translation_count"], False, stats)
+
+    with stats.timed("aggregate"):
+        for log_stroke in log_strokes:
+            translation_counts.add_log_stroke(log_stroke)
+    with stats.timed("finish"):
+        translation_counts.finish()
+
+    with stats.timed("write"):
+        translation_counts.write(sys.stdout, args.output_format, args.limit_output)
+
+    log_reader.print_formatting_cache_stats(args, log_processor)
+    stats.finish()